@@ -0,0 +1,225 @@
+"""Ticket analytics: resolution times, backlog over time and resolution ratios.
+
+Usage: python -m analytics DB_PATH --guild ID [--days 28] [--bucket day|week] [--format csv|parquet] [--out DIR]
+
+Reports run in a separate process: rows are streamed in keyset chunks into
+NumPy columns and every aggregate is vectorized. Parquet needs pyarrow and the
+PNG chart needs matplotlib; both are optional.
+"""
+import argparse
+import asyncio
+import csv
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from multiprocessing import get_context
+import numpy as np
+from storage import open_backend
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # optional, only needed for --format parquet
+    pyarrow = None
+
+try:
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+except ImportError:  # optional, reports skip the chart without it
+    plt = None
+
+CHUNK_ROWS = 20_000
+BUCKETS = {"day": 86400, "week": 7 * 86400}
+ROLLING_BUCKETS = 7
+STATUSES = ("open", "in_progress", "solved", "rejected", "closed")
+RESOLUTIONS = ("solved", "rejected", "closed")
+_CODES = {status: code for code, status in enumerate(STATUSES)}
+_RESOLVED_FROM = _CODES["solved"]
+
+_pool: ProcessPoolExecutor | None = None
+
+async def _load(db_path:str, guild_id:int, until:int, chunk:int) -> dict[str, np.ndarray]:
+    # read-only: reports run against the live database and must never migrate or write it
+    db = open_backend(db_path, readers=1, pool_size=2, read_only=True)
+    await db.connect()
+    parts: dict[str, list[np.ndarray]] = {k: [] for k in ("is_private", "status", "created_at", "closed_at",
+                                                          "claimed_by", "claimed_at")}
+    after = (-1, 0)
+    try:
+        while True:
+            # keyset over (created_at, id), which idx_tickets_created returns already ordered
+            rows = await db.fetchall("""SELECT id, is_private, status, created_at, closed_at, claimed_by, claimed_at
+                FROM tickets WHERE guild_id=? AND created_at < ? AND (created_at, id) > (?, ?)
+                ORDER BY created_at, id LIMIT ?""", guild_id, until, after[0], after[1], chunk)
+            if not rows:
+                break
+            after = (rows[-1][3], rows[-1][0])
+            _, private, status, created, closed, claimed_by, claimed_at = zip(*rows)
+            n = len(rows)
+            parts["is_private"].append(np.fromiter(private, np.int8, n))
+            parts["status"].append(np.fromiter((_CODES.get(s, 0) for s in status), np.int8, n))
+            parts["created_at"].append(np.fromiter(created, np.int64, n))
+            # NULL becomes 0, which is never a real timestamp or member id
+            for name, values in (("closed_at", closed), ("claimed_by", claimed_by), ("claimed_at", claimed_at)):
+                parts[name].append(np.fromiter((v or 0 for v in values), np.int64, n))
+    finally:
+        await db.close()
+    return {name: np.concatenate(arrays) if arrays else np.zeros(0, np.int64) for name, arrays in parts.items()}
+
+def load_columns(db_path:str, guild_id:int, until:int, chunk:int=CHUNK_ROWS) -> dict[str, np.ndarray]:
+    """All tickets of a guild created before `until`, as one NumPy array per column."""
+    return asyncio.run(_load(db_path, guild_id, until, chunk))
+
+def _percentiles(values:np.ndarray, groups:np.ndarray, count:int, q:float) -> np.ndarray:
+    """Per-group percentile of `values`, NaN for empty groups."""
+    out = np.full(count, np.nan)
+    if not len(values):
+        return out
+    order = np.argsort(groups, kind="stable")
+    values, groups = values[order], groups[order]
+    starts = np.searchsorted(groups, np.arange(count))
+    ends = np.searchsorted(groups, np.arange(count), side="right")
+    for i in np.flatnonzero(ends > starts):
+        out[i] = np.percentile(values[starts[i]:ends[i]], q)
+    return out
+
+def _optional(values:np.ndarray) -> list[float | None]:
+    # buckets without closes are NaN; exported as empty cells / nulls
+    return [None if np.isnan(v) else round(float(v), 2) for v in values]
+
+def _ratio_rows(labels:list[str], codes:np.ndarray, groups:np.ndarray, count:int) -> dict[str, list]:
+    table = {"segment": labels}
+    totals = np.zeros(count, np.int64)
+    for status in RESOLUTIONS:
+        n = np.bincount(groups[codes == _CODES[status]], minlength=count)
+        table[status] = n.tolist()
+        totals += n
+    table["total"] = totals.tolist()
+    for status in ("solved", "rejected"):
+        table[f"{status}_ratio"] = [round(n / t, 4) if t else None for n, t in zip(table[status], totals)]
+    return table
+
+def compute(cols:dict[str, np.ndarray], since:int, until:int, bucket:str="day") -> dict[str, dict[str, list]]:
+    """Bucketed time series and resolution ratios for the window [since, until)."""
+    width = BUCKETS[bucket]
+    count = max(1, -(-(until - since) // width))
+    edges = since + width * np.arange(count + 1)
+    created, closed_at, status = cols["created_at"], cols["closed_at"], cols["status"]
+    # a reopened ticket keeps its old closed_at, so resolution is judged by status
+    resolved = (status >= _RESOLVED_FROM) & (closed_at > 0)
+
+    opened_in = (created >= since) & (created < until)
+    opened = np.bincount((created[opened_in] - since) // width, minlength=count)[:count]
+    closed_in = resolved & (closed_at >= since) & (closed_at < until)
+    closed_bucket = (closed_at[closed_in] - since) // width
+    closed = np.bincount(closed_bucket, minlength=count)[:count]
+    # backlog at each bucket end: created so far minus resolved so far
+    ends = edges[1:] - 1
+    backlog = (np.searchsorted(np.sort(created), ends, side="right")
+               - np.searchsorted(np.sort(closed_at[resolved]), ends, side="right"))
+    hours = (closed_at[closed_in] - created[closed_in]) / 3600
+    window = np.ones(ROLLING_BUCKETS) / ROLLING_BUCKETS
+    series = {
+        "bucket_start": [time.strftime("%Y-%m-%d", time.gmtime(t)) for t in edges[:-1]],
+        "opened": opened.tolist(),
+        "closed": closed.tolist(),
+        "backlog": backlog.tolist(),
+        # trailing mean; the first buckets average over fewer values
+        "opened_rolling": np.round(np.convolve(opened, window)[:count] * ROLLING_BUCKETS
+                                   / np.minimum(np.arange(1, count + 1), ROLLING_BUCKETS), 2).tolist(),
+        "median_resolution_hours": _optional(_percentiles(hours, closed_bucket, count, 50)),
+        "p90_resolution_hours": _optional(_percentiles(hours, closed_bucket, count, 90)),
+    }
+    codes = status[closed_in]
+    visibility = _ratio_rows(["public", "private"], codes, cols["is_private"][closed_in].astype(np.int64), 2)
+    claimers, claimer_groups = np.unique(cols["claimed_by"][closed_in], return_inverse=True)
+    by_claimer = _ratio_rows([str(c) if c else "unclaimed" for c in claimers], codes, claimer_groups.ravel(),
+                             len(claimers))
+    ratios = {"group": ["visibility"] * 2 + ["claimer"] * len(claimers)}
+    ratios.update((name, visibility[name] + by_claimer[name]) for name in visibility)
+    summary = {"opened": int(opened.sum()), "closed": int(closed.sum()), "backlog": int(backlog[-1]),
+               "median_resolution_hours": round(float(np.median(hours)), 2) if len(hours) else None}
+    return {"series": series, "ratios": ratios, "summary": summary}
+
+def _write_table(table:dict[str, list], path:str, fmt:str):
+    if fmt == "parquet":
+        pyarrow.parquet.write_table(pyarrow.table(table), path)
+        return
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(table)
+        writer.writerows(zip(*table.values()))
+
+def _chart(series:dict[str, list], path:str, title:str):
+    fig, (top, bottom) = plt.subplots(2, 1, figsize=(10, 7), sharex=True)
+    x = np.arange(len(series["bucket_start"]))
+    top.bar(x - 0.2, series["opened"], 0.4, label="opened")
+    top.bar(x + 0.2, series["closed"], 0.4, label="closed")
+    top.plot(x, series["backlog"], color="black", label="backlog")
+    top.plot(x, series["opened_rolling"], color="tab:blue", linestyle="--", label="opened (rolling)")
+    top.legend(loc="upper left")
+    top.set_title(title)
+    bottom.plot(x, series["median_resolution_hours"], marker=".", label="median")
+    bottom.plot(x, series["p90_resolution_hours"], marker=".", label="p90")
+    bottom.set_ylabel("hours to resolve")
+    bottom.legend(loc="upper left")
+    step = max(1, len(x) // 12)
+    bottom.set_xticks(x[::step], series["bucket_start"][::step], rotation=45, ha="right")
+    fig.tight_layout()
+    fig.savefig(path, dpi=100)
+    plt.close(fig)
+
+def build_report(db_path:str, guild_id:int, since:int, until:int, bucket:str="day", fmt:str="csv",
+                 out_dir:str=".", chart:bool=True) -> dict:
+    """Compute a report and write its files; returns the summary and the written paths.
+    Blocking: run it in the process pool (run_report) or from the CLI."""
+    if fmt == "parquet" and pyarrow is None:
+        raise RuntimeError("Parquet export needs pyarrow (pip install pyarrow)")
+    report = compute(load_columns(db_path, guild_id, until), since, until, bucket)
+    prefix = os.path.join(out_dir, f"tickets-{guild_id}-{time.strftime('%Y%m%d', time.gmtime(since))}-{bucket}")
+    paths = []
+    for name in ("series", "ratios"):
+        paths.append(f"{prefix}-{name}.{fmt}")
+        _write_table(report[name], paths[-1], fmt)
+    if chart and plt is not None:
+        paths.append(f"{prefix}.png")
+        _chart(report["series"], paths[-1], f"Tickets per {bucket}")
+    return {"summary": report["summary"], "paths": paths}
+
+async def run_report(*args, workers:int=1, **kwargs) -> dict:
+    """build_report in the analytics process pool, off the event loop."""
+    global _pool
+    if _pool is None:
+        # spawn, not fork: the bot process runs database threads
+        _pool = ProcessPoolExecutor(max_workers=workers, mp_context=get_context("spawn"))
+    return await asyncio.get_running_loop().run_in_executor(_pool, partial(build_report, *args, **kwargs))
+
+def shutdown():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export a ticket analytics report.")
+    parser.add_argument("db_path", help="DB_PATH of the tickets database")
+    parser.add_argument("--guild", type=int, required=True)
+    parser.add_argument("--days", type=int, default=28, help="report window, ending now")
+    parser.add_argument("--bucket", choices=sorted(BUCKETS), default="day")
+    parser.add_argument("--format", choices=("csv", "parquet"), default="csv")
+    parser.add_argument("--out", default=".", help="directory for the report files")
+    parser.add_argument("--no-chart", action="store_true")
+    args = parser.parse_args(argv)
+    until = int(time.time())
+    started = time.perf_counter()
+    result = build_report(args.db_path, args.guild, until - args.days * 86400, until, args.bucket, args.format,
+                          args.out, not args.no_chart)
+    for path in result["paths"]:
+        print(path)
+    print(f"{result['summary']} in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
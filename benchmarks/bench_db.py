@@ -0,0 +1,108 @@
+"""Queries per second of the pooled Database engine vs the old connect-per-query one.
+
+Usage: python benchmarks/bench_db.py [--tickets 2000] [--ops 4000] [--concurrency 32]
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+
+import aiosqlite
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import Database  # noqa: E402
+from storage.sqlite import INIT_SQL  # noqa: E402
+
+
+class LegacyDatabase(Database):
+    """The previous implementation: a fresh connection per query under one global lock."""
+
+    def __init__(self, path: str):
+        super().__init__(path)
+        self._lock = asyncio.Lock()
+
+    async def init(self):
+        async with aiosqlite.connect(self.path) as db:
+            await db.executescript(INIT_SQL)
+            await db.commit()
+
+    async def close(self):
+        pass
+
+    async def execute(self, sql: str, *params):
+        async with self._lock:
+            async with aiosqlite.connect(self.path) as db:
+                await db.execute(sql, params)
+                await db.commit()
+
+    async def fetchone(self, sql: str, *params):
+        async with self._lock:
+            async with aiosqlite.connect(self.path) as db:
+                cur = await db.execute(sql, params)
+                row = await cur.fetchone()
+                await cur.close()
+                return row
+
+    async def fetchall(self, sql: str, *params):
+        async with self._lock:
+            async with aiosqlite.connect(self.path) as db:
+                cur = await db.execute(sql, params)
+                rows = await cur.fetchall()
+                await cur.close()
+                return rows
+
+
+async def seed(db: Database, tickets: int):
+    for i in range(tickets):
+        await db.execute("""INSERT INTO tickets
+            (guild_id,thread_id,creator_id,is_private,status,title,created_at,updated_at,last_user_message_at)
+            VALUES (?,?,?,?,?,?,?,?,?)""", 1, 10_000 + i, i % 97, i % 2, "open", f"ticket {i}", i, i, i)
+
+
+async def workload(db: Database, tickets: int, ops: int, concurrency: int, write_ratio: float):
+    rnd = random.Random(42)
+    plan = [(rnd.random() < write_ratio, 10_000 + rnd.randrange(tickets)) for _ in range(ops)]
+    sem = asyncio.Semaphore(concurrency)
+
+    async def one(is_write: bool, thread_id: int):
+        async with sem:
+            if is_write:
+                await db.execute("UPDATE tickets SET last_user_message_at=?, updated_at=? WHERE thread_id=?",
+                                 int(time.time()), int(time.time()), thread_id)
+            else:
+                await db.fetchone("SELECT * FROM tickets WHERE thread_id=?", thread_id)
+
+    start = time.perf_counter()
+    await asyncio.gather(*[one(w, t) for w, t in plan])
+    return ops / (time.perf_counter() - start)
+
+
+async def run(cls, args):
+    with tempfile.TemporaryDirectory() as tmp:
+        db = cls(os.path.join(tmp, "bench.db"))
+        await db.init()
+        await seed(db, args.tickets)
+        qps = await workload(db, args.tickets, args.ops, args.concurrency, args.write_ratio)
+        await db.close()
+        return qps
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tickets", type=int, default=2000)
+    parser.add_argument("--ops", type=int, default=4000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--write-ratio", type=float, default=0.1)
+    args = parser.parse_args()
+    legacy = await run(LegacyDatabase, args)
+    pooled = await run(Database, args)
+    print(f"legacy: {legacy:10.0f} q/s")
+    print(f"pooled: {pooled:10.0f} q/s  ({pooled / legacy:.1f}x)")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,337 @@
+"""In-process stand-ins for the parts of discord.py the cogs touch.
+
+Every call that would be a Discord REST request goes through FakeRest, which
+adds configurable latency and simulated 429s and counts requests per route.
+Threads subclass discord.Thread so the cogs' isinstance checks still hold.
+"""
+import asyncio
+import itertools
+import random
+from collections import Counter
+from contextvars import ContextVar
+from datetime import datetime, timedelta, timezone
+
+import discord
+
+_ids = itertools.count(1 << 40)
+# the context of the command currently being driven, used to script wait_for replies
+current_ctx: ContextVar["FakeContext | None"] = ContextVar("current_ctx", default=None)
+
+
+def next_id() -> int:
+    return next(_ids)
+
+
+class FakeResponse:
+    def __init__(self, status: int, reason: str = "", retry_after: float = 0.0):
+        self.status = status
+        self.reason = reason
+        self.headers = {"Retry-After": str(retry_after)} if retry_after else {}
+
+
+class FakeRest:
+    """Latency and 429 model for Discord REST calls.
+
+    A 429 costs `retry_after` seconds before the call goes through, which is what
+    discord.py does internally when it waits out a bucket and retries."""
+
+    def __init__(self, latency: float = 0.05, jitter: float = 0.02, rate_limit: float = 0.0,
+                 retry_after: float = 1.0, seed: int = 0):
+        self.latency = latency
+        self.jitter = jitter
+        self.rate_limit = rate_limit
+        self.retry_after = retry_after
+        self.random = random.Random(seed)
+        self.calls = Counter()
+        self.limited = 0
+
+    @property
+    def total(self) -> int:
+        return sum(self.calls.values())
+
+    async def call(self, route: str):
+        self.calls[route] += 1
+        if self.rate_limit and self.random.random() < self.rate_limit:
+            self.limited += 1
+            await asyncio.sleep(self.retry_after)
+        delay = self.latency + self.random.uniform(-self.jitter, self.jitter) if self.latency else 0
+        await asyncio.sleep(max(0.0, delay))
+
+
+class FakeRole:
+    def __init__(self, guild: "FakeGuild", name: str, administrator: bool = False):
+        self.id = next_id()
+        self.guild = guild
+        self.name = name
+        self.members: list[FakeMember] = []
+        self.permissions = discord.Permissions(administrator=administrator)
+
+    @property
+    def mention(self) -> str:
+        return f"<@&{self.id}>"
+
+
+class FakeMember:
+    def __init__(self, guild: "FakeGuild", name: str, bot: bool = False, roles=()):
+        self.id = next_id()
+        self.guild = guild
+        self.name = name
+        self.display_name = name
+        self.bot = bot
+        self.roles = list(roles)
+        for role in self.roles:
+            role.members.append(self)
+
+    @property
+    def guild_permissions(self) -> discord.Permissions:
+        return discord.Permissions(administrator=any(r.permissions.administrator for r in self.roles))
+
+    @property
+    def mention(self) -> str:
+        return f"<@{self.id}>"
+
+    def __str__(self):
+        return self.name
+
+
+class FakeMessage:
+    def __init__(self, channel, author, content: str, created_at: datetime | None = None):
+        self.id = next_id()
+        self.channel = channel
+        self.author = author
+        self.content = content or ""
+        self.created_at = created_at or datetime.now(timezone.utc)
+        self.guild = getattr(channel, "guild", None)
+        self.reactions: list[str] = []
+
+    async def add_reaction(self, emoji: str):
+        await self.channel.rest.call("PUT reaction")
+        self.reactions.append(emoji)
+
+
+class FakeReaction:
+    def __init__(self, message: FakeMessage, emoji: str):
+        self.message = message
+        self.emoji = emoji
+
+
+class FakeTextChannel:
+    def __init__(self, guild: "FakeGuild", name: str):
+        self.id = next_id()
+        self.guild = guild
+        self.name = name
+        self.rest = guild.rest
+        self.messages: list[FakeMessage] = []
+
+    @property
+    def mention(self) -> str:
+        return f"<#{self.id}>"
+
+    async def send(self, content: str = None, **kwargs):
+        await self.rest.call("POST message")
+        message = FakeMessage(self, self.guild.me, content)
+        self.messages.append(message)
+        return message
+
+    async def create_thread(self, name: str, type=discord.ChannelType.public_thread, reason: str = None, **kwargs):
+        await self.rest.call("POST thread")
+        thread = FakeThread.create(self, name, type)
+        self.guild.threads[thread.id] = thread
+        return thread
+
+
+class FakeThread(discord.Thread):
+    """discord.Thread without a connection state; REST methods hit FakeRest."""
+
+    @classmethod
+    def create(cls, parent: FakeTextChannel, name: str, type: discord.ChannelType) -> "FakeThread":
+        thread = cls.__new__(cls)
+        thread.id = next_id()
+        thread.name = name
+        thread.guild = parent.guild
+        thread._type = type
+        thread.parent_id = parent.id
+        thread.owner_id = parent.guild.me.id
+        thread.locked = False
+        thread.archived = False
+        thread.fake_parent = parent
+        thread.rest = parent.rest
+        thread.messages = []
+        thread.member_ids = {parent.guild.me.id}
+        return thread
+
+    @property
+    def parent(self):
+        return self.fake_parent
+
+    @property
+    def members(self):
+        return [m for m in map(self.guild.get_member, self.member_ids) if m]
+
+    async def send(self, content: str = None, **kwargs):
+        await self.rest.call("POST message")
+        message = FakeMessage(self, self.guild.me, content)
+        self.messages.append(message)
+        return message
+
+    async def edit(self, **kwargs):
+        await self.rest.call("PATCH thread")
+        for key in ("name", "locked", "archived"):
+            if key in kwargs:
+                setattr(self, key, kwargs[key])
+        return self
+
+    async def add_user(self, user):
+        await self.rest.call("PUT thread member")
+        self.member_ids.add(user.id)
+
+    async def remove_user(self, user):
+        await self.rest.call("DELETE thread member")
+        self.member_ids.discard(user.id)
+
+    async def fetch_members(self):
+        await self.rest.call("GET thread members")
+        return [discord.Object(id=i) for i in self.member_ids]
+
+    async def delete(self, **kwargs):
+        await self.rest.call("DELETE thread")
+        self.guild.threads.pop(self.id, None)
+
+    async def history(self, limit=None, oldest_first=False, **kwargs):
+        # one page request per 100 messages, like the real paginator
+        messages = self.messages if oldest_first else list(reversed(self.messages))
+        if limit is not None:
+            messages = messages[:limit]
+        for i, message in enumerate(messages):
+            if i % 100 == 0:
+                await self.rest.call("GET messages")
+            yield message
+
+
+class FakeGuild:
+    def __init__(self, rest: FakeRest, name: str = "guild", staff: int = 5, members: int = 200):
+        self.id = next_id()
+        self.name = name
+        self.rest = rest
+        self.members: dict[int, FakeMember] = {}
+        self.channels: dict[int, FakeTextChannel] = {}
+        self.threads: dict[int, FakeThread] = {}
+        self.me = self._add_member(FakeMember(self, "ticketbot", bot=True))
+        self.owner_id = self.me.id
+        self.staff_role = FakeRole(self, "Staff")
+        self.admin_role = FakeRole(self, "Admin", administrator=True)
+        self.roles = [self.staff_role, self.admin_role]
+        self.staff = [self._add_member(FakeMember(self, f"staff{i}", roles=[self.staff_role])) for i in range(staff)]
+        self.users = [self._add_member(FakeMember(self, f"user{i}")) for i in range(members)]
+        self.public = self._add_channel("public")
+        self.support = self._add_channel("support")
+        self.logs = self._add_channel("logs")
+
+    def _add_member(self, member: FakeMember) -> FakeMember:
+        self.members[member.id] = member
+        return member
+
+    def _add_channel(self, name: str) -> FakeTextChannel:
+        channel = FakeTextChannel(self, name)
+        self.channels[channel.id] = channel
+        return channel
+
+    def get_member(self, member_id: int):
+        return self.members.get(member_id)
+
+    def get_channel(self, channel_id: int):
+        return self.channels.get(channel_id) or self.threads.get(channel_id)
+
+    def get_thread(self, thread_id: int):
+        return self.threads.get(thread_id)
+
+    def get_role(self, role_id: int):
+        return next((r for r in self.roles if r.id == role_id), None)
+
+
+class FakeContext:
+    def __init__(self, bot: "FakeBot", guild: FakeGuild, author: FakeMember, channel):
+        self.bot = bot
+        self.guild = guild
+        self.author = author
+        self.channel = channel
+        self.command = None
+        self.replies: list[str] = []
+
+    async def reply(self, content: str = None, **kwargs):
+        await self.guild.rest.call("POST interaction response")
+        self.replies.append(content)
+        return FakeMessage(self.channel, self.guild.me, content)
+
+    send = reply
+
+
+class FakeBot:
+    """Just enough of commands.Bot for the cogs: guild lookup, cogs, wait_for."""
+
+    def __init__(self, rest: FakeRest, guilds: list[FakeGuild]):
+        self.rest = rest
+        self.guilds = guilds
+        self.user = guilds[0].me if guilds else None
+        self.db = None
+        self.transcript_jobs = None
+        self.cogs: dict[str, object] = {}
+        self.resolution = "✅"
+        self._ready = asyncio.Event()
+
+    def set_ready(self):
+        self._ready.set()
+
+    async def wait_until_ready(self):
+        await self._ready.wait()
+
+    def get_cog(self, name: str):
+        return self.cogs.get(name)
+
+    def get_guild(self, guild_id: int):
+        return next((g for g in self.guilds if g.id == guild_id), None)
+
+    def get_channel(self, channel_id: int):
+        for guild in self.guilds:
+            channel = guild.get_channel(channel_id)
+            if channel:
+                return channel
+        return None
+
+    async def fetch_channel(self, channel_id: int):
+        await self.rest.call("GET channel")
+        channel = self.get_channel(channel_id)
+        if channel is None:
+            raise discord.NotFound(FakeResponse(404, "Not Found"), "Unknown Channel")
+        return channel
+
+    async def wait_for(self, event: str, check=None, timeout: float = None):
+        """Answer confirmation prompts immediately on behalf of the invoking user."""
+        ctx = current_ctx.get()
+        if ctx is None:
+            raise asyncio.TimeoutError
+        if event == "message":
+            result = FakeMessage(ctx.channel, ctx.author, "yes")
+            args = (result,)
+        elif event == "reaction_add":
+            prompt = ctx.channel.messages[-1]
+            args = result = (FakeReaction(prompt, self.resolution), ctx.author)
+        else:
+            raise asyncio.TimeoutError
+        if check and not check(*args):
+            raise asyncio.TimeoutError
+        return result
+
+
+def fake_history(thread: FakeThread, messages: int, authors: list, start: datetime | None = None,
+                 seed: int = 0):
+    """Fill a thread with `messages` synthetic messages, one minute apart."""
+    rnd = random.Random(seed)
+    start = start or datetime(2024, 1, 1, tzinfo=timezone.utc)
+    words = ["printer", "login", "error", "please", "help", "thanks", "restart", "server", "cannot", "still",
+             "<b>", "&", "quote\"s", "ąčęėįšųūž"]
+    for i in range(messages):
+        text = " ".join(rnd.choice(words) for _ in range(rnd.randint(3, 30)))
+        if i % 17 == 0:
+            text += "\nsecond line"
+        thread.messages.append(FakeMessage(thread, authors[i % len(authors)], text, start + timedelta(minutes=i)))
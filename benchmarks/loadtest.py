@@ -0,0 +1,318 @@
+"""Load test for TicketCog against fake Discord guilds, threads and REST.
+
+Drives the real cog code paths (ticket_open bursts, on_message floods, mass
+closes with transcript uploads, stale-checker sweeps) and reports throughput,
+tail latency, DB statements per op and REST calls per op.
+
+Usage: python benchmarks/loadtest.py [--tickets 300] [--guilds 3] [--latency 0.02] [--rate-limit 0.01]
+                                     [--out results.json] [--compare baseline.json] [--tolerance 0.2]
+
+With --compare the run exits non-zero when a scenario's throughput drops or its
+p99 latency grows by more than --tolerance relative to the baseline file.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+import discord
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fakes import (FakeBot, FakeContext, FakeGuild, FakeMessage, FakeRest, FakeThread, current_ctx,  # noqa: E402
+                   fake_history)
+from config import set_guild_override  # noqa: E402
+from cogs.logging_cog import LoggingCog  # noqa: E402
+from cogs.tickets import STALE_CONCURRENCY, TicketCog  # noqa: E402
+from database import Database  # noqa: E402
+from jobs import TranscriptJobQueue  # noqa: E402
+from utils.permissions import admin_index  # noqa: E402
+from utils.ratelimit import RateLimiter  # noqa: E402
+
+WORDS = ["printer", "login", "vpn", "email", "password", "reset", "broken", "slow", "error", "access",
+         "account", "laptop", "monitor", "wifi", "server", "crash", "update", "license", "refund", "order"]
+DB_METHODS = ("execute", "execute_returning", "executemany", "fetchone", "fetchall")
+
+
+def percentile(values: list[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def count_statements(db: Database) -> dict:
+    """Wrap the storage backend so every statement it runs is counted."""
+    counts = {"n": 0}
+    for name in DB_METHODS:
+        original = getattr(db.backend, name)
+
+        async def counted(*args, _original=original, **kwargs):
+            counts["n"] += 1
+            return await _original(*args, **kwargs)
+        setattr(db.backend, name, counted)
+    return counts
+
+
+class Harness:
+    def __init__(self, args):
+        self.args = args
+        self.random = random.Random(args.seed)
+        self.rest = FakeRest(args.latency, args.jitter, args.rate_limit, args.retry_after, args.seed)
+        self.guilds = [FakeGuild(self.rest, f"guild{i}", staff=args.staff, members=args.members)
+                       for i in range(args.guilds)]
+        self.bot = FakeBot(self.rest, self.guilds)
+        self.results: dict[str, dict] = {}
+
+    async def setup(self, path: str):
+        for guild in self.guilds:
+            set_guild_override(guild.id, "public_channel_id", guild.public.id)
+            set_guild_override(guild.id, "support_channel_id", guild.support.id)
+            set_guild_override(guild.id, "log_channel_id", guild.logs.id)
+            set_guild_override(guild.id, "admin_role_ids", [guild.staff_role.id])
+            admin_index.invalidate(guild.id)
+        self.db = self.bot.db = Database(path)
+        await self.db.init()
+        self.statements = count_statements(self.db)
+        self.bot.transcript_jobs = TranscriptJobQueue(self.bot, self.db, workers=self.args.transcript_workers)
+        self.bot.cogs["LoggingCog"] = LoggingCog(self.bot)
+        self.cog = TicketCog(self.bot, self.db)
+        # background loops are driven explicitly by the scenarios
+        self.cog.cog_unload()
+        self.bot.set_ready()
+
+    async def teardown(self):
+        await self.bot.transcript_jobs.stop()
+        await self.bot.cogs["LoggingCog"].cog_unload()
+        await self.db.close()
+
+    async def measure(self, name: str, calls: list, concurrency: int):
+        """Run the coroutine factories in `calls` with bounded concurrency and record the scenario."""
+        sem = asyncio.Semaphore(concurrency)
+        latencies: list[float] = []
+        errors = 0
+
+        async def one(factory):
+            nonlocal errors
+            async with sem:
+                started = time.perf_counter()
+                try:
+                    await factory()
+                except Exception:
+                    errors += 1
+                latencies.append(time.perf_counter() - started)
+        statements, rest, limited = self.statements["n"], self.rest.total, self.rest.limited
+        started = time.perf_counter()
+        await asyncio.gather(*(one(f) for f in calls))
+        self.record(name, len(calls), time.perf_counter() - started, latencies, statements, rest, limited, errors)
+
+    def record(self, name, ops, seconds, latencies, statements, rest, limited, errors=0):
+        ops = max(ops, 1)
+        tail = lambda q: round(percentile(latencies, q) * 1000, 2) if latencies else None
+        self.results[name] = {
+            "ops": ops,
+            "seconds": round(seconds, 4),
+            "ops_per_sec": round(ops / seconds, 2) if seconds else 0.0,
+            "p50_ms": tail(0.50),
+            "p95_ms": tail(0.95),
+            "p99_ms": tail(0.99),
+            "db_ops_per_op": round((self.statements["n"] - statements) / ops, 2),
+            "rest_calls_per_op": round((self.rest.total - rest) / ops, 2),
+            "rest_429": self.rest.limited - limited,
+            "errors": errors,
+        }
+
+    def title(self) -> str:
+        return " ".join(self.random.sample(WORDS, self.random.randint(2, 5)))
+
+    def invoke(self, command, ctx: FakeContext, **kwargs):
+        async def run():
+            token = current_ctx.set(ctx)
+            try:
+                await command.callback(self.cog, ctx, **kwargs)
+            finally:
+                current_ctx.reset(token)
+        return run
+
+    async def open_burst(self):
+        calls = []
+        for i in range(self.args.tickets):
+            guild = self.guilds[i % len(self.guilds)]
+            author = guild.users[i % len(guild.users)]
+            channel = guild.support if i % 3 == 0 else guild.public
+            calls.append(self.invoke(self.cog.ticket_open, FakeContext(self.bot, guild, author, channel),
+                                     title=self.title()))
+        await self.measure("ticket_open_burst", calls, self.args.concurrency)
+        for guild in self.guilds:
+            for thread in guild.threads.values():
+                fake_history(thread, self.args.history, guild.users[:5] + guild.staff[:1], seed=thread.id)
+
+    async def message_flood(self):
+        threads = [t for g in self.guilds for t in g.threads.values()]
+        calls = []
+        for _ in range(self.args.messages):
+            thread = self.random.choice(threads)
+            author = self.random.choice(thread.guild.users)
+            message = FakeMessage(thread, author, "still broken")
+            calls.append(lambda m=message: self.cog.on_message(m))
+        statements, rest, limited = self.statements["n"], self.rest.total, self.rest.limited
+        started = time.perf_counter()
+        await asyncio.gather(*(c() for c in calls))
+        await self.db.activity.flush()
+        self.record("on_message_flood", len(calls), time.perf_counter() - started, [], statements, rest, limited)
+
+    async def mass_close(self):
+        tickets = [self.db.registry.peek(t.id) for g in self.guilds for t in g.threads.values()]
+        tickets = [t for t in tickets if t and t.is_open][:self.args.closes]
+        calls = []
+        for ticket in tickets:
+            guild = self.bot.get_guild(ticket.guild_id)
+            thread = guild.get_thread(ticket.thread_id)
+            calls.append(self.invoke(self.cog.ticket_close, FakeContext(self.bot, guild, guild.staff[0], thread)))
+        await self.measure("ticket_close", calls, self.args.concurrency)
+        # uploads start only now so they are measured on their own
+        statements, rest, limited = self.statements["n"], self.rest.total, self.rest.limited
+        started = time.perf_counter()
+        await self.bot.transcript_jobs.start()
+        while True:
+            counts = await self.bot.transcript_jobs.stats()
+            if not counts.get("pending") and not counts.get("running"):
+                break
+            await asyncio.sleep(0.05)
+        self.record("transcript_upload", len(tickets), time.perf_counter() - started, [], statements, rest, limited)
+
+    async def seed_stale(self, idle: int) -> list[int]:
+        """Open --stale tickets directly in the database, idle since `idle`. Earlier
+        phases close most of their tickets, so the sweep gets a set of its own."""
+        seeded = []
+        for i in range(self.args.stale):
+            guild = self.guilds[i % len(self.guilds)]
+            thread = FakeThread.create(guild.public, f"stale {i}", discord.ChannelType.public_thread)
+            guild.threads[thread.id] = thread
+            ticket = await self.db.create_ticket(guild.id, thread.id, guild.users[i % len(guild.users)].id, False,
+                                                 self.title())
+            ticket.last_user_message_at = idle
+            seeded.append(thread.id)
+        await self.db.activity.flush()
+        await self.db.executemany("UPDATE tickets SET last_user_message_at=? WHERE thread_id=?",
+                                  [(idle, t) for t in seeded])
+        return seeded
+
+    async def stale_sweep(self):
+        now = int(time.time())
+        idle = now - 60 * 86400
+        seeded = await self.seed_stale(idle)
+        marks = ",".join("?" * len(seeded))
+        limiter = RateLimiter(STALE_CONCURRENCY, self.args.stale_rate)
+        statements, rest, limited = self.statements["n"], self.rest.total, self.rest.limited
+        started = time.perf_counter()
+        for guild in self.guilds:
+            await self.cog.check_stale(guild, limiter)
+        self.record("stale_remind", len(seeded), time.perf_counter() - started, [], statements, rest, limited)
+        reminded, = await self.db.fetchone(f"SELECT COUNT(*) FROM ticket_reminders WHERE thread_id IN ({marks})",
+                                           *seeded)
+        if reminded != len(seeded):
+            raise RuntimeError(f"stale_remind reminded {reminded} of {len(seeded)} seeded tickets")
+        # a week later nobody has replied
+        await self.db.execute(f"UPDATE ticket_reminders SET reminded_at=? WHERE thread_id IN ({marks})",
+                              now - 7 * 86400, *seeded)
+        await self.db.execute(f"UPDATE tickets SET last_user_message_at=? WHERE thread_id IN ({marks})",
+                              idle - 7 * 86400, *seeded)
+        for thread_id in seeded:
+            self.db.registry.peek(thread_id).last_user_message_at = idle - 7 * 86400
+        statements, rest, limited = self.statements["n"], self.rest.total, self.rest.limited
+        started = time.perf_counter()
+        for guild in self.guilds:
+            await self.cog.check_stale(guild, limiter)
+        self.record("stale_autoclose", len(seeded), time.perf_counter() - started, [], statements, rest, limited)
+        still_open = sum(1 for t in seeded if (ticket := self.db.registry.peek(t)) and ticket.is_open)
+        if still_open:
+            raise RuntimeError(f"stale_autoclose left {still_open} of {len(seeded)} seeded tickets open")
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    regressions = []
+    for name, current in results["scenarios"].items():
+        before = baseline.get("scenarios", {}).get(name)
+        if not before:
+            continue
+        if before["ops_per_sec"] and current["ops_per_sec"] < before["ops_per_sec"] * (1 - tolerance):
+            regressions.append(f"{name}: {current['ops_per_sec']} ops/s vs {before['ops_per_sec']} baseline")
+        if before["p99_ms"] and current["p99_ms"] and current["p99_ms"] > before["p99_ms"] * (1 + tolerance):
+            regressions.append(f"{name}: p99 {current['p99_ms']} ms vs {before['p99_ms']} baseline")
+    return regressions
+
+
+async def run(args) -> dict:
+    harness = Harness(args)
+    with tempfile.TemporaryDirectory() as tmp:
+        await harness.setup(args.db or os.path.join(tmp, "loadtest.db"))
+        try:
+            await harness.open_burst()
+            await harness.message_flood()
+            await harness.mass_close()
+            await harness.stale_sweep()
+        finally:
+            await harness.teardown()
+    return {
+        "commit": git_commit(),
+        "timestamp": int(time.time()),
+        "params": {k: v for k, v in vars(args).items() if k not in ("out", "compare")},
+        "scenarios": harness.results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tickets", type=int, default=300)
+    parser.add_argument("--guilds", type=int, default=3)
+    parser.add_argument("--members", type=int, default=200)
+    parser.add_argument("--staff", type=int, default=5)
+    parser.add_argument("--history", type=int, default=50, help="messages per ticket for transcripts")
+    parser.add_argument("--messages", type=int, default=5000)
+    parser.add_argument("--closes", type=int, default=100)
+    parser.add_argument("--stale", type=int, default=100, help="aged open tickets seeded for the stale sweep")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--transcript-workers", type=int, default=2)
+    parser.add_argument("--stale-rate", type=float, default=50.0, help="stale actions per second")
+    parser.add_argument("--latency", type=float, default=0.02, help="mean REST latency in seconds")
+    parser.add_argument("--jitter", type=float, default=0.01)
+    parser.add_argument("--rate-limit", type=float, default=0.01, help="probability a REST call hits a 429")
+    parser.add_argument("--retry-after", type=float, default=0.5)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--db", help="DB_PATH to test against (default: a temporary SQLite file)")
+    parser.add_argument("--out", help="write results as JSON to this file")
+    parser.add_argument("--compare", help="baseline JSON to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args()
+    results = asyncio.run(run(args))
+    for name, r in results["scenarios"].items():
+        tail = f"p50 {r['p50_ms']:7.1f}  p99 {r['p99_ms']:7.1f} ms" if r["p50_ms"] is not None else " " * 25
+        print(f"{name:20} {r['ops_per_sec']:9.1f} ops/s  {tail}  "
+              f"db/op {r['db_ops_per_op']:5.2f}  rest/op {r['rest_calls_per_op']:5.2f}  429s {r['rest_429']}"
+              + (f"  errors {r['errors']}" if r["errors"] else ""))
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for line in regressions:
+            print("REGRESSION", line)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
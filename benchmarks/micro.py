@@ -0,0 +1,279 @@
+"""Offline micro-benchmarks for the hot paths in database.py, transcripts.py and TicketCog.
+
+Every benchmark runs against synthetic data: ticket tables of --tickets rows
+(1k to 1M) and threads of --messages messages (10 to 50k). Each result reports
+ops/sec, the peak memory traced by tracemalloc per op, and the process peak RSS.
+
+Usage: python benchmarks/micro.py [--tickets 1000,100000] [--messages 10,1000,50000] [--filter db.]
+                                  [--save-baseline base.json] [--baseline base.json] [--tolerance 0.25]
+
+With --baseline the run exits non-zero when any benchmark is slower than the
+baseline by more than --tolerance.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fakes import FakeGuild, FakeRest, fake_history  # noqa: E402
+from cogs.tickets import TicketCog  # noqa: E402
+from database import Database  # noqa: E402
+from transcripts import export_html, export_plain  # noqa: E402
+
+WORDS = ["printer", "login", "vpn", "email", "password", "reset", "broken", "slow", "error", "access",
+         "account", "laptop", "monitor", "wifi", "server", "crash", "update", "license", "refund", "order",
+         "billing", "invoice", "mobile", "app", "sync", "calendar", "meeting", "audio", "camera", "share"]
+STATUSES = ("open", "in_progress", "closed", "solved", "rejected")
+GUILDS = 4
+SEED_BATCH = 20_000
+TRACE_OPS = 20
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+async def seed(db: Database, tickets: int, rnd: random.Random):
+    """Bulk-load `tickets` rows spread over a few guilds, a fifth of them open."""
+    now = int(time.time())
+    columns = ["id", "guild_id", "thread_id", "creator_id", "is_private", "status", "title", "created_at",
+               "updated_at", "claimed_by", "last_user_message_at", "closed_at"]
+    for start in range(0, tickets, SEED_BATCH):
+        rows = []
+        for i in range(start, min(tickets, start + SEED_BATCH)):
+            status = "open" if i % 5 == 0 else rnd.choice(STATUSES)
+            created = now - rnd.randrange(200 * 86400)
+            closed = None if status in ("open", "in_progress") else created + rnd.randrange(86400)
+            title = " ".join(rnd.sample(WORDS, rnd.randint(2, 6)))
+            rows.append((i + 1, 1 + i % GUILDS, 10_000_000 + i, 1000 + i % 997, i % 2, status, title, created,
+                         created, None, created, closed))
+        await db.backend.copy_rows("tickets", columns, rows)
+
+
+class Bench:
+    def __init__(self, name: str, fn, setup=None):
+        self.name = name
+        self.fn = fn
+        self.setup = setup
+
+
+async def run_bench(bench: Bench, min_time: float, max_ops: int) -> dict:
+    """Time `bench.fn` for at least min_time seconds, then trace a few extra calls for memory."""
+    if bench.setup:
+        await bench.setup()
+    await bench.fn(0)  # warm caches and code paths
+    ops, started = 0, time.perf_counter()
+    while ops < max_ops:
+        await bench.fn(ops + 1)
+        ops += 1
+        if time.perf_counter() - started >= min_time:
+            break
+    elapsed = time.perf_counter() - started
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    base = tracemalloc.get_traced_memory()[0]
+    traced = min(TRACE_OPS, max(1, ops))
+    for i in range(traced):
+        await bench.fn(ops + 1 + i)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "ops": ops,
+        "ops_per_sec": round(ops / elapsed, 2),
+        "us_per_op": round(elapsed / ops * 1_000_000, 2),
+        "alloc_peak_kb": round((peak - base) / 1024, 1),
+        "alloc_retained_kb_per_op": round(max(0, current - base) / traced / 1024, 2),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+    }
+
+
+def database_benches(db: Database, tickets: int, rnd: random.Random) -> list[Bench]:
+    thread_ids = [10_000_000 + i for i in range(tickets)]
+    open_threads = list(db.registry.open)[:1000] or thread_ids[:1]
+    now = int(time.time())
+    created = iter(range(50_000_000, 60_000_000))
+
+    async def get_hit(i):
+        await db.get_ticket_by_thread(open_threads[i % len(open_threads)])
+
+    async def get_miss(i):
+        thread_id = rnd.choice(thread_ids)
+        db.registry.discard(thread_id)
+        await db.get_ticket_by_thread(thread_id)
+
+    async def create(i):
+        await db.create_ticket(1, next(created), 42, bool(i % 2), "bench ticket printer offline")
+
+    async def update_status(i):
+        await db.update_status(open_threads[i % len(open_threads)], "in_progress" if i % 2 else "open")
+
+    async def set_claim(i):
+        await db.set_claim(open_threads[i % len(open_threads)], i % 2 or None)
+
+    async def close_ticket(i):
+        await db.close_ticket(rnd.choice(thread_ids), "closed")
+
+    async def list_mine(i):
+        await db.list_open_tickets_by_user(1, 1000 + i % 997)
+
+    async def count(i):
+        await db.count_by_status(1 + i % GUILDS)
+
+    async def stale(i):
+        await db.tickets_stale(1 + i % GUILDS, now - 10 * 86400, now - 7 * 86400)
+
+    async def purge_page(i):
+        await db.archive_purge_candidates(1 + i % GUILDS, now - 45 * 86400, (0, 0), 100)
+
+    async def stats(i):
+        guild_id = 1 + i % GUILDS
+        db.stats.total(guild_id), db.stats.status_counts(guild_id), db.stats.created_since(guild_id, 7, now)
+        db.stats.median_close_seconds(guild_id), db.stats.staff_closed(guild_id, 30, now)
+
+    async def activity(i):
+        db.activity.record(open_threads[i % len(open_threads)], now + i)
+        if i % 100 == 0:
+            await db.activity.flush()
+
+    async def mark_reminded(i):
+        await db.mark_reminded(open_threads[:50])
+
+    async def blacklisted(i):
+        await db.is_blacklisted(1, 1000 + i % 997)
+
+    async def add_blacklist(i):
+        await db.add_blacklist(2, 5_000_000 + i, "bench")
+
+    return [Bench("db.get_ticket_by_thread[hit]", get_hit), Bench("db.get_ticket_by_thread[miss]", get_miss),
+            Bench("db.create_ticket", create), Bench("db.update_status", update_status),
+            Bench("db.set_claim", set_claim), Bench("db.close_ticket", close_ticket),
+            Bench("db.list_open_tickets_by_user", list_mine), Bench("db.count_by_status", count),
+            Bench("db.tickets_stale", stale), Bench("db.archive_purge_candidates", purge_page),
+            Bench("db.ticket_stats", stats),
+            Bench("db.update_last_user_message", activity), Bench("db.mark_reminded", mark_reminded),
+            Bench("db.is_blacklisted", blacklisted), Bench("db.add_blacklist", add_blacklist)]
+
+
+def cog_benches(db: Database, rnd: random.Random) -> list[Bench]:
+    cog = SimpleNamespace(db=db)
+    guild = SimpleNamespace(id=1)
+    names = ["[In Progress] printer offline again", "vpn cannot connect", "[Solved] [Closed] login loop"]
+
+    async def normalize(i):
+        TicketCog.normalize_name(cog, names[i % len(names)], STATUSES[i % len(STATUSES)])
+
+    async def duplicate(i):
+        await TicketCog.duplicate_check(cog, guild, " ".join(rnd.sample(WORDS, 4)))
+
+    return [Bench("cog.normalize_name", normalize), Bench("cog.duplicate_check", duplicate)]
+
+
+def transcript_benches(messages: int) -> list[Bench]:
+    guild = FakeGuild(FakeRest(latency=0), staff=1, members=10)
+    state = {}
+
+    async def setup():
+        if "thread" not in state:
+            state["thread"] = thread = await guild.public.create_thread(name="bench transcript")
+            fake_history(thread, messages, guild.users + guild.staff)
+
+    async def plain(i):
+        await export_plain(state["thread"])
+
+    async def html(i):
+        await export_html(state["thread"])
+
+    return [Bench(f"transcripts.export_plain[{messages}]", plain, setup),
+            Bench(f"transcripts.export_html[{messages}]", html, setup)]
+
+
+async def run(args) -> dict:
+    results = {}
+    rnd = random.Random(args.seed)
+
+    def wanted(name):
+        return not args.filter or any(f in name for f in args.filter.split(","))
+
+    async def execute(benches: list[Bench], label: str):
+        for bench in benches:
+            if not wanted(bench.name):
+                continue
+            key = f"{bench.name}@{label}" if label else bench.name
+            results[key] = r = await run_bench(bench, args.min_time, args.max_ops)
+            print(f"{key:48} {r['ops_per_sec']:12.1f} ops/s  {r['us_per_op']:10.1f} us/op  "
+                  f"peak {r['alloc_peak_kb']:9.1f} KiB  rss {r['peak_rss_mb']:7.1f} MiB", flush=True)
+
+    for tickets in args.tickets:
+        with tempfile.TemporaryDirectory() as tmp:
+            db = Database(os.path.join(tmp, "micro.db"))
+            await db.init(warm=False)
+            started = time.perf_counter()
+            await seed(db, tickets, rnd)
+            await db.warm()
+            print(f"-- {tickets} tickets seeded and warmed in {time.perf_counter() - started:.1f}s", flush=True)
+            try:
+                await execute(database_benches(db, tickets, rnd), f"{tickets}")
+                await execute(cog_benches(db, rnd), f"{tickets}")
+            finally:
+                await db.close()
+    for messages in args.messages:
+        await execute(transcript_benches(messages), "")
+    return {"timestamp": int(time.time()), "python": sys.version.split()[0], "results": results}
+
+
+def compare(current: dict, baseline: dict, tolerance: float) -> list[str]:
+    regressions = []
+    for name, r in current["results"].items():
+        before = baseline.get("results", {}).get(name)
+        if before and r["ops_per_sec"] < before["ops_per_sec"] * (1 - tolerance):
+            regressions.append(f"{name}: {r['ops_per_sec']} ops/s vs {before['ops_per_sec']} baseline "
+                               f"({r['ops_per_sec'] / before['ops_per_sec'] - 1:+.0%})")
+    return regressions
+
+
+def int_list(raw: str) -> list[int]:
+    return [int(x) for x in raw.split(",") if x]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tickets", type=int_list, default=[1000, 100_000],
+                        help="comma separated ticket table sizes, up to 1000000")
+    parser.add_argument("--messages", type=int_list, default=[10, 1000, 50_000],
+                        help="comma separated transcript thread lengths")
+    parser.add_argument("--filter", help="only run benchmarks whose name contains one of these (comma separated)")
+    parser.add_argument("--min-time", type=float, default=0.5, help="seconds per benchmark")
+    parser.add_argument("--max-ops", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--out", help="write results as JSON to this file")
+    parser.add_argument("--save-baseline", help="write results as the new baseline")
+    parser.add_argument("--baseline", help="baseline JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    args = parser.parse_args()
+    results = asyncio.run(run(args))
+    for path in filter(None, (args.out, args.save_baseline)):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for line in regressions:
+            print("REGRESSION", line)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
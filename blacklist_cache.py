@@ -0,0 +1,112 @@
+import hashlib
+import heapq
+import math
+
+BLOOM_THRESHOLD = 50_000
+BLOOM_FALSE_POSITIVE_RATE = 0.001
+
+class BloomFilter:
+    """Fixed-size bloom filter over integer ids (double hashing on one blake2b digest)."""
+
+    def __init__(self, capacity:int, error_rate:float=BLOOM_FALSE_POSITIVE_RATE):
+        capacity = max(capacity, 1)
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, value:int):
+        digest = hashlib.blake2b(value.to_bytes(8, "little", signed=True), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        for i in range(self.hashes):
+            yield (h1 + i * h2) % self.size
+
+    def add(self, value:int):
+        for pos in self._positions(value):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, value:int) -> bool:
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(value))
+
+class BlacklistCache:
+    """In-memory view of the blacklist table. Guilds with up to `bloom_threshold`
+    entries keep an exact set; larger guilds keep a bloom filter whose positives
+    must be confirmed against the database. Expiring entries sit in a min-heap so
+    the sweeper only looks at entries that are actually due."""
+
+    def __init__(self, bloom_threshold:int=BLOOM_THRESHOLD):
+        self.bloom_threshold = bloom_threshold
+        self._sets: dict[int, set[int]] = {}
+        self._blooms: dict[int, BloomFilter] = {}
+        self._expires: dict[tuple[int, int], int] = {}
+        self._heap: list[tuple[int, int, int]] = []
+
+    def load(self, rows):
+        """Replace the cache from (guild_id, user_id, expires_at) rows."""
+        by_guild: dict[int, set[int]] = {}
+        self._expires, self._heap = {}, []
+        for guild_id, user_id, expires_at in rows:
+            by_guild.setdefault(guild_id, set()).add(user_id)
+            if expires_at:
+                self._expires[(guild_id, user_id)] = expires_at
+                self._heap.append((expires_at, guild_id, user_id))
+        heapq.heapify(self._heap)
+        self._sets, self._blooms = {}, {}
+        for guild_id, users in by_guild.items():
+            if len(users) > self.bloom_threshold:
+                bloom = self._blooms[guild_id] = BloomFilter(len(users) * 2)
+                for user_id in users:
+                    bloom.add(user_id)
+            else:
+                self._sets[guild_id] = users
+
+    def add(self, guild_id:int, user_id:int, expires_at:int|None=None):
+        bloom = self._blooms.get(guild_id)
+        if bloom is not None:
+            bloom.add(user_id)
+        else:
+            self._sets.setdefault(guild_id, set()).add(user_id)
+        if expires_at:
+            self._expires[(guild_id, user_id)] = expires_at
+            heapq.heappush(self._heap, (expires_at, guild_id, user_id))
+        else:
+            self._expires.pop((guild_id, user_id), None)
+
+    def discard(self, guild_id:int, user_id:int):
+        # bloom filters cannot forget; the database check covers removed ids
+        users = self._sets.get(guild_id)
+        if users is not None:
+            users.discard(user_id)
+        self._expires.pop((guild_id, user_id), None)
+
+    def check(self, guild_id:int, user_id:int, now:int) -> bool | None:
+        """True/False when the cache is certain, None when the database must decide."""
+        expires_at = self._expires.get((guild_id, user_id))
+        if expires_at is not None and expires_at <= now:
+            return False
+        users = self._sets.get(guild_id)
+        if users is not None:
+            return user_id in users
+        bloom = self._blooms.get(guild_id)
+        if bloom is not None and user_id in bloom:
+            return None
+        return False
+
+    def pop_expired(self, now:int) -> list[tuple[int, int]]:
+        """Remove and return (guild_id, user_id) for entries that expired by `now`."""
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            expires_at, guild_id, user_id = heapq.heappop(self._heap)
+            # skip heap entries superseded by a later add or a removal
+            if self._expires.get((guild_id, user_id)) != expires_at:
+                continue
+            self.discard(guild_id, user_id)
+            due.append((guild_id, user_id))
+        return due
+
+    def next_expiry(self) -> int | None:
+        return self._heap[0][0] if self._heap else None
+
+    def stats(self) -> dict[str, int]:
+        return {"guilds": len(self._sets) + len(self._blooms), "bloom_guilds": len(self._blooms),
+                "entries": sum(map(len, self._sets.values())), "expiring": len(self._expires)}
@@ -1,10 +1,39 @@
 import discord
 from discord.ext import commands
 import asyncio
+import hashlib
+import json
+import logging
 import signal
-from config import get_config
+import time
+from contextlib import contextmanager, suppress
+from config import get_config, apply_overrides
 from database import Database
+from jobs import TranscriptJobQueue
 from utils.logging_ext import setup_logging
+from utils.metrics import metrics, instrument_http, start_metrics_server
+from utils.sharding import ShardScope
+from utils.shared_store import SharedStore, worker_key
+from utils.tracing import tracer
+from utils.watchdog import watchdog
+
+log = logging.getLogger("bot")
+
+EXTENSIONS = ("cogs.logging_cog", "cogs.health", "cogs.tickets", "cogs.admin")
+TREE_HASH_KEY = "command_tree_hash"
+PUBLISH_SECONDS = 10
+WARM_ATTEMPTS = 3
+WARM_RETRY_SECONDS = 5
+
+@contextmanager
+def startup_phase(name:str):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        metrics.set_gauge("startup_phase_seconds", elapsed, phase=name)
+        log.info("startup phase %s took %.1f ms", name, elapsed * 1000, extra={"latency_ms": round(elapsed * 1000, 1)})
 
 INTENTS = discord.Intents.default()
 INTENTS.message_content = True
@@ -13,52 +42,188 @@ INTENTS.members = True
 INTENTS.reactions = True
 
 class TicketBot(commands.Bot):
-    def __init__(self):
-        super().__init__(command_prefix="!", intents=INTENTS)
+    def __init__(self, worker_id:int|None=None, store:SharedStore|None=None, **options):
+        super().__init__(command_prefix="!", intents=INTENTS, **options)
+        self.worker_id = worker_id
+        self.store = store
+        self._publisher: asyncio.Task | None = None
         self.db: Database | None = None
+        self.transcript_jobs: TranscriptJobQueue | None = None
+        self.metrics_runner = None
+        self.boot_started = time.perf_counter()
+        self._ready_logged = False
+        self.before_invoke(self._command_started)
+        self.after_invoke(self._command_finished)
+
+    async def _command_started(self, ctx: commands.Context):
+        if not self.db.ready.is_set():
+            # caches are still warming after a restart
+            await self.db.ready.wait()
+        ctx.started_at = time.perf_counter()
+        ctx.span = tracer.span(f"command:{ctx.command.qualified_name}")
+
+    async def _command_finished(self, ctx: commands.Context):
+        span = getattr(ctx, "span", None)
+        if span:
+            span.finish()
+        started = getattr(ctx, "started_at", None)
+        if started is not None:
+            name = ctx.command.qualified_name
+            elapsed = time.perf_counter() - started
+            metrics.observe("command_seconds", elapsed, command=name)
+            log.info("command %s %s", name, "failed" if ctx.command_failed else "ok", extra={
+                "guild": ctx.guild.id if ctx.guild else None,
+                "ticket": ctx.channel.id if isinstance(ctx.channel, discord.Thread) else None,
+                "command": name, "latency_ms": round(elapsed * 1000, 1)})
+            metrics.incr("commands_total", command=name, failed=str(ctx.command_failed).lower())
 
     async def setup_hook(self):
-        await self.load_extension("cogs.logging_cog")
-        await self.load_extension("cogs.health")
-        await self.load_extension("cogs.tickets")
-        await self.load_extension("cogs.admin")
+        instrument_http(self.http)
+        watchdog.start()
+        cfg = get_config()
+        if cfg.metrics_port and self.worker_id is None:
+            # in process mode the supervisor serves the merged metrics
+            self.metrics_runner = await start_metrics_server("127.0.0.1", cfg.metrics_port)
+        with startup_phase("extensions"):
+            await asyncio.gather(*(self.load_extension(name) for name in EXTENSIONS))
+        if not self.worker_id:
+            # the command tree is global; in process mode worker 0 syncs it
+            with startup_phase("command_sync"):
+                await self.sync_commands()
+        if self.store is not None:
+            self._publisher = asyncio.create_task(self._publish_state())
+        if self.transcript_jobs:
+            await self.transcript_jobs.start()
+
+    def command_tree_hash(self) -> str:
+        """Stable digest of the global application command payload."""
+        payload = sorted((cmd.to_dict(self.tree) for cmd in self.tree.get_commands()),
+                         key=lambda c: (c.get("type", 1), c["name"]))
+        data = json.dumps({"application": self.application_id, "commands": payload}, sort_keys=True, default=str)
+        return hashlib.sha256(data.encode()).hexdigest()
+
+    async def sync_commands(self, force:bool=False):
+        """Sync the command tree only when its signature differs from the last synced one."""
+        digest = self.command_tree_hash()
+        if not force and await self.db.get_state(TREE_HASH_KEY) == digest:
+            log.info("command tree unchanged, skipping sync")
+            return False
         await self.tree.sync()
+        await self.db.set_state(TREE_HASH_KEY, digest)
+        return True
 
     async def on_ready(self):
+        if not self._ready_logged:
+            self._ready_logged = True
+            elapsed = time.perf_counter() - self.boot_started
+            metrics.set_gauge("startup_phase_seconds", elapsed, phase="total")
+            log.info("ready after %.1f ms", elapsed * 1000, extra={"latency_ms": round(elapsed * 1000, 1)})
         print(f"Logged in as {self.user} ({self.user.id})")
 
+    def worker_state(self) -> dict:
+        """What this process publishes to the shared store for /health and /metrics."""
+        return {"worker_id": self.worker_id, "at": time.time(), "shards": list(getattr(self, "shard_ids", None) or [self.shard_id or 0]),
+                "guilds": len(self.guilds), "latency": self.latency,
+                "open_tickets": self.db.registry.stats()["open"] if self.db else 0,
+                "metrics": metrics.export()}
+
+    async def _publish_state(self):
+        key = worker_key(self.worker_id)
+        while True:
+            try:
+                await asyncio.to_thread(self.store.put, key, self.worker_state())
+            except Exception:
+                log.exception("publishing worker state failed")
+            await asyncio.sleep(PUBLISH_SECONDS)
+
+    async def on_command_error(self, ctx, error):
+        if isinstance(error, commands.CommandOnCooldown):
+            await ctx.reply(f"Cooldown: try again in {error.retry_after:.1f}s.")
+        else:
+            await ctx.reply("Error occurred.")
+            raise error
+
     async def close(self):
+        if self._publisher:
+            self._publisher.cancel()
         await super().close()
+        if self.transcript_jobs:
+            await self.transcript_jobs.stop()
+        if self.metrics_runner:
+            await self.metrics_runner.cleanup()
+        await watchdog.stop()
+        if self.db:
+            await self.db.close()
+
+class ShardedTicketBot(TicketBot, commands.AutoShardedBot):
+    """TicketBot over several gateway shards in one process."""
 
-bot = TicketBot()
+def create_bot(mode:str="single", worker_id:int|None=None, store:SharedStore|None=None,
+               shard_ids:list[int]|None=None, shard_count:int|None=None) -> TicketBot:
+    if mode == "single":
+        return TicketBot()
+    # "auto" lets discord.py pick the shard count unless one is configured
+    return ShardedTicketBot(worker_id=worker_id, store=store, shard_ids=shard_ids, shard_count=shard_count or None)
 
-@bot.event
-async def on_command_error(ctx, error):
-    from discord.ext import commands as c
-    if isinstance(error, c.CommandOnCooldown):
-        await ctx.reply(f"Cooldown: try again in {error.retry_after:.1f}s.")
-    else:
-        await ctx.reply("Error occurred.")
-        raise error
+bot: TicketBot | None = None
 
-async def main():
-    setup_logging()
+async def warm_caches(bot: TicketBot):
+    """Fill the caches, retrying with a growing delay. The blacklist, duplicate and
+    open-ticket checks are answered from these caches, so if every attempt fails the
+    bot is shut down instead of serving with empty ones."""
+    for attempt in range(1, WARM_ATTEMPTS + 1):
+        try:
+            with startup_phase("cache_warm"):
+                await bot.db.warm()
+            return
+        except Exception:
+            if attempt == WARM_ATTEMPTS:
+                log.exception("cache warm-up failed %d times, shutting down", attempt)
+                await bot.close()
+                raise
+            log.exception("cache warm-up failed (attempt %d/%d), retrying in %ds", attempt, WARM_ATTEMPTS,
+                          WARM_RETRY_SECONDS * attempt)
+            await asyncio.sleep(WARM_RETRY_SECONDS * attempt)
+
+async def main(worker_id:int|None=None, shard_ids:list[int]|None=None, shard_count:int|None=None,
+               store:SharedStore|None=None):
+    global bot
     cfg = get_config()
+    setup_logging(log_file=cfg.log_file, max_bytes=cfg.log_max_bytes, backups=cfg.log_backups,
+                  sample_rates=cfg.log_sample_rates)
     if not cfg.bot_token:
         print("Set BOT_TOKEN in .env")
         return
-    bot.db = Database(cfg.db_path)
-    await bot.db.init()
+    mode = "process" if worker_id is not None else cfg.shard_mode
+    bot = create_bot(mode, worker_id, store, shard_ids, shard_count or cfg.shard_count)
+    scope = ShardScope(shard_ids, shard_count) if shard_ids is not None and shard_count else None
+    bot.db = Database(cfg.db_path, scope=scope, pool_size=cfg.db_pool_size)
+    with startup_phase("db_open"):
+        await bot.db.init(warm=False)
+        apply_overrides(await bot.db.config_overrides())
+    # fill the ticket/title/blacklist caches while the gateway connects
+    warm_task = asyncio.create_task(warm_caches(bot))
+    bot.transcript_jobs = TranscriptJobQueue(bot, bot.db)
     loop = asyncio.get_running_loop()
     for sig in (signal.SIGINT, signal.SIGTERM):
         try:
             loop.add_signal_handler(sig, lambda s=sig: asyncio.create_task(bot.close()))
         except NotImplementedError:
             pass
-    await bot.start(cfg.bot_token)
+    try:
+        await bot.start(cfg.bot_token)
+    finally:
+        warm_task.cancel()
+        with suppress(asyncio.CancelledError):
+            # re-raises a failed warm-up so the process exits with an error
+            await warm_task
 
 if __name__ == "__main__":
     try:
-        asyncio.run(main())
+        if get_config().shard_mode == "process":
+            from supervisor import supervise
+            asyncio.run(supervise())
+        else:
+            asyncio.run(main())
     except KeyboardInterrupt:
         pass
\ No newline at end of file
@@ -1,24 +1,78 @@
+import asyncio
+import io
+import os
+import tempfile
+import time
+from typing import Optional
 import discord
 from discord.ext import commands
-from config import get_config, update_runtime_config
-from utils.permissions import is_admin
+import analytics
+from config import get_config, coerce_value, set_guild_override, clear_guild_override
+from utils.permissions import is_admin, admin_index
+from utils.tracing import tracer, SamplingProfiler, collapsed
+from utils.watchdog import watchdog
+
+MAX_PROFILE_MINUTES = 30
+STAFF_STATS_DAYS = 30
+STAFF_STATS_TOP = 5
+MAX_ANALYTICS_DAYS = 366
+
+def format_duration(seconds: int | None) -> str:
+    if seconds is None:
+        return "n/a"
+    for unit, size in (("d", 86400), ("h", 3600), ("m", 60)):
+        if seconds >= size:
+            return f"~{seconds / size:.1f}{unit}"
+    return f"~{seconds}s"
+
+class BlacklistFlags(commands.FlagConverter, delimiter=":", prefix=""):
+    # the reason stays free text in front, so `!admin blacklist_add @u 3 strikes spam`
+    # keeps meaning "reason: 3 strikes spam"; an expiry must be spelled `hours: 24`
+    reason: str = commands.flag(positional=True, default="No reason provided",
+                                description="Why the user is blacklisted.")
+    hours: Optional[int] = commands.flag(default=None, description="Lift the blacklist after this many hours.")
 
 class AdminCog(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
+        self._profile_task: asyncio.Task | None = None
 
     async def cog_check(self, ctx: commands.Context) -> bool:
         """Only allow admins to use admin commands"""
         return is_admin(ctx.author)
 
+    # Keep the admin index current
+    @commands.Cog.listener()
+    async def on_member_update(self, before: discord.Member, after: discord.Member):
+        if before.roles != after.roles:
+            admin_index.refresh_member(after)
+
+    @commands.Cog.listener()
+    async def on_member_remove(self, member: discord.Member):
+        admin_index.remove_member(member)
+
+    @commands.Cog.listener()
+    async def on_guild_role_update(self, before: discord.Role, after: discord.Role):
+        if before.permissions.administrator != after.permissions.administrator:
+            admin_index.invalidate(after.guild.id)
+
+    @commands.Cog.listener()
+    async def on_guild_role_delete(self, role: discord.Role):
+        admin_index.invalidate(role.guild.id)
+
+    @commands.Cog.listener()
+    async def on_guild_update(self, before: discord.Guild, after: discord.Guild):
+        if before.owner_id != after.owner_id:
+            admin_index.invalidate(after.id)
+
     @commands.hybrid_group(name="admin", description="Administrative commands.")
     async def admin(self, ctx: commands.Context):
         if ctx.invoked_subcommand is None:
-            await ctx.reply("Use a subcommand: config_get, config_set, blacklist_add, perms_check")
+            await ctx.reply("Use a subcommand: config_get, config_set, config_reset, blacklist_add, perms_check, profile, blocking")
 
     @admin.command(name="config_get", description="Get runtime configuration values.")
     async def config_get(self, ctx: commands.Context, key: str = None):
-        cfg = get_config()
+        cfg = get_config(ctx.guild.id)
         runtime_config = cfg.to_dict()
         
         if key:
@@ -32,9 +86,9 @@ class AdminCog(commands.Cog):
             embed = discord.Embed(title="Runtime Configuration", description="\n".join(lines), color=0x3498db)
             await ctx.reply(embed=embed, ephemeral=True)
 
-    @admin.command(name="config_set", description="Set runtime configuration values.")
+    @admin.command(name="config_set", description="Set a configuration value for this server.")
     async def config_set(self, ctx: commands.Context, key: str, value: str):
-        cfg = get_config()
+        cfg = get_config(ctx.guild.id)
         runtime_config = cfg.to_dict()
         
         if key not in runtime_config:
@@ -42,21 +96,15 @@ class AdminCog(commands.Cog):
             return await ctx.reply(f"Unknown config key: `{key}`\nAvailable: {available}")
         
         # Type conversion based on current value type
-        current_value = getattr(cfg, key)
         try:
-            if isinstance(current_value, bool):
-                new_value = value.lower() in ('true', '1', 'yes', 'on')
-            elif isinstance(current_value, int):
-                new_value = int(value)
-            elif isinstance(current_value, float):
-                new_value = float(value)
-            else:
-                new_value = value
+            new_value = coerce_value(key, value)
         except ValueError:
-            return await ctx.reply(f"Invalid value type for `{key}`. Expected {type(current_value).__name__}.")
+            return await ctx.reply(f"Invalid value type for `{key}`. Expected {type(getattr(cfg, key)).__name__}.")
         
-        # Update config
-        update_runtime_config(**{key: new_value})
+        # Persist, then swap in the new snapshot
+        await self.bot.db.set_config_override(ctx.guild.id, key, str(new_value))
+        set_guild_override(ctx.guild.id, key, new_value)
+        admin_index.invalidate(ctx.guild.id)
         await ctx.reply(f"Updated `{key}` to `{new_value}`")
         
         # Log the change
@@ -64,19 +112,29 @@ class AdminCog(commands.Cog):
         if cog:
             await cog.log(ctx.guild, f"Config updated by {ctx.author}: {key} = {new_value}")
 
+    @admin.command(name="config_reset", description="Drop this server's override of a configuration value.")
+    async def config_reset(self, ctx: commands.Context, key: str):
+        await self.bot.db.delete_config_override(ctx.guild.id, key)
+        clear_guild_override(ctx.guild.id, key)
+        admin_index.invalidate(ctx.guild.id)
+        await ctx.reply(f"Reset `{key}` to `{getattr(get_config(ctx.guild.id), key, None)}`")
+
     @admin.command(name="blacklist_add", description="Blacklist a user from creating tickets.")
-    async def blacklist_add(self, ctx: commands.Context, user: discord.User, *, reason: str = "No reason provided"):
-        await self.bot.db.add_blacklist(ctx.guild.id, user.id, reason)
-        await ctx.reply(f"Blacklisted {user.mention} from creating tickets.\nReason: {reason}")
+    async def blacklist_add(self, ctx: commands.Context, user: discord.User, *, flags: BlacklistFlags):
+        reason, hours = flags.reason, flags.hours
+        expires_at = int(time.time()) + hours * 3600 if hours and hours > 0 else None
+        await self.bot.db.add_blacklist(ctx.guild.id, user.id, reason, expires_at)
+        until = f" until <t:{expires_at}:f>" if expires_at else ""
+        await ctx.reply(f"Blacklisted {user.mention} from creating tickets{until}.\nReason: {reason}")
         
         # Log the action
         cog = self.bot.get_cog("LoggingCog")
         if cog:
-            await cog.log(ctx.guild, f"User blacklisted by {ctx.author}: {user} ({user.id}) - {reason}")
+            await cog.log(ctx.guild, f"User blacklisted by {ctx.author}: {user} ({user.id}){until} - {reason}")
 
     @admin.command(name="blacklist_remove", description="Remove user from blacklist.")
     async def blacklist_remove(self, ctx: commands.Context, user: discord.User):
-        await self.bot.db.execute("DELETE FROM blacklist WHERE guild_id=? AND user_id=?", ctx.guild.id, user.id)
+        await self.bot.db.remove_blacklist(ctx.guild.id, user.id)
         await ctx.reply(f"Removed {user.mention} from blacklist.")
         
         # Log the action
@@ -86,22 +144,23 @@ class AdminCog(commands.Cog):
 
     @admin.command(name="blacklist_list", description="List blacklisted users.")
     async def blacklist_list(self, ctx: commands.Context):
-        rows = await self.bot.db.fetchall("SELECT user_id, reason FROM blacklist WHERE guild_id=?", ctx.guild.id)
+        rows = await self.bot.db.list_blacklist(ctx.guild.id)
         if not rows:
             return await ctx.reply("No users blacklisted.", ephemeral=True)
         
         lines = []
-        for user_id, reason in rows[:20]:  # Limit to 20 entries
+        for user_id, reason, expires_at in rows[:20]:  # Limit to 20 entries
             user = self.bot.get_user(user_id)
             user_name = f"{user} ({user_id})" if user else f"User {user_id}"
-            lines.append(f"• {user_name}: {reason}")
+            until = f" (until <t:{expires_at}:R>)" if expires_at else ""
+            lines.append(f"• {user_name}: {reason}{until}")
         
         embed = discord.Embed(title="Blacklisted Users", description="\n".join(lines), color=0xe74c3c)
         await ctx.reply(embed=embed, ephemeral=True)
 
     @admin.command(name="perms_check", description="Check bot permissions and configuration.")
     async def perms_check(self, ctx: commands.Context):
-        cfg = get_config()
+        cfg = get_config(ctx.guild.id)
         guild = ctx.guild
         
         # Check channel permissions
@@ -174,34 +233,112 @@ class AdminCog(commands.Cog):
 
     @admin.command(name="stats", description="Show ticket statistics.")
     async def stats(self, ctx: commands.Context):
-        # Overall stats
-        total_tickets = await self.bot.db.fetchone("SELECT COUNT(*) FROM tickets WHERE guild_id=?", ctx.guild.id)
-        total_count = total_tickets[0] if total_tickets else 0
-        
-        # Status breakdown
-        status_counts = await self.bot.db.count_by_status(ctx.guild.id)
-        status_dict = {status: count for status, count in status_counts}
-        
-        # Recent tickets (last 7 days)
-        import time
-        week_ago = int(time.time()) - (7 * 24 * 60 * 60)
-        recent = await self.bot.db.fetchone("SELECT COUNT(*) FROM tickets WHERE guild_id=? AND created_at > ?", 
-                                           ctx.guild.id, week_ago)
-        recent_count = recent[0] if recent else 0
-        
+        # answered from the in-memory ticket_stats rollup, no table scans
+        stats, guild_id, now = self.bot.db.stats, ctx.guild.id, int(time.time())
+        status_dict = stats.status_counts(guild_id)
+
         embed = discord.Embed(title="Ticket Statistics", color=0x3498db)
-        embed.add_field(name="Total Tickets", value=str(total_count), inline=True)
-        embed.add_field(name="Last 7 Days", value=str(recent_count), inline=True)
+        embed.add_field(name="Total Tickets", value=str(stats.total(guild_id)), inline=True)
+        embed.add_field(name="Last 7 Days", value=str(stats.created_since(guild_id, 7, now)), inline=True)
         embed.add_field(name="‎", value="‎", inline=True)  # spacer
-        
+
         # Status breakdown
         status_lines = []
         for status in ["open", "in_progress", "solved", "rejected", "closed"]:
             count = status_dict.get(status, 0)
             status_lines.append(f"{status.title()}: {count}")
-        
         embed.add_field(name="Status Breakdown", value="\n".join(status_lines), inline=False)
-        
+
+        # Medians come from log2 histograms, so they are accurate to within a factor of ~1.4
+        embed.add_field(name="Median Time to Claim", value=format_duration(stats.median_claim_seconds(guild_id)), inline=True)
+        embed.add_field(name="Median Time to Close", value=format_duration(stats.median_close_seconds(guild_id)), inline=True)
+
+        staff_lines = []
+        for member_id, closed in stats.staff_closed(guild_id, STAFF_STATS_DAYS, now)[:STAFF_STATS_TOP]:
+            member = ctx.guild.get_member(member_id)
+            staff_lines.append(f"{member.display_name if member else f'User {member_id}'}: {closed}")
+        embed.add_field(name=f"Closed by Staff ({STAFF_STATS_DAYS} days)", value="\n".join(staff_lines) or "None",
+                        inline=False)
+
+        await ctx.reply(embed=embed, ephemeral=True)
+
+    @admin.command(name="analytics", description="Export a ticket analytics report (CSV or Parquet plus a chart).")
+    async def analytics_report(self, ctx: commands.Context, days: int = 28, bucket: str = "day", fmt: str = "csv"):
+        bucket, fmt = bucket.lower(), fmt.lower()
+        if bucket not in analytics.BUCKETS:
+            return await ctx.reply(f"Bucket must be one of: {', '.join(analytics.BUCKETS)}", ephemeral=True)
+        if fmt not in ("csv", "parquet"):
+            return await ctx.reply("Format must be `csv` or `parquet`.", ephemeral=True)
+        if fmt == "parquet" and analytics.pyarrow is None:
+            return await ctx.reply("Parquet export needs pyarrow on the bot host; use `csv`.", ephemeral=True)
+        days = max(1, min(days, MAX_ANALYTICS_DAYS))
+        await ctx.defer(ephemeral=True)
+        cfg = get_config()
+        until = int(time.time())
+        with tempfile.TemporaryDirectory() as out_dir:
+            # reports run in a separate process so large histories never block the event loop
+            result = await analytics.run_report(cfg.db_path, ctx.guild.id, until - days * 86400, until, bucket, fmt,
+                                                out_dir, workers=cfg.analytics_workers)
+            summary = result["summary"]
+            median = summary["median_resolution_hours"]
+            text = (f"Last {days} days: {summary['opened']} opened, {summary['closed']} resolved, "
+                    f"backlog {summary['backlog']}, median resolution "
+                    f"{'n/a' if median is None else f'{median}h'}.")
+            files = [discord.File(path, filename=os.path.basename(path)) for path in result["paths"]]
+            await ctx.reply(text, files=files, ephemeral=True)
+
+    async def cog_unload(self):
+        analytics.shutdown()
+
+    @admin.command(name="profile", description="Capture command spans or sample the event loop, then upload a flamegraph file.")
+    async def profile(self, ctx: commands.Context, mode: str = "spans", minutes: int = 1):
+        mode = mode.lower()
+        if mode not in ("spans", "sampling"):
+            return await ctx.reply("Mode must be `spans` or `sampling`.", ephemeral=True)
+        if self._profile_task and not self._profile_task.done():
+            return await ctx.reply("A profile is already running.", ephemeral=True)
+        minutes = max(1, min(minutes, MAX_PROFILE_MINUTES))
+        self._profile_task = asyncio.create_task(self._run_profile(ctx.guild, mode, minutes))
+        await ctx.reply(f"Profiling ({mode}) for {minutes} min; output goes to the log channel.", ephemeral=True)
+
+    async def _run_profile(self, guild: discord.Guild, mode: str, minutes: int):
+        if mode == "spans":
+            tracer.start()
+            try:
+                await asyncio.sleep(minutes * 60)
+            finally:
+                stacks = tracer.stop()
+            unit = "µs self time"
+        else:
+            profiler = SamplingProfiler()
+            profiler.start()
+            try:
+                await asyncio.sleep(minutes * 60)
+            finally:
+                stacks = await asyncio.to_thread(profiler.stop)
+            unit = f"samples every {profiler.interval * 1000:.0f} ms"
+        log_channel = guild.get_channel(get_config(guild.id).log_channel_id)
+        if not log_channel:
+            return
+        data = collapsed(stacks).encode("utf-8")
+        name = f"profile-{mode}-{int(time.time())}.folded"
+        try:
+            await log_channel.send(f"Profile ({mode}, {minutes} min, {unit}). Collapsed stacks, open with speedscope or flamegraph.pl.",
+                                   file=discord.File(io.BytesIO(data), filename=name))
+        except discord.HTTPException:
+            pass
+
+    @admin.command(name="blocking", description="Show recent event-loop blocking events.")
+    async def blocking(self, ctx: commands.Context, count: int = 3):
+        events = list(watchdog.offenders)[-max(1, min(count, 10)):]
+        if not events:
+            return await ctx.reply("No blocking events recorded.", ephemeral=True)
+        embed = discord.Embed(title="Event Loop Blocking", color=0xe67e22,
+                              description=f"Threshold {watchdog.threshold*1000:.0f} ms, {len(watchdog.offenders)} recorded.")
+        for event in reversed(events):
+            stack = event.stack[-900:]
+            embed.add_field(name=f"<t:{int(event.at)}:R> blocked {event.seconds*1000:.0f} ms",
+                            value=f"```{stack}```", inline=False)
         await ctx.reply(embed=embed, ephemeral=True)
 
 async def setup(bot):
@@ -1,7 +1,9 @@
-import platform, time
+import asyncio, platform, time
 import discord
 from discord.ext import commands
 from utils.metrics import metrics
+from utils.shared_store import live_workers
+from utils.watchdog import watchdog
 from config import get_config
 
 START_TIME = time.time()
@@ -18,10 +20,33 @@ class Health(commands.Cog):
         embed = discord.Embed(title="Health", color=0x2ecc71)
         embed.add_field(name="Latency", value=f"{self.bot.latency*1000:.0f} ms")
         embed.add_field(name="Uptime", value=f"{uptime/3600:.2f} h")
+        lag_p99 = metrics.quantiles("event_loop_lag_seconds", (0.99,))[0.99]
+        embed.add_field(name="Loop Lag", value=f"{watchdog.lag*1000:.0f} ms (p99 {lag_p99*1000:.0f} ms)")
+        embed.add_field(name="Loop Queue", value=f"{watchdog.ready_depth} ready, {watchdog.task_count} tasks")
+        embed.add_field(name="Blocking Events", value=str(len(watchdog.offenders)))
         embed.add_field(name="Tickets Created", value=str(snap.get("tickets_created",0)))
+        for label, name in (("Command", "command_seconds"), ("Discord REST", "discord_rest_seconds"),
+                            ("DB Lock Wait", "db_lock_wait_seconds")):
+            q = metrics.quantiles(name)
+            embed.add_field(name=f"{label} p50/p95/p99", value=" / ".join(f"{q[p]*1000:.0f}" for p in (0.5, 0.95, 0.99)) + " ms")
+        if self.bot.db:
+            reg = self.bot.db.registry.stats()
+            embed.add_field(name="Ticket Cache", value=f"{reg['open']} open, {reg['hits']} hits / {reg['misses']} misses")
+        jobs = getattr(self.bot, "transcript_jobs", None)
+        if jobs:
+            counts = await jobs.stats()
+            embed.add_field(name="Transcript Jobs", value=", ".join(f"{k}: {v}" for k, v in sorted(counts.items())) or "none")
+        store = getattr(self.bot, "store", None)
+        if store is not None:
+            workers = await asyncio.to_thread(live_workers, store)
+            embed.add_field(name="Cluster", value=(
+                f"{len(workers)} workers, {sum(len(w['shards']) for w in workers.values())} shards, "
+                f"{sum(w['guilds'] for w in workers.values())} guilds, "
+                f"{sum(w['open_tickets'] for w in workers.values())} open tickets"))
+            embed.add_field(name="Worker", value=f"{self.bot.worker_id} of {len(workers)}")
         embed.add_field(name="Version", value=VERSION)
         embed.add_field(name="Python", value=platform.python_version())
-        cfg=get_config()
+        cfg=get_config(ctx.guild.id if ctx.guild else None)
         embed.add_field(name="Anonymize Public", value=str(cfg.anonymize_public))
         await ctx.reply(embed=embed, ephemeral=True if hasattr(ctx,"interaction") else False)
 
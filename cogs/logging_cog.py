@@ -1,19 +1,133 @@
+import asyncio
+import json
+import os
+import time
 import discord
-from discord.ext import commands
+from discord.ext import commands, tasks
 from config import get_config
+from storage import is_url
+from utils.metrics import metrics
+
+LOG_QUEUE_SIZE = 2000
+LOG_OVERFLOW_LIMIT = 2000
+LOG_FLUSH_SECONDS = 2
+MESSAGE_LIMIT = 2000
+SPILL_FILENAME = "log_spill.jsonl"
+SPILL_REPLAY_LINES = 500
+SPILL_REPLAY_SECONDS = 30
+
+def pack_messages(lines:list[str], limit:int=MESSAGE_LIMIT) -> list[list[str]]:
+    """Group lines so each group joined by newlines fits in one message of `limit` characters."""
+    groups, current, size = [], [], 0
+    for line in lines:
+        line = line[:limit]
+        if current and size + 1 + len(line) > limit:
+            groups.append(current)
+            current, size = [], 0
+        size += len(line) + (1 if current else 0)
+        current.append(line)
+    if current:
+        groups.append(current)
+    return groups
 
 class LoggingCog(commands.Cog):
     def __init__(self, bot:commands.Bot):
         self.bot=bot
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=LOG_QUEUE_SIZE)
+        self._overflow: list[tuple[int, str]] = []
+        spill_name = SPILL_FILENAME
+        if getattr(bot, "worker_id", None) is not None:
+            # one spill file per worker process
+            spill_name = spill_name.replace(".jsonl", f".{bot.worker_id}.jsonl")
+        db_path = get_config().db_path
+        spill_dir = "." if is_url(db_path) else os.path.dirname(db_path) or "."
+        self.spill_path = os.path.join(spill_dir, spill_name)
+        self._next_replay = 0.0
+        self.flusher.start()
+
+    async def cog_unload(self):
+        self.flusher.cancel()
+        await self.flush()
 
     async def log(self, guild:discord.Guild, message:str):
-        cfg=get_config()
-        channel = guild.get_channel(cfg.log_channel_id)
-        if channel:
+        """Queue a log line; never waits on Discord."""
+        self.enqueue(guild.id, message)
+
+    def enqueue(self, guild_id:int, message:str):
+        try:
+            self.queue.put_nowait((guild_id, message))
+        except asyncio.QueueFull:
+            if len(self._overflow) >= LOG_OVERFLOW_LIMIT:
+                metrics.incr("log_dropped", reason="overflow")
+                return
+            self._overflow.append((guild_id, message))
+            metrics.incr("log_overflow")
+
+    @tasks.loop(seconds=LOG_FLUSH_SECONDS)
+    async def flusher(self):
+        await self.flush()
+
+    @flusher.before_loop
+    async def before_flusher(self):
+        await self.bot.wait_until_ready()
+
+    async def flush(self):
+        entries = []
+        while not self.queue.empty():
+            entries.append(self.queue.get_nowait())
+        entries.extend(self._overflow)
+        self._overflow = []
+        if time.monotonic() >= self._next_replay and os.path.exists(self.spill_path):
+            self._next_replay = time.monotonic() + SPILL_REPLAY_SECONDS
+            entries = await asyncio.to_thread(self._read_spill) + entries
+        if not entries:
+            return
+        by_guild: dict[int, list[str]] = {}
+        for guild_id, message in entries:
+            by_guild.setdefault(guild_id, []).append(message)
+        failed = []
+        for guild_id, lines in by_guild.items():
+            guild = self.bot.get_guild(guild_id)
+            channel = guild.get_channel(get_config(guild_id).log_channel_id) if guild else None
+            if channel is None:
+                # nowhere to post; spilling would only replay these forever
+                metrics.incr("log_dropped", len(lines), reason="no_channel")
+                continue
+            groups = pack_messages(lines)
+            for i, group in enumerate(groups):
+                try:
+                    await channel.send("\n".join(group))
+                    metrics.incr("log_messages_sent")
+                except discord.HTTPException:
+                    failed.extend((guild_id, line) for g in groups[i:] for line in g)
+                    break
+        if failed:
+            await asyncio.to_thread(self._write_spill, failed)
+
+    def _read_spill(self) -> list[tuple[int, str]]:
+        with open(self.spill_path, encoding="utf-8") as f:
+            lines = f.readlines()
+        head, rest = lines[:SPILL_REPLAY_LINES], lines[SPILL_REPLAY_LINES:]
+        if rest:
+            with open(self.spill_path, "w", encoding="utf-8") as f:
+                f.writelines(rest)
+        else:
+            os.remove(self.spill_path)
+        entries = []
+        for raw in head:
             try:
-                await channel.send(message[:2000])
-            except discord.HTTPException:
-                pass
+                item = json.loads(raw)
+                entries.append((item["guild_id"], item["message"]))
+            except (ValueError, KeyError):
+                continue
+        return entries
+
+    def _write_spill(self, entries:list[tuple[int, str]]):
+        now = int(time.time())
+        with open(self.spill_path, "a", encoding="utf-8") as f:
+            for guild_id, message in entries:
+                f.write(json.dumps({"guild_id": guild_id, "message": message, "at": now}) + "\n")
+        metrics.incr("log_spilled", len(entries))
 
 async def setup(bot):
-    await bot.add_cog(LoggingCog(bot))
\ No newline at end of file
+    await bot.add_cog(LoggingCog(bot))
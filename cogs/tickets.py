@@ -1,15 +1,22 @@
 import asyncio
+import logging
 import time
-from rapidfuzz import fuzz
 import discord
 from discord.ext import commands, tasks
-from config import get_config, update_runtime_config
+from config import get_config
 from database import Database
-from transcripts import build_transcript_files
-from utils.permissions import is_admin, can_manage_ticket, escalate_role
+from utils.permissions import is_admin, has_admin_role, can_manage_ticket, escalate_role, admin_index
 from utils.metrics import metrics
+from utils.ratelimit import RateLimiter
+from utils.membership import membership
+from utils.tracing import tracer
 
-ADMIN_ADD_CONCURRENCY = 4
+STALE_BATCH_SIZE = 50
+STALE_CONCURRENCY = 4
+STALE_ACTIONS_PER_SECOND = 2
+PURGE_BATCH_SIZE = 100
+PURGE_DELETES_PER_SECOND = 2
+DUPLICATE_MATCHES = 3
 
 STATUS_PREFIXES = {
     "solved": "[Solved]",
@@ -23,6 +30,8 @@ IN_PROGRESS_REACTION = "🛠️"
 RESOLUTION_EMOJIS = {"✅":"solved","❌":"rejected"}
 DEFAULT_TIMEOUT_STATUS = "closed"
 
+log = logging.getLogger(__name__)
+
 HELP_PAGES = [
 "Page 1: /ticket_open, /ticket_close, /ticket_reopen",
 "Page 2: /ticket_claim, /ticket_unclaim, /ticket_adduser, /ticket_removeuser",
@@ -43,35 +52,12 @@ class TicketCog(commands.Cog):
         self.stale_checker.cancel()
         self.archive_purge.cancel()
 
-    async def add_admins(self, thread: discord.Thread):
-        cfg = get_config()
-        guild = thread.guild
-        members = []
-        for rid in cfg.admin_role_ids:
-            role = guild.get_role(rid)
-            if role:
-                members.extend([m for m in role.members if not m.bot])
-        unique = {m.id:m for m in members}
-        sem = asyncio.Semaphore(ADMIN_ADD_CONCURRENCY)
-        async def add_user(member):
-            async with sem:
-                try:
-                    await thread.add_user(member)
-                except discord.HTTPException:
-                    pass
-        await asyncio.gather(*[add_user(m) for m in unique.values()])
-
-    async def remove_admins(self, thread: discord.Thread):
-        cfg=get_config()
-        guild=thread.guild
-        for rid in cfg.admin_role_ids:
-            role=guild.get_role(rid)
-            if not role: continue
-            for member in role.members:
-                try:
-                    await thread.remove_user(member)
-                except discord.HTTPException:
-                    pass
+    async def add_admins(self, thread: discord.Thread, present: set[int] | None = None):
+        """Add staff to a thread. Pass `present` when membership is already known (e.g. a new thread)."""
+        await membership.add(thread, admin_index.staff_members(thread.guild), present)
+
+    async def remove_admins(self, thread: discord.Thread, present: set[int] | None = None):
+        await membership.remove(thread, admin_index.staff_members(thread.guild), present)
 
     def normalize_name(self, name:str, target_status:str):
         base = name
@@ -82,7 +68,7 @@ class TicketCog(commands.Cog):
         return f"{new_pref} {base}" if new_pref else base
 
     def is_public(self, thread:discord.Thread):
-        cfg=get_config()
+        cfg=get_config(thread.guild.id)
         return thread.parent and thread.parent.id == cfg.public_channel_id and not thread.is_private()
 
     async def ensure_ticket_record(self, thread:discord.Thread, creator_id:int, is_private:bool, title:str):
@@ -91,25 +77,28 @@ class TicketCog(commands.Cog):
             await self.db.create_ticket(thread.guild.id, thread.id, creator_id, is_private, title)
             metrics.incr("tickets_created")
 
-    async def duplicate_check(self, guild:discord.Guild, title:str):
-        rows = await self.db.fetchall("SELECT title FROM tickets WHERE guild_id=? ORDER BY id DESC LIMIT 25", guild.id)
-        for (existing,) in rows:
-            score = fuzz.token_set_ratio(title, existing)/100
-            if score >= get_config().duplicate_similarity:
-                return existing, score
-        return None,0
+    async def duplicate_check(self, guild:discord.Guild, title:str, limit:int=DUPLICATE_MATCHES):
+        """Best matching earlier tickets as (title, thread_id, score), highest score first."""
+        return self.db.titles.search(guild.id, title, get_config(guild.id).duplicate_similarity, limit)
 
     async def send_log(self, guild:discord.Guild, msg:str):
         cog = self.bot.get_cog("LoggingCog")
         if cog:
             await cog.log(guild, msg)
 
+    async def queue_transcript(self, thread:discord.Thread):
+        jobs = getattr(self.bot, "transcript_jobs", None)
+        if jobs:
+            await jobs.enqueue(thread.guild.id, thread.id)
+
     # Commands
     @commands.hybrid_command(name="ticket_open", description="Open a private (support channel) or public ticket.")
     @commands.cooldown(2, 30, commands.BucketType.user)
     async def ticket_open(self, ctx: commands.Context, *, title: str):
-        cfg=get_config()
-        if await self.db.is_blacklisted(ctx.guild.id, ctx.author.id):
+        cfg=get_config(ctx.guild.id)
+        with tracer.span("is_blacklisted"):
+            blacklisted = await self.db.is_blacklisted(ctx.guild.id, ctx.author.id)
+        if blacklisted:
             return await ctx.reply("You are blacklisted from creating tickets.")
         if not title.strip():
             return await ctx.reply("Provide a title.")
@@ -119,21 +108,28 @@ class TicketCog(commands.Cog):
         is_private = ctx.channel.id == cfg.support_channel_id
         if not (is_private or ctx.channel.id == cfg.public_channel_id):
             return await ctx.reply("Use in configured public or support channel.")
-        dup,score = await self.duplicate_check(ctx.guild, title)
-        dup_msg = f" (Possible duplicate of '{dup}' score {score:.2f})" if dup else ""
+        with tracer.span("duplicate_check"):
+            dups = await self.duplicate_check(ctx.guild, title)
+        dup_msg = f" (Possible duplicate of {', '.join(f'<#{tid}> {dup!r} score {score:.2f}' for dup, tid, score in dups)})" if dups else ""
         if is_private:
-            thread = await ctx.channel.create_thread(name=title, type=discord.ChannelType.private_thread, reason=f"Private ticket by {ctx.author}")
-            await thread.add_user(ctx.author)
-            await self.add_admins(thread)
+            with tracer.span("create_thread"):
+                thread = await ctx.channel.create_thread(name=title, type=discord.ChannelType.private_thread, reason=f"Private ticket by {ctx.author}")
+                await thread.add_user(ctx.author)
+            with tracer.span("add_admins"):
+                await self.add_admins(thread, present={ctx.author.id, self.bot.user.id})
             await thread.send(f"Hello {ctx.author.mention}, please describe your issue.{dup_msg}")
-            await self.ensure_ticket_record(thread, ctx.author.id, True, title)
+            with tracer.span("ensure_ticket_record"):
+                await self.ensure_ticket_record(thread, ctx.author.id, True, title)
             await self.send_log(ctx.guild, f"Private ticket opened {thread.mention} by {ctx.author} ({ctx.author.id}).")
             await ctx.reply(f"Private ticket created: {thread.mention}{dup_msg}")
         else:
-            thread = await ctx.channel.create_thread(name=title, type=discord.ChannelType.public_thread, reason=f"Public ticket by {ctx.author}")
-            await self.add_admins(thread)
+            with tracer.span("create_thread"):
+                thread = await ctx.channel.create_thread(name=title, type=discord.ChannelType.public_thread, reason=f"Public ticket by {ctx.author}")
+            with tracer.span("add_admins"):
+                await self.add_admins(thread, present={self.bot.user.id})
             await thread.send(f"Thread created by {ctx.author.mention}.{dup_msg}")
-            await self.ensure_ticket_record(thread, ctx.author.id, False, title)
+            with tracer.span("ensure_ticket_record"):
+                await self.ensure_ticket_record(thread, ctx.author.id, False, title)
             await self.send_log(ctx.guild, f"Public ticket opened {thread.mention} by {ctx.author} ({ctx.author.id}).")
             await ctx.reply(f"Public ticket thread: {thread.mention}{dup_msg}")
 
@@ -145,8 +141,8 @@ class TicketCog(commands.Cog):
         record = await self.db.get_ticket_by_thread(thread.id)
         if not record:
             return await ctx.reply("Not managed.")
-        creator_id = record[3]
-        is_private = record[4]==1
+        creator_id = record.creator_id
+        is_private = record.is_private
         if not can_manage_ticket(ctx.author, thread, creator_id):
             return await ctx.reply("No permission.")
         await ctx.reply("Confirm close? Reply 'yes' in 15s.")
@@ -167,10 +163,7 @@ class TicketCog(commands.Cog):
             await thread.edit(locked=True, archived=True)
             await self.db.close_ticket(thread.id, "closed")
             await self.send_log(thread.guild, f"Private ticket closed {thread.name} ({thread.id}) by {ctx.author}.")
-            files = await build_transcript_files(thread)
-            log_channel = thread.guild.get_channel(get_config().log_channel_id)
-            if log_channel:
-                await log_channel.send(f"Transcript for {thread.name}", files=files)
+            await self.queue_transcript(thread)
             return await ctx.reply("Private ticket closed.")
         # public
         await self.remove_admins(thread)
@@ -192,10 +185,7 @@ class TicketCog(commands.Cog):
         await thread.edit(name=new_name, archived=True, locked=True)
         await self.db.close_ticket(thread.id, status_key)
         await self.send_log(thread.guild, f"Public ticket {thread.name} resolved as {status_key} by {ctx.author}.")
-        files = await build_transcript_files(thread)
-        log_channel = thread.guild.get_channel(get_config().log_channel_id)
-        if log_channel:
-            await log_channel.send(f"Transcript for {thread.name}", files=files)
+        await self.queue_transcript(thread)
 
     @commands.hybrid_command(name="ticket_reopen", description="Reopen public ticket.")
     async def ticket_reopen(self, ctx: commands.Context, *, reason: str = "No reason provided"):
@@ -204,11 +194,11 @@ class TicketCog(commands.Cog):
         thread=ctx.channel
         record = await self.db.get_ticket_by_thread(thread.id)
         if not record: return await ctx.reply("Not managed.")
-        if record[4]==1: return await ctx.reply("Private tickets cannot be reopened.")
-        creator_id = record[3]
+        if record.is_private: return await ctx.reply("Private tickets cannot be reopened.")
+        creator_id = record.creator_id
         if not can_manage_ticket(ctx.author, thread, creator_id):
             return await ctx.reply("No permission.")
-        if record[5] in ("open", "in_progress"):
+        if record.is_open:
             return await ctx.reply("Already open.")
         await thread.edit(archived=False, locked=False)
         new_name = self.normalize_name(thread.name, "open")
@@ -226,9 +216,9 @@ class TicketCog(commands.Cog):
             return await ctx.reply("Staff only.")
         record = await self.db.get_ticket_by_thread(ctx.channel.id)
         if not record: return await ctx.reply("Not managed.")
-        if record[10]: # claimed_by
-            claimer = ctx.guild.get_member(record[10])
-            claimer_name = claimer.display_name if claimer else f"User {record[10]}"
+        if record.claimed_by:
+            claimer = ctx.guild.get_member(record.claimed_by)
+            claimer_name = claimer.display_name if claimer else f"User {record.claimed_by}"
             return await ctx.reply(f"Already claimed by {claimer_name}.")
         await self.db.set_claim(ctx.channel.id, ctx.author.id)
         await ctx.reply(f"Ticket claimed by {ctx.author.mention}.")
@@ -242,9 +232,9 @@ class TicketCog(commands.Cog):
             return await ctx.reply("Staff only.")
         record = await self.db.get_ticket_by_thread(ctx.channel.id)
         if not record: return await ctx.reply("Not managed.")
-        if not record[10]:
+        if not record.claimed_by:
             return await ctx.reply("Not claimed.")
-        if record[10] != ctx.author.id and not ctx.author.guild_permissions.administrator:
+        if record.claimed_by != ctx.author.id and not ctx.author.guild_permissions.administrator:
             return await ctx.reply("Can only unclaim your own tickets (unless admin).")
         await self.db.set_claim(ctx.channel.id, None)
         await ctx.reply("Ticket unclaimed.")
@@ -258,7 +248,7 @@ class TicketCog(commands.Cog):
             return await ctx.reply("Staff only.")
         record = await self.db.get_ticket_by_thread(ctx.channel.id)
         if not record: return await ctx.reply("Not managed.")
-        if record[4] != 1: return await ctx.reply("Private tickets only.")
+        if not record.is_private: return await ctx.reply("Private tickets only.")
         try:
             await ctx.channel.add_user(member)
             await ctx.reply(f"Added {member.mention} to ticket.")
@@ -274,8 +264,8 @@ class TicketCog(commands.Cog):
             return await ctx.reply("Staff only.")
         record = await self.db.get_ticket_by_thread(ctx.channel.id)
         if not record: return await ctx.reply("Not managed.")
-        if record[4] != 1: return await ctx.reply("Private tickets only.")
-        if member.id == record[3]:
+        if not record.is_private: return await ctx.reply("Private tickets only.")
+        if member.id == record.creator_id:
             return await ctx.reply("Cannot remove ticket creator.")
         try:
             await ctx.channel.remove_user(member)
@@ -291,9 +281,9 @@ class TicketCog(commands.Cog):
             return await ctx.reply("No open tickets.")
         lines = []
         for ticket in tickets[:10]:  # limit display
-            thread = ctx.guild.get_thread(ticket[2])
-            thread_name = thread.name if thread else f"Thread {ticket[2]}"
-            lines.append(f"• {thread_name} ({ticket[5]})")
+            thread = ctx.guild.get_thread(ticket.thread_id)
+            thread_name = thread.name if thread else f"Thread {ticket.thread_id}"
+            lines.append(f"• {thread_name} ({ticket.status})")
         embed = discord.Embed(title="Your Open Tickets", description="\n".join(lines), color=0x3498db)
         await ctx.reply(embed=embed, ephemeral=True if hasattr(ctx,"interaction") else False)
 
@@ -336,26 +326,24 @@ class TicketCog(commands.Cog):
             return await ctx.reply("Already private.")
         record = await self.db.get_ticket_by_thread(ctx.channel.id)
         if not record: return await ctx.reply("Not managed.")
-        if record[4] == 1: return await ctx.reply("Already marked as private.")
+        if record.is_private: return await ctx.reply("Already marked as private.")
         
         # Update database
-        await self.db.execute("UPDATE tickets SET is_private=1 WHERE thread_id=?", ctx.channel.id)
+        await self.db.set_private(ctx.channel.id)
         
         # Remove non-essential users (keep creator and admins)
-        creator = ctx.guild.get_member(record[3])
-        admin_role_ids = set(get_config().admin_role_ids)
-        
-        for member in ctx.channel.members:
-            if member.bot:
+        present = await membership.current_members(ctx.channel)
+        strip = []
+        for member_id in present:
+            member = ctx.guild.get_member(member_id)
+            if member is None or member.bot:
                 continue
-            if member.id == record[3]:  # creator
+            if member.id == record.creator_id:  # creator
                 continue
-            if any(r.id in admin_role_ids for r in member.roles):  # admin
+            if has_admin_role(member):  # admin
                 continue
-            try:
-                await ctx.channel.remove_user(member)
-            except discord.HTTPException:
-                pass
+            strip.append(member)
+        await membership.remove(ctx.channel, strip, present)
         
         await ctx.reply("Converted to private ticket.")
         await self.send_log(ctx.guild, f"Ticket {ctx.channel.mention} converted to private by {ctx.author}.")
@@ -371,7 +359,7 @@ class TicketCog(commands.Cog):
         if not escalation:
             return await ctx.reply("No escalation role configured.")
         
-        creator_id = record[3]
+        creator_id = record.creator_id
         if not can_manage_ticket(ctx.author, ctx.channel, creator_id):
             return await ctx.reply("No permission.")
         
@@ -401,23 +389,153 @@ class TicketCog(commands.Cog):
         # This is a placeholder for background admin refresh logic
         pass
 
-    @tasks.loop(hours=12)
+    @tasks.loop(hours=1)
     async def stale_checker(self):
-        """Check for stale tickets and send notifications"""
-        # This is a placeholder for stale ticket detection logic
-        pass
+        """Remind idle tickets once, then auto-close them if nobody replies"""
+        limiter = RateLimiter(STALE_CONCURRENCY, STALE_ACTIONS_PER_SECOND)
+        for guild in self.bot.guilds:
+            try:
+                await self.check_stale(guild, limiter)
+            except Exception:
+                log.exception("stale check failed for guild %s", guild.id)
+
+    async def check_stale(self, guild:discord.Guild, limiter:RateLimiter):
+        cfg = get_config(guild.id)
+        now = int(time.time())
+        warn = cfg.reminder_hours * 3600
+        public_close = now - cfg.stale_public_days * 86400
+        private_close = now - cfg.stale_private_days * 86400
+        reminders, closes = [], []
+        for thread_id, is_private, last_at, reminded_at in await self.db.tickets_stale(
+                guild.id, public_close + warn, private_close + warn):
+            if not reminded_at or reminded_at < last_at:
+                reminders.append(thread_id)
+            elif last_at < (private_close if is_private else public_close) and reminded_at <= now - warn:
+                closes.append(thread_id)
+        for i in range(0, len(reminders), STALE_BATCH_SIZE):
+            batch = reminders[i:i+STALE_BATCH_SIZE]
+            sent = await asyncio.gather(*[self._stale_action(self.remind_stale, guild, t, limiter) for t in batch])
+            await self.db.mark_reminded([t for t, ok in zip(batch, sent) if ok])
+        for i in range(0, len(closes), STALE_BATCH_SIZE):
+            batch = closes[i:i+STALE_BATCH_SIZE]
+            await asyncio.gather(*[self._stale_action(self.auto_close, guild, t, limiter) for t in batch])
+        if reminders or closes:
+            await self.send_log(guild, f"Stale check: {len(reminders)} reminded, {len(closes)} auto-closed.")
+
+    async def _stale_action(self, action, guild:discord.Guild, thread_id:int, limiter:RateLimiter) -> bool:
+        try:
+            async with limiter:
+                await action(guild, thread_id)
+            return True
+        except discord.HTTPException as e:
+            log.warning("stale action %s failed for thread %s: %s", action.__name__, thread_id, e)
+            return False
+
+    async def _resolve_thread(self, guild:discord.Guild, thread_id:int) -> discord.Thread | None:
+        thread = guild.get_thread(thread_id)
+        if thread:
+            return thread
+        try:
+            return await self.bot.fetch_channel(thread_id)
+        except discord.NotFound:
+            return None
+
+    async def remind_stale(self, guild:discord.Guild, thread_id:int):
+        thread = await self._resolve_thread(guild, thread_id)
+        record = await self.db.get_ticket_by_thread(thread_id)
+        if not thread or not record:
+            return
+        await thread.send(f"<@{record.creator_id}> this ticket has been inactive and will be closed in "
+                          f"{get_config(guild.id).reminder_hours}h unless someone replies.")
+
+    async def auto_close(self, guild:discord.Guild, thread_id:int):
+        thread = await self._resolve_thread(guild, thread_id)
+        if thread is None:
+            await self.db.close_ticket(thread_id, DEFAULT_TIMEOUT_STATUS)
+            return
+        record = await self.db.get_ticket_by_thread(thread_id)
+        await thread.send("Closing this ticket due to inactivity.")
+        if record and record.is_private:
+            await self.remove_admins(thread)
+            creator = guild.get_member(record.creator_id)
+            if creator:
+                try: await thread.remove_user(creator)
+                except discord.HTTPException: pass
+            await thread.edit(locked=True, archived=True)
+        else:
+            await thread.edit(name=self.normalize_name(thread.name, DEFAULT_TIMEOUT_STATUS), locked=True, archived=True)
+        await self.db.close_ticket(thread_id, DEFAULT_TIMEOUT_STATUS)
+        await self.queue_transcript(thread)
 
     @tasks.loop(hours=24)
     async def archive_purge(self):
         """Archive and purge old closed tickets"""
-        # This is a placeholder for archival logic
-        pass
+        for guild in self.bot.guilds:
+            try:
+                await self.purge_guild(guild)
+            except Exception:
+                log.exception("archive purge failed for guild %s", guild.id)
+
+    async def purge_guild(self, guild:discord.Guild):
+        """Page through purge candidates by (closed_at, id), checkpointing after every
+        page so an interrupted run resumes where it stopped."""
+        cfg = get_config(guild.id)
+        checkpoint = await self.db.get_purge_checkpoint(guild.id)
+        if checkpoint:
+            cutoff, *position = checkpoint
+        else:
+            cutoff, position = int(time.time()) - cfg.auto_purge_days * 86400, (0, 0)
+        limiter = RateLimiter(max(1, cfg.purge_concurrency), PURGE_DELETES_PER_SECOND)
+        purged = 0
+        while True:
+            rows = await self.db.archive_purge_candidates(guild.id, cutoff, tuple(position), PURGE_BATCH_SIZE)
+            if not rows:
+                break
+            thread_ids = [thread_id for _, thread_id, _ in rows]
+            jobs = getattr(self.bot, "transcript_jobs", None)
+            archived = await jobs.settled(thread_ids) if jobs else set(thread_ids)
+            done = await asyncio.gather(*[self._purge_thread(guild, t, t in archived, limiter) for t in thread_ids])
+            removed = [t for t, ok in zip(thread_ids, done) if ok]
+            await self.db.delete_tickets(removed)
+            purged += len(removed)
+            last_id, _, last_closed_at = rows[-1]
+            position = (last_closed_at, last_id)
+            await self.db.save_purge_checkpoint(guild.id, cutoff, last_closed_at, last_id)
+        await self.db.clear_purge_checkpoint(guild.id)
+        if purged:
+            await self.send_log(guild, f"Archive purge: removed {purged} tickets closed over {cfg.auto_purge_days} days ago.")
+
+    async def _purge_thread(self, guild:discord.Guild, thread_id:int, archived:bool, limiter:RateLimiter) -> bool:
+        """Upload the transcript if it never was, then delete the thread. True when the ticket can be dropped.
+        A transient upload error keeps the thread for the next purge; a missing log channel or a
+        Forbidden upload never goes away, so the thread is purged without a transcript."""
+        try:
+            async with limiter:
+                thread = await self._resolve_thread(guild, thread_id)
+                if thread is None:
+                    return True
+                if not archived:
+                    try:
+                        posted = await self.bot.transcript_jobs.upload(thread_id)
+                    except discord.Forbidden as e:
+                        posted = False
+                        log.warning("transcript of thread %s cannot be uploaded: %s", thread_id, e)
+                    if not posted:
+                        log.info("purging thread %s without a transcript", thread_id)
+                await thread.delete()
+            return True
+        except discord.NotFound:
+            return True
+        except discord.HTTPException as e:
+            log.warning("purge of thread %s failed: %s", thread_id, e)
+            return False
 
     @refresh_admins.before_loop
     @stale_checker.before_loop
     @archive_purge.before_loop
     async def before_background_tasks(self):
         await self.bot.wait_until_ready()
+        await self.db.ready.wait()
 
     # Event handlers
     @commands.Cog.listener()
@@ -425,7 +543,7 @@ class TicketCog(commands.Cog):
         if message.author.bot:
             return
         if isinstance(message.channel, discord.Thread):
-            # Update last user message timestamp
+            # Buffered write-behind; flushed in batches by Database.activity
             await self.db.update_last_user_message(message.channel.id)
 
 async def setup(bot):
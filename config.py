@@ -1,17 +1,18 @@
 import os
-from dataclasses import dataclass
+from dataclasses import dataclass, field, replace
+from types import MappingProxyType
 from dotenv import load_dotenv
-from typing import List
+from typing import Dict, Mapping, Tuple
 
 load_dotenv()
 
-@dataclass
+@dataclass(frozen=True)
 class RuntimeConfig:
     bot_token: str
     public_channel_id: int
     support_channel_id: int
     log_channel_id: int
-    admin_role_ids: List[int]
+    admin_role_ids: Tuple[int, ...]
     escalation_role_id: int | None
     db_path: str
     allow_anon_public: bool
@@ -25,6 +26,17 @@ class RuntimeConfig:
     duplicate_similarity: float
     anonymize_public: bool = False
     in_progress_emoji: str = "🛠️"
+    purge_concurrency: int = 3
+    metrics_port: int = 0
+    log_file: str = ""
+    log_max_bytes: int = 10 * 1024 * 1024
+    log_backups: int = 5
+    log_sample_rates: Mapping[str, float] = field(default_factory=lambda: MappingProxyType({"discord.gateway": 0.1}))
+    db_pool_size: int = 10
+    shard_mode: str = "single"
+    shard_count: int = 0
+    worker_processes: int = 0
+    analytics_workers: int = 1
 
     def to_dict(self):
         return {
@@ -32,9 +44,32 @@ class RuntimeConfig:
             "in_progress_emoji": self.in_progress_emoji,
             "duplicate_similarity": self.duplicate_similarity,
             "ticket_cooldown_seconds": self.ticket_cooldown_seconds,
+            "public_channel_id": self.public_channel_id,
+            "support_channel_id": self.support_channel_id,
+            "log_channel_id": self.log_channel_id,
+            "allow_anon_public": self.allow_anon_public,
+            "dm_on_close": self.dm_on_close,
+            "stale_public_days": self.stale_public_days,
+            "stale_private_days": self.stale_private_days,
+            "reminder_hours": self.reminder_hours,
+            "auto_purge_days": self.auto_purge_days,
+            "max_title_len": self.max_title_len,
         }
 
 _config: RuntimeConfig | None = None
+# Per-guild effective config snapshots. They are frozen and shared, only ever replaced.
+_guild_configs: Dict[int, RuntimeConfig] = {}
+_guild_overrides: Dict[int, Dict[str, object]] = {}
+
+def _parse_rates(raw:str) -> Dict[str, float]:
+    rates = {}
+    for part in raw.split(","):
+        name, _, rate = part.partition("=")
+        try:
+            rates[name.strip()] = float(rate)
+        except ValueError:
+            continue
+    return rates
 
 def load_config() -> RuntimeConfig:
     global _config
@@ -45,7 +80,7 @@ def load_config() -> RuntimeConfig:
         public_channel_id = int(os.getenv("PUBLIC_CHANNEL_ID","0")),
         support_channel_id = int(os.getenv("SUPPORT_CHANNEL_ID","0")),
         log_channel_id = int(os.getenv("LOG_CHANNEL_ID","0")),
-        admin_role_ids = [int(r.strip()) for r in os.getenv("ADMIN_ROLE_IDS","" ).split(",") if r.strip().isdigit()],
+        admin_role_ids = tuple(int(r.strip()) for r in os.getenv("ADMIN_ROLE_IDS","" ).split(",") if r.strip().isdigit()),
         escalation_role_id = int(os.getenv("ESCALATION_ROLE_ID","0")) or None,
         db_path = os.getenv("DB_PATH","./tickets.db"),
         allow_anon_public = os.getenv("ALLOW_ANON_PUBLIC","0") == "1",
@@ -57,14 +92,71 @@ def load_config() -> RuntimeConfig:
         max_title_len = int(os.getenv("MAX_TITLE_LEN","90")),
         ticket_cooldown_seconds = int(os.getenv("TICKET_COOLDOWN_SECONDS","120")),
         duplicate_similarity = float(os.getenv("DUPLICATE_SIMILARITY","0.78")),
+        purge_concurrency = int(os.getenv("PURGE_CONCURRENCY","3")),
+        metrics_port = int(os.getenv("METRICS_PORT","0")),
+        log_file = os.getenv("LOG_FILE",""),
+        log_max_bytes = int(os.getenv("LOG_MAX_BYTES",str(10*1024*1024))),
+        log_backups = int(os.getenv("LOG_BACKUPS","5")),
+        log_sample_rates = MappingProxyType(_parse_rates(os.getenv("LOG_SAMPLE_RATES","discord.gateway=0.1"))),
+        db_pool_size = int(os.getenv("DB_POOL_SIZE","10")),
+        shard_mode = os.getenv("SHARD_MODE","single").lower(),
+        shard_count = int(os.getenv("SHARD_COUNT","0")),
+        worker_processes = int(os.getenv("WORKER_PROCESSES","0")),
+        analytics_workers = int(os.getenv("ANALYTICS_WORKERS","1")),
     )
     return _config
 
-def get_config():
-    return load_config()
+def get_config(guild_id:int|None=None) -> RuntimeConfig:
+    """Effective config for a guild (global config when the guild has no overrides)."""
+    if guild_id is not None:
+        cfg = _guild_configs.get(guild_id)
+        if cfg is not None:
+            return cfg
+    return _config or load_config()
+
+def coerce_value(key:str, raw:str):
+    """Convert a raw string to the type of the existing config value; raises ValueError."""
+    current = getattr(get_config(), key)
+    if isinstance(current, bool):
+        return raw.lower() in ('true', '1', 'yes', 'on')
+    if isinstance(current, int):
+        return int(raw)
+    if isinstance(current, float):
+        return float(raw)
+    return raw
+
+def _rebuild(guild_id:int):
+    overrides = _guild_overrides.get(guild_id)
+    if overrides:
+        _guild_configs[guild_id] = replace(get_config(), **overrides)
+    else:
+        _guild_configs.pop(guild_id, None)
+
+def apply_overrides(rows):
+    """Build every guild's snapshot from stored (guild_id, key, value) rows."""
+    overridable = get_config().to_dict()
+    for guild_id, key, value in rows:
+        if key not in overridable:
+            continue
+        try:
+            _guild_overrides.setdefault(guild_id, {})[key] = coerce_value(key, value)
+        except ValueError:
+            continue
+    for guild_id in _guild_overrides:
+        _rebuild(guild_id)
+
+def _freeze(value):
+    # snapshots share their values, so containers are stored immutable
+    if isinstance(value, (list, set, frozenset)):
+        return tuple(value)
+    if isinstance(value, dict):
+        return MappingProxyType(dict(value))
+    return value
+
+def set_guild_override(guild_id:int, key:str, value):
+    _guild_overrides.setdefault(guild_id, {})[key] = _freeze(value)
+    _rebuild(guild_id)
 
-def update_runtime_config(**kwargs):
-    cfg = get_config()
-    for k,v in kwargs.items():
-        if hasattr(cfg,k):
-            setattr(cfg,k,v)
\ No newline at end of file
+def clear_guild_override(guild_id:int, key:str):
+    _guild_overrides.get(guild_id, {}).pop(key, None)
+    _rebuild(guild_id)
\ No newline at end of file
@@ -1,119 +1,462 @@
-import aiosqlite
 import asyncio
+import logging
 import time
+from collections import Counter
+import ticket_stats
+from blacklist_cache import BlacklistCache
+from registry import OPEN_STATUSES, Ticket, TicketRegistry
+from storage import open_backend
+from ticket_stats import TicketStats
+from title_index import TitleIndex
+from utils.metrics import metrics
+from utils.sharding import ShardScope
 
-INIT_SQL = """
-CREATE TABLE IF NOT EXISTS tickets (
-  id INTEGER PRIMARY KEY AUTOINCREMENT,
-  guild_id INTEGER NOT NULL,
-  thread_id INTEGER NOT NULL UNIQUE,
-  creator_id INTEGER NOT NULL,
-  is_private INTEGER NOT NULL,
-  status TEXT NOT NULL,
-  title TEXT NOT NULL,
-  created_at INTEGER NOT NULL,
-  updated_at INTEGER NOT NULL,
-  claimed_by INTEGER,
-  last_user_message_at INTEGER,
-  closed_at INTEGER
-);
-
-CREATE TABLE IF NOT EXISTS config_overrides (
-  guild_id INTEGER NOT NULL,
-  key TEXT NOT NULL,
-  value TEXT NOT NULL,
-  PRIMARY KEY (guild_id,key)
-);
-
-CREATE TABLE IF NOT EXISTS blacklist (
-  guild_id INTEGER NOT NULL,
-  user_id INTEGER NOT NULL,
-  reason TEXT,
-  PRIMARY KEY (guild_id,user_id)
-);
-"""
+ACTIVITY_FLUSH_SECONDS = 5
+ACTIVITY_FLUSH_THRESHOLD = 500
+NON_TICKET_CACHE_SIZE = 10_000
+SQL_VARIABLE_CHUNK = 900
+BLACKLIST_SWEEP_SECONDS = 60
+STATS_REBUILD_BATCH = 50_000
 
+STATS_UPSERT = """INSERT INTO ticket_stats (guild_id,metric,key,bucket,count) VALUES {values}
+    ON CONFLICT(guild_id,metric,key,bucket) DO UPDATE SET count=ticket_stats.count+excluded.count"""
+
+log = logging.getLogger(__name__)
+
+# queries on the hot path; Database.init warns when one of them plans as a table scan
+HOT_QUERIES = {
+    "open_tickets": "SELECT * FROM tickets WHERE status IN ('open','in_progress')",
+    "count_by_status": "SELECT status, COUNT(*) FROM tickets WHERE guild_id=? GROUP BY status",
+    "tickets_stale": """SELECT t.thread_id, t.is_private, t.last_user_message_at, r.reminded_at
+        FROM tickets t LEFT JOIN ticket_reminders r ON r.thread_id = t.thread_id
+        WHERE t.guild_id=? AND t.is_private=0 AND t.status IN ('open','in_progress') AND t.last_user_message_at < ?
+        UNION ALL
+        SELECT t.thread_id, t.is_private, t.last_user_message_at, r.reminded_at
+        FROM tickets t LEFT JOIN ticket_reminders r ON r.thread_id = t.thread_id
+        WHERE t.guild_id=? AND t.is_private=1 AND t.status IN ('open','in_progress') AND t.last_user_message_at < ?""",
+    "archive_purge_candidates": """SELECT id, thread_id, closed_at FROM tickets
+        WHERE guild_id=? AND closed_at < ? AND (closed_at, id) > (?, ?)
+        AND status IN ('closed','solved','rejected')
+        ORDER BY closed_at, id LIMIT ?""",
+    "transcripts_settled": "SELECT DISTINCT thread_id FROM transcript_jobs WHERE status IN ('done','failed') AND thread_id IN (?)",
+}
+
+class ActivityBuffer:
+    """Write-behind buffer for last_user_message_at. Keeps only the newest
+    timestamp per thread and writes them out in a single executemany transaction."""
+
+    def __init__(self, db: "Database", interval: float = ACTIVITY_FLUSH_SECONDS,
+                 threshold: int = ACTIVITY_FLUSH_THRESHOLD):
+        self.db = db
+        self.interval = interval
+        self.threshold = threshold
+        self.pending: dict[int, int] = {}
+        self.non_tickets: set[int] = set()
+        self._inflight: dict[int, int] = {}
+        self._flush_lock = asyncio.Lock()
+        self._task: asyncio.Task | None = None
+        self._flush_task: asyncio.Task | None = None
+
+    def record(self, thread_id: int, ts: int):
+        if thread_id in self.non_tickets:
+            return
+        ticket = self.db.registry.peek(thread_id)
+        if ticket:
+            ticket.last_user_message_at = ticket.updated_at = ts
+        self.pending[thread_id] = ts
+        if len(self.pending) >= self.threshold and not self._flush_lock.locked() \
+                and (self._flush_task is None or self._flush_task.done()):
+            self._flush_task = asyncio.create_task(self.flush())
+            self._flush_task.add_done_callback(self._flushed)
+
+    @staticmethod
+    def _flushed(task: asyncio.Task):
+        if not task.cancelled() and task.exception():
+            log.error("activity flush failed", exc_info=task.exception())
+
+    def get(self, thread_id: int) -> int | None:
+        return self.pending.get(thread_id) or self._inflight.get(thread_id)
+
+    def mark_ticket(self, thread_id: int):
+        self.non_tickets.discard(thread_id)
+
+    async def flush(self):
+        async with self._flush_lock:
+            if not self.pending:
+                return
+            self._inflight, self.pending = self.pending, {}
+            try:
+                ids = list(self._inflight)
+                existing = {t for t in ids if self.db.registry.peek(t)}
+                unknown = [t for t in ids if t not in existing]
+                for i in range(0, len(unknown), SQL_VARIABLE_CHUNK):
+                    chunk = unknown[i:i + SQL_VARIABLE_CHUNK]
+                    rows = await self.db.fetchall(
+                        f"SELECT thread_id FROM tickets WHERE thread_id IN ({','.join('?' * len(chunk))})", *chunk)
+                    existing.update(r[0] for r in rows)
+                if len(self.non_tickets) > NON_TICKET_CACHE_SIZE:
+                    self.non_tickets.clear()
+                self.non_tickets.update(t for t in ids if t not in existing)
+                await self.db.executemany("UPDATE tickets SET last_user_message_at=?, updated_at=? WHERE thread_id=?",
+                                          [(ts, ts, t) for t, ts in self._inflight.items() if t in existing])
+            except Exception:
+                # keep the timestamps for the next attempt unless newer ones arrived
+                for t, ts in self._inflight.items():
+                    self.pending.setdefault(t, ts)
+                raise
+            finally:
+                self._inflight = {}
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.flush()
+            except Exception:
+                log.exception("activity flush failed")
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        if self._flush_task:
+            await asyncio.gather(self._flush_task, return_exceptions=True)
+            self._flush_task = None
+        await self.flush()
+
+@metrics.instrument("db_method_seconds")
 class Database:
-    def __init__(self, path: str):
+    """Ticket store: in-memory caches (registry, titles, blacklist) in front of a
+    storage backend picked from DB_PATH (an SQLite file or a PostgreSQL URL)."""
+
+    def __init__(self, path: str, readers: int | None = None, scope: ShardScope | None = None,
+                 pool_size: int | None = None):
         self.path = path
-        self._lock = asyncio.Lock()
+        self.scope = scope
+        self.backend = open_backend(path, readers=readers, pool_size=pool_size)
+        self.activity = ActivityBuffer(self)
+        self.registry = TicketRegistry()
+        self.titles = TitleIndex()
+        self.blacklist = BlacklistCache()
+        self.stats = TicketStats()
+        self._sweeper: asyncio.Task | None = None
+        self._open = False
+        self.ready = asyncio.Event()
+
+    async def init(self, warm:bool=True):
+        """Connect and apply the schema. With warm=False the caller is expected to
+        run warm() itself, e.g. concurrently with the gateway login."""
+        await self.backend.connect()
+        self._open = True
+        self.activity.start()
+        self._sweeper = asyncio.create_task(self._sweep_blacklist())
+        await self.check_query_plans()
+        if warm:
+            await self.warm()
+
+    async def check_query_plans(self):
+        """Log a warning for every hot query whose plan reads a whole table,
+        which usually means an index is missing or no longer matches the query."""
+        for name, sql in HOT_QUERIES.items():
+            for step in await self.backend.full_scans(sql):
+                log.warning("Hot query %s falls back to a table scan: %s", name, step)
 
-    async def init(self):
-        async with aiosqlite.connect(self.path) as db:
-            await db.executescript(INIT_SQL)
-            await db.commit()
+    async def warm(self):
+        """Load every open and in-progress ticket into the registry, index all titles
+        and cache the blacklist and ticket statistics. With a shard scope only owned
+        guilds are loaded."""
+        where, params = self.scope.sql() if self.scope else ("", [])
+        rows = await self.fetchall(HOT_QUERIES["open_tickets"] + where, *params)
+        for row in rows:
+            ticket = Ticket.from_row(row)
+            pending = self.activity.get(ticket.thread_id)
+            if pending:
+                ticket.last_user_message_at = ticket.updated_at = pending
+            self.registry.put(ticket)
+        for guild_id, thread_id, title in await self.fetchall(f"SELECT guild_id, thread_id, title FROM tickets WHERE 1=1{where} ORDER BY id",
+                                                               *params):
+            self.titles.add(guild_id, thread_id, title)
+        self.blacklist.load(await self.fetchall(f"SELECT guild_id, user_id, expires_at FROM blacklist WHERE 1=1{where}",
+                                                *params))
+        stats_sql = f"SELECT guild_id, metric, key, bucket, count FROM ticket_stats WHERE 1=1{where}"
+        rows = await self.fetchall(stats_sql, *params)
+        if not rows and await self.fetchone(f"SELECT 1 FROM tickets WHERE 1=1{where} LIMIT 1", *params):
+            # tickets written before the rollup existed
+            await self.rebuild_stats()
+            rows = await self.fetchall(stats_sql, *params)
+        self.stats.load(rows)
+        self.ready.set()
+
+    async def rebuild_stats(self):
+        """Recompute the ticket_stats rollup for the owned guilds from the tickets table.
+        Purged tickets and repeated closes are lost, so history counts may come out lower
+        than the incrementally maintained ones."""
+        where, params = self.scope.sql() if self.scope else ("", [])
+        started, totals, last = time.perf_counter(), Counter(), 0
+        while True:
+            rows = await self.fetchall(f"""SELECT id, guild_id, status, created_at, closed_at, claimed_by, claimed_at
+                FROM tickets WHERE id > ?{where} ORDER BY id LIMIT ?""", last, *params, STATS_REBUILD_BATCH)
+            if not rows:
+                break
+            last = rows[-1][0]
+            totals.update(ticket_stats.from_tickets(row[1:] for row in rows))
+        async with self.backend.transaction() as tx:
+            await tx.execute(f"DELETE FROM ticket_stats WHERE 1=1{where}", *params)
+            for (guild_id, metric, key, bucket), count in totals.items():
+                await tx.execute(STATS_UPSERT.format(values="(?,?,?,?,?)"), guild_id, metric, key, bucket, count)
+        log.info("Rebuilt ticket_stats (%d rows) in %.1fs", len(totals), time.perf_counter() - started)
+
+    async def _record_stats(self, tx, guild_id:int, deltas):
+        # one multi-row upsert per state change; deltas never repeat a key
+        params = [v for metric, key, bucket, delta in deltas for v in (guild_id, metric, key, bucket, delta)]
+        await tx.execute(STATS_UPSERT.format(values=",".join(["(?,?,?,?,?)"] * len(deltas))), *params)
+
+    async def _prior(self, tx, thread_id:int, columns:str) -> tuple | None:
+        """Current values of `columns` for a ticket, from the registry when it is cached.
+        The registry only changes after a commit, so it matches the row."""
+        ticket = self.registry.peek(thread_id)
+        if ticket:
+            return tuple(getattr(ticket, c) for c in columns.split(", "))
+        return await tx.fetchone(f"SELECT {columns} FROM tickets WHERE thread_id=?", thread_id)
+
+    async def close(self):
+        if self._sweeper:
+            self._sweeper.cancel()
+            self._sweeper = None
+        if self._open:
+            await self.activity.stop()
+            self._open = False
+        await self.backend.close()
 
     async def execute(self, sql: str, *params):
-        async with self._lock:
-            async with aiosqlite.connect(self.path) as db:
-                await db.execute(sql, params)
-                await db.commit()
+        return await self.backend.execute(sql, *params)
+
+    async def execute_returning(self, sql: str, *params):
+        """Run a write statement with a RETURNING clause and give back its first row."""
+        return await self.backend.execute_returning(sql, *params)
+
+    async def executemany(self, sql: str, rows):
+        if not rows:
+            return
+        await self.backend.executemany(sql, rows)
 
     async def fetchone(self, sql: str, *params):
-        async with self._lock:
-            async with aiosqlite.connect(self.path) as db:
-                cur = await db.execute(sql, params)
-                row = await cur.fetchone()
-                await cur.close()
-                return row
+        return await self.backend.fetchone(sql, *params)
 
     async def fetchall(self, sql: str, *params):
-        async with self._lock:
-            async with aiosqlite.connect(self.path) as db:
-                cur = await db.execute(sql, params)
-                rows = await cur.fetchall()
-                await cur.close()
-                return rows
+        return await self.backend.fetchall(sql, *params)
 
     async def create_ticket(self, guild_id:int, thread_id:int, creator_id:int, is_private:bool, title:str):
         now=int(time.time())
-        await self.execute("""INSERT INTO tickets
-            (guild_id,thread_id,creator_id,is_private,status,title,created_at,updated_at,last_user_message_at)
-            VALUES (?,?,?,?,?,?,?,?,?)""",
-            guild_id,thread_id,creator_id,1 if is_private else 0,"open",title,now,now,now)
+        deltas = ticket_stats.created(now)
+        async with self.backend.transaction() as tx:
+            ticket_id, = await tx.fetchone("""INSERT INTO tickets
+                (guild_id,thread_id,creator_id,is_private,status,title,created_at,updated_at,last_user_message_at)
+                VALUES (?,?,?,?,?,?,?,?,?) RETURNING id""",
+                guild_id,thread_id,creator_id,1 if is_private else 0,"open",title,now,now,now)
+            await self._record_stats(tx, guild_id, deltas)
+        self.stats.apply(guild_id, deltas)
+        self.activity.mark_ticket(thread_id)
+        ticket = Ticket(ticket_id, guild_id, thread_id, creator_id, is_private, "open", title, now, now,
+                        last_user_message_at=now)
+        self.registry.put(ticket)
+        self.titles.add(guild_id, thread_id, title)
+        return ticket
 
     async def update_status(self, thread_id:int, status:str):
-        await self.execute("UPDATE tickets SET status=?,updated_at=? WHERE thread_id=?",
-                           status,int(time.time()),thread_id)
+        now=int(time.time())
+        async with self.backend.transaction() as tx:
+            row = await self._prior(tx, thread_id, "guild_id, status")
+            await tx.execute("UPDATE tickets SET status=?,updated_at=? WHERE thread_id=?",
+                             status,now,thread_id)
+            deltas = ticket_stats.moved(row[1], status) if row else []
+            if deltas:
+                await self._record_stats(tx, row[0], deltas)
+        if deltas:
+            self.stats.apply(row[0], deltas)
+        ticket = self.registry.peek(thread_id)
+        if ticket:
+            ticket.status, ticket.updated_at = status, now
+            self.registry.put(ticket)
 
     async def set_claim(self, thread_id:int, member_id:int|None):
-        await self.execute("UPDATE tickets SET claimed_by=?,updated_at=? WHERE thread_id=?",
-                           member_id,int(time.time()),thread_id)
+        now=int(time.time())
+        async with self.backend.transaction() as tx:
+            row = await self._prior(tx, thread_id, "guild_id, created_at, claimed_at")
+            # claimed_at keeps the first claim; unclaiming and reclaiming do not reset it
+            await tx.execute("UPDATE tickets SET claimed_by=?,claimed_at=COALESCE(claimed_at,?),updated_at=? WHERE thread_id=?",
+                             member_id, now if member_id else None, now, thread_id)
+            first = member_id is not None and row is not None and row[2] is None
+            deltas = ticket_stats.claimed(row[1], now) if first else []
+            if deltas:
+                await self._record_stats(tx, row[0], deltas)
+        if deltas:
+            self.stats.apply(row[0], deltas)
+        ticket = self.registry.peek(thread_id)
+        if ticket:
+            ticket.claimed_by, ticket.updated_at = member_id, now
+            if first:
+                ticket.claimed_at = now
+
+    async def set_private(self, thread_id:int):
+        await self.execute("UPDATE tickets SET is_private=1 WHERE thread_id=?", thread_id)
+        ticket = self.registry.peek(thread_id)
+        if ticket:
+            ticket.is_private = True
 
     async def close_ticket(self, thread_id:int, status:str):
         now=int(time.time())
-        await self.execute("UPDATE tickets SET status=?,closed_at=?,updated_at=? WHERE thread_id=?",
-                           status, now, now, thread_id)
+        async with self.backend.transaction() as tx:
+            row = await self._prior(tx, thread_id, "guild_id, status, created_at, claimed_by, closed_at")
+            await tx.execute("UPDATE tickets SET status=?,closed_at=?,updated_at=? WHERE thread_id=?",
+                             status, now, now, thread_id)
+            deltas = []
+            if row and (row[1] in OPEN_STATUSES or row[4] is None):
+                deltas = ticket_stats.closed(row[1], status, row[2], now, row[3])
+            elif row:
+                # closing an already closed ticket again only changes its resolution
+                deltas = ticket_stats.moved(row[1], status)
+            if deltas:
+                await self._record_stats(tx, row[0], deltas)
+        if deltas:
+            self.stats.apply(row[0], deltas)
+        ticket = self.registry.peek(thread_id)
+        if ticket:
+            ticket.status, ticket.closed_at, ticket.updated_at = status, now, now
+            self.registry.put(ticket)
 
-    async def get_ticket_by_thread(self, thread_id:int):
-        return await self.fetchone("SELECT * FROM tickets WHERE thread_id=?", thread_id)
+    async def get_ticket_by_thread(self, thread_id:int) -> Ticket | None:
+        ticket = self.registry.get(thread_id)
+        if ticket:
+            return ticket
+        row = await self.fetchone("SELECT * FROM tickets WHERE thread_id=?", thread_id)
+        if not row:
+            return None
+        ticket = Ticket.from_row(row)
+        pending = self.activity.get(thread_id)
+        if pending:
+            # the buffered activity timestamp may not have been flushed yet
+            ticket.last_user_message_at = pending
+            ticket.updated_at = max(ticket.updated_at, pending)
+        self.registry.put(ticket)
+        self.titles.add(ticket.guild_id, thread_id, ticket.title)
+        return ticket
 
-    async def list_open_tickets_by_user(self, guild_id:int, user_id:int):
-        return await self.fetchall("SELECT * FROM tickets WHERE guild_id=? AND creator_id=? AND status IN ('open','in_progress')",
-                                   guild_id,user_id)
+    async def list_open_tickets_by_user(self, guild_id:int, user_id:int) -> list[Ticket]:
+        return self.registry.open_for_user(guild_id, user_id)
 
     async def count_by_status(self, guild_id:int):
-        return await self.fetchall("SELECT status, COUNT(*) FROM tickets WHERE guild_id=? GROUP BY status", guild_id)
+        return await self.fetchall(HOT_QUERIES["count_by_status"], guild_id)
+
 
-    async def tickets_stale(self, guild_id:int, older_than:int, private:bool):
-        return await self.fetchall("""SELECT thread_id FROM tickets
-             WHERE guild_id=? AND is_private=? AND status IN ('open','in_progress')
-             AND last_user_message_at < ?""",
-             guild_id,1 if private else 0, older_than)
+    async def tickets_stale(self, guild_id:int, public_before:int, private_before:int):
+        """Open tickets idle since before the per-visibility cutoff, as
+        (thread_id, is_private, last_user_message_at, reminded_at) rows."""
+        await self.activity.flush()
+        return await self.fetchall(HOT_QUERIES["tickets_stale"],
+             guild_id, public_before, guild_id, private_before)
+
+    async def mark_reminded(self, thread_ids:list[int]):
+        now=int(time.time())
+        await self.executemany("""INSERT INTO ticket_reminders (thread_id,reminded_at) VALUES (?,?)
+            ON CONFLICT(thread_id) DO UPDATE SET reminded_at=excluded.reminded_at""",
+            [(t, now) for t in thread_ids])
 
     async def update_last_user_message(self, thread_id:int):
-        await self.execute("UPDATE tickets SET last_user_message_at=?, updated_at=? WHERE thread_id=?",
-                           int(time.time()), int(time.time()), thread_id)
+        self.activity.record(thread_id, int(time.time()))
+
+    async def archive_purge_candidates(self, guild_id:int, older_than:int, after:tuple[int,int]=(0,0), limit:int=100):
+        """One keyset page of closed tickets as (id, thread_id, closed_at), ordered by (closed_at, id)."""
+        return await self.fetchall(HOT_QUERIES["archive_purge_candidates"],
+            guild_id, older_than, after[0], after[1], limit)
+
+    async def delete_tickets(self, thread_ids:list[int]):
+        for i in range(0, len(thread_ids), SQL_VARIABLE_CHUNK):
+            chunk = thread_ids[i:i + SQL_VARIABLE_CHUNK]
+            marks = ",".join("?" * len(chunk))
+            async with self.backend.transaction() as tx:
+                removed = await tx.fetchall(f"""SELECT guild_id, status, COUNT(*) FROM tickets
+                    WHERE thread_id IN ({marks}) GROUP BY guild_id, status""", *chunk)
+                for guild_id, status, count in removed:
+                    await self._record_stats(tx, guild_id, [(ticket_stats.STATUS, status, 0, -count)])
+                for table in ("tickets", "ticket_reminders", "transcript_jobs"):
+                    await tx.execute(f"DELETE FROM {table} WHERE thread_id IN ({marks})", *chunk)
+            for guild_id, status, count in removed:
+                self.stats.apply(guild_id, [(ticket_stats.STATUS, status, 0, -count)])
+        for thread_id in thread_ids:
+            self.registry.discard(thread_id)
+            self.titles.discard(thread_id)
+
+    async def get_purge_checkpoint(self, guild_id:int):
+        """(cutoff, last_closed_at, last_id) of an unfinished purge, if any."""
+        return await self.fetchone("SELECT cutoff, last_closed_at, last_id FROM purge_checkpoints WHERE guild_id=?", guild_id)
 
-    async def archive_purge_candidates(self, guild_id:int, older_than:int):
-        return await self.fetchall("""SELECT thread_id FROM tickets
-            WHERE guild_id=? AND status IN ('closed','solved','rejected') AND closed_at < ?""",
-            guild_id, older_than)
+    async def save_purge_checkpoint(self, guild_id:int, cutoff:int, last_closed_at:int, last_id:int):
+        await self.execute("""INSERT INTO purge_checkpoints (guild_id,cutoff,last_closed_at,last_id) VALUES (?,?,?,?)
+            ON CONFLICT(guild_id) DO UPDATE SET cutoff=excluded.cutoff, last_closed_at=excluded.last_closed_at,
+            last_id=excluded.last_id""", guild_id, cutoff, last_closed_at, last_id)
 
-    async def add_blacklist(self, guild_id:int, user_id:int, reason:str):
-        await self.execute("INSERT OR REPLACE INTO blacklist (guild_id,user_id,reason) VALUES (?,?,?)",
-                           guild_id,user_id,reason)
+    async def clear_purge_checkpoint(self, guild_id:int):
+        await self.execute("DELETE FROM purge_checkpoints WHERE guild_id=?", guild_id)
+
+    async def get_state(self, key:str) -> str | None:
+        row = await self.fetchone("SELECT value FROM bot_state WHERE key=?", key)
+        return row[0] if row else None
+
+    async def set_state(self, key:str, value:str):
+        await self.execute("""INSERT INTO bot_state (key,value) VALUES (?,?)
+            ON CONFLICT(key) DO UPDATE SET value=excluded.value""", key, value)
+
+    async def config_overrides(self):
+        return await self.fetchall("SELECT guild_id, key, value FROM config_overrides")
+
+    async def set_config_override(self, guild_id:int, key:str, value:str):
+        await self.execute("""INSERT INTO config_overrides (guild_id,key,value) VALUES (?,?,?)
+            ON CONFLICT(guild_id,key) DO UPDATE SET value=excluded.value""", guild_id, key, value)
+
+    async def delete_config_override(self, guild_id:int, key:str):
+        await self.execute("DELETE FROM config_overrides WHERE guild_id=? AND key=?", guild_id, key)
+
+    async def add_blacklist(self, guild_id:int, user_id:int, reason:str, expires_at:int|None=None):
+        await self.execute("""INSERT INTO blacklist (guild_id,user_id,reason,expires_at) VALUES (?,?,?,?)
+            ON CONFLICT(guild_id,user_id) DO UPDATE SET reason=excluded.reason, expires_at=excluded.expires_at""",
+            guild_id,user_id,reason,expires_at)
+        self.blacklist.add(guild_id, user_id, expires_at)
+
+    async def remove_blacklist(self, guild_id:int, user_id:int):
+        await self.execute("DELETE FROM blacklist WHERE guild_id=? AND user_id=?", guild_id, user_id)
+        self.blacklist.discard(guild_id, user_id)
+
+    async def list_blacklist(self, guild_id:int):
+        return await self.fetchall("SELECT user_id, reason, expires_at FROM blacklist WHERE guild_id=? "
+                                   "AND (expires_at IS NULL OR expires_at>?)", guild_id, int(time.time()))
 
     async def is_blacklisted(self, guild_id:int, user_id:int):
-        row = await self.fetchone("SELECT 1 FROM blacklist WHERE guild_id=? AND user_id=?", guild_id,user_id)
-        return row is not None
\ No newline at end of file
+        now = int(time.time())
+        cached = self.blacklist.check(guild_id, user_id, now)
+        if cached is not None:
+            return cached
+        metrics.incr("blacklist_bloom_confirm")
+        row = await self.fetchone("SELECT 1 FROM blacklist WHERE guild_id=? AND user_id=? "
+                                  "AND (expires_at IS NULL OR expires_at>?)", guild_id,user_id,now)
+        return row is not None
+
+    async def expire_blacklist(self):
+        """Drop entries whose time limit has passed; only due heap entries are examined."""
+        now = int(time.time())
+        due = self.blacklist.pop_expired(now)
+        await self.executemany("DELETE FROM blacklist WHERE guild_id=? AND user_id=? AND expires_at<=?",
+                               [(g, u, now) for g, u in due])
+        return len(due)
+
+    async def _sweep_blacklist(self):
+        while True:
+            await asyncio.sleep(BLACKLIST_SWEEP_SECONDS)
+            try:
+                await self.expire_blacklist()
+            except Exception:
+                log.exception("blacklist sweep failed")
\ No newline at end of file
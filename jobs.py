@@ -0,0 +1,149 @@
+import asyncio
+import logging
+import time
+import discord
+from config import get_config
+from database import Database
+from transcripts import build_transcript_files
+
+TRANSCRIPT_WORKERS = 2
+MAX_ATTEMPTS = 5
+BACKOFF_BASE_SECONDS = 15
+POLL_SECONDS = 30
+
+log = logging.getLogger(__name__)
+
+class TranscriptJobQueue:
+    """SQLite-backed queue that builds and uploads close transcripts in the background.
+
+    Jobs survive restarts: anything left ``running`` is put back to ``pending`` on start.
+    Failed uploads are retried with exponential backoff up to MAX_ATTEMPTS."""
+
+    def __init__(self, bot, db:Database, workers:int=TRANSCRIPT_WORKERS):
+        self.bot = bot
+        self.db = db
+        self.workers = workers
+        self._tasks: list[asyncio.Task] = []
+        self._claim_lock = asyncio.Lock()
+        self._wakeup = asyncio.Event()
+
+    async def start(self):
+        if self._tasks:
+            return
+        where, params = self._scope()
+        await self.db.execute(f"UPDATE transcript_jobs SET status='pending' WHERE status='running'{where}", *params)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        tasks, self._tasks = self._tasks, []
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def enqueue(self, guild_id:int, thread_id:int) -> int:
+        now = int(time.time())
+        job_id, = await self.db.execute_returning("""INSERT INTO transcript_jobs
+            (guild_id,thread_id,status,attempts,next_run_at,created_at)
+            VALUES (?,?,'pending',0,?,?) RETURNING id""", guild_id, thread_id, now, now)
+        self._wakeup.set()
+        return job_id
+
+    async def stats(self) -> dict:
+        rows = await self.db.fetchall("SELECT status, COUNT(*) FROM transcript_jobs GROUP BY status")
+        return dict(rows)
+
+    async def settled(self, thread_ids:list[int]) -> set[int]:
+        """Subset of thread_ids whose transcript job is over: uploaded, or failed for good
+        (no log channel, missing thread, no access, or out of retries)."""
+        if not thread_ids:
+            return set()
+        rows = await self.db.fetchall(f"""SELECT DISTINCT thread_id FROM transcript_jobs
+            WHERE status IN ('done','failed') AND thread_id IN ({','.join('?' * len(thread_ids))})""", *thread_ids)
+        return {r[0] for r in rows}
+
+    def _scope(self) -> tuple[str, list[int]]:
+        # other worker processes own the remaining guilds' jobs
+        return self.db.scope.sql() if self.db.scope else ("", [])
+
+    async def _claim(self):
+        where, params = self._scope()
+        async with self._claim_lock:
+            # single statement so concurrent processes cannot claim the same job
+            return await self.db.execute_returning(f"""UPDATE transcript_jobs SET status='running'
+                WHERE id=(SELECT id FROM transcript_jobs WHERE status='pending' AND next_run_at<=?{where} ORDER BY id LIMIT 1)
+                AND status='pending' RETURNING id, guild_id, thread_id, attempts""", int(time.time()), *params)
+
+    async def _worker(self):
+        await self.bot.wait_until_ready()
+        while True:
+            # cleared before claiming so an enqueue during the claim is not missed
+            self._wakeup.clear()
+            try:
+                job = await self._claim()
+            except Exception:
+                log.exception("claiming a transcript job failed")
+                await self._idle()
+                continue
+            if job is None:
+                await self._idle()
+                continue
+            try:
+                await self._run(*job)
+            except Exception:
+                log.exception("transcript job %s could not be recorded", job[0])
+                await self._release(job[0])
+
+    async def _idle(self):
+        # asyncio.wait, not wait_for: on 3.11 wait_for can swallow a cancel that
+        # races with the event being set, which left stop() waiting forever
+        waiter = asyncio.ensure_future(self._wakeup.wait())
+        try:
+            await asyncio.wait((waiter,), timeout=POLL_SECONDS)
+        finally:
+            waiter.cancel()
+
+    async def _release(self, job_id:int):
+        """Put a job whose outcome could not be stored back in the queue; start() recovers it otherwise."""
+        try:
+            await self.db.execute("UPDATE transcript_jobs SET status='pending',next_run_at=? WHERE id=? AND status='running'",
+                                  int(time.time()) + BACKOFF_BASE_SECONDS, job_id)
+        except Exception:
+            log.exception("transcript job %s left running until the next start", job_id)
+
+    async def _run(self, job_id:int, guild_id:int, thread_id:int, attempts:int):
+        try:
+            posted = await self.upload(thread_id)
+        except (discord.NotFound, discord.Forbidden) as e:
+            await self._finish(job_id, "failed", attempts + 1, str(e))
+        except discord.HTTPException as e:
+            attempts += 1
+            if attempts >= MAX_ATTEMPTS:
+                await self._finish(job_id, "failed", attempts, str(e))
+                return
+            delay = BACKOFF_BASE_SECONDS * 2 ** (attempts - 1)
+            log.warning("transcript job %s for thread %s failed (%s), retry in %ss", job_id, thread_id, e, delay)
+            await self.db.execute("UPDATE transcript_jobs SET status='pending',attempts=?,next_run_at=?,last_error=? WHERE id=?",
+                                  attempts, int(time.time()) + delay, str(e), job_id)
+        except Exception as e:
+            log.exception("transcript job %s for thread %s crashed", job_id, thread_id)
+            await self._finish(job_id, "failed", attempts + 1, repr(e))
+        else:
+            if posted:
+                await self._finish(job_id, "done", attempts + 1, None)
+            else:
+                await self._finish(job_id, "failed", attempts + 1, "no log channel configured")
+
+    async def _finish(self, job_id:int, status:str, attempts:int, error:str|None):
+        await self.db.execute("UPDATE transcript_jobs SET status=?,attempts=?,last_error=?,finished_at=? WHERE id=?",
+                              status, attempts, error, int(time.time()), job_id)
+
+    async def upload(self, thread_id:int) -> bool:
+        """Build the transcript for a thread and post it to its guild's log channel.
+        False when the guild has no log channel, so nothing was posted."""
+        thread = self.bot.get_channel(thread_id) or await self.bot.fetch_channel(thread_id)
+        log_channel = thread.guild.get_channel(get_config(thread.guild.id).log_channel_id)
+        if not log_channel:
+            return False
+        files = await build_transcript_files(thread)
+        await log_channel.send(f"Transcript for {thread.name}", files=files)
+        return True
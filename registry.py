@@ -0,0 +1,91 @@
+from collections import OrderedDict
+
+OPEN_STATUSES = ("open", "in_progress")
+CLOSED_CACHE_SIZE = 1024
+
+class Ticket:
+    __slots__ = ("id", "guild_id", "thread_id", "creator_id", "is_private", "status", "title",
+                 "created_at", "updated_at", "claimed_by", "last_user_message_at", "closed_at",
+                 "claimed_at")
+
+    def __init__(self, id:int, guild_id:int, thread_id:int, creator_id:int, is_private:bool, status:str,
+                 title:str, created_at:int, updated_at:int, claimed_by:int|None=None,
+                 last_user_message_at:int|None=None, closed_at:int|None=None, claimed_at:int|None=None):
+        self.id = id
+        self.guild_id = guild_id
+        self.thread_id = thread_id
+        self.creator_id = creator_id
+        self.is_private = bool(is_private)
+        self.status = status
+        self.title = title
+        self.created_at = created_at
+        self.updated_at = updated_at
+        self.claimed_by = claimed_by
+        self.last_user_message_at = last_user_message_at
+        self.closed_at = closed_at
+        self.claimed_at = claimed_at
+
+    @classmethod
+    def from_row(cls, row) -> "Ticket":
+        return cls(*row)
+
+    @property
+    def is_open(self) -> bool:
+        return self.status in OPEN_STATUSES
+
+    def __repr__(self):
+        return f"<Ticket thread_id={self.thread_id} status={self.status!r} guild_id={self.guild_id}>"
+
+class TicketRegistry:
+    """Process-wide ticket cache. Open and in-progress tickets are always resident;
+    closed tickets are kept in a small LRU."""
+
+    def __init__(self, closed_capacity:int=CLOSED_CACHE_SIZE):
+        self.open: dict[int, Ticket] = {}
+        self.closed: OrderedDict[int, Ticket] = OrderedDict()
+        self.closed_capacity = closed_capacity
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.open) + len(self.closed)
+
+    def peek(self, thread_id:int) -> Ticket | None:
+        """Lookup without touching the hit/miss counters or the LRU order."""
+        return self.open.get(thread_id) or self.closed.get(thread_id)
+
+    def get(self, thread_id:int) -> Ticket | None:
+        ticket = self.open.get(thread_id)
+        if ticket is None:
+            ticket = self.closed.get(thread_id)
+            if ticket is not None:
+                self.closed.move_to_end(thread_id)
+        if ticket is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return ticket
+
+    def put(self, ticket:Ticket):
+        """Insert or re-file a ticket after its status changed."""
+        if ticket.is_open:
+            self.closed.pop(ticket.thread_id, None)
+            self.open[ticket.thread_id] = ticket
+            return
+        self.open.pop(ticket.thread_id, None)
+        self.closed[ticket.thread_id] = ticket
+        self.closed.move_to_end(ticket.thread_id)
+        while len(self.closed) > self.closed_capacity:
+            self.closed.popitem(last=False)
+
+    def discard(self, thread_id:int):
+        self.open.pop(thread_id, None)
+        self.closed.pop(thread_id, None)
+
+    def open_for_user(self, guild_id:int, user_id:int) -> list[Ticket]:
+        return [t for t in self.open.values() if t.guild_id == guild_id and t.creator_id == user_id]
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {"open": len(self.open), "closed_cached": len(self.closed), "hits": self.hits,
+                "misses": self.misses, "hit_ratio": self.hits / total if total else 0.0}
@@ -0,0 +1,18 @@
+from storage.base import StorageBackend, Transaction
+
+POSTGRES_SCHEMES = ("postgres://", "postgresql://")
+
+def is_url(target:str) -> bool:
+    return "://" in target
+
+def open_backend(target:str, **options) -> StorageBackend:
+    """Backend for a DB_PATH value: a PostgreSQL URL or an SQLite file path.
+    read_only=True opens it for reporting: no schema changes and no writes."""
+    read_only = options.get("read_only", False)
+    if target.startswith(POSTGRES_SCHEMES):
+        from storage.postgres import PostgresBackend
+        return PostgresBackend(target, pool_size=options.get("pool_size"), read_only=read_only)
+    from storage.sqlite import SqliteBackend
+    return SqliteBackend(target, readers=options.get("readers"), read_only=read_only)
+
+__all__ = ["StorageBackend", "Transaction", "open_backend", "is_url"]
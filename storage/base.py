@@ -0,0 +1,64 @@
+from abc import ABC, abstractmethod
+
+class Transaction(ABC):
+    """Handle passed to the body of StorageBackend.transaction()."""
+
+    @abstractmethod
+    async def execute(self, sql:str, *params):
+        ...
+
+    @abstractmethod
+    async def fetchone(self, sql:str, *params):
+        """Read inside the transaction, seeing its uncommitted writes."""
+
+    @abstractmethod
+    async def fetchall(self, sql:str, *params) -> list[tuple]:
+        ...
+
+class StorageBackend(ABC):
+    """What Database needs from a SQL engine. Statements use `?` placeholders;
+    backends for other paramstyles translate them."""
+
+    dialect = ""
+
+    @abstractmethod
+    async def connect(self):
+        """Open connections and bring the schema up to date."""
+
+    @abstractmethod
+    async def close(self):
+        ...
+
+    @abstractmethod
+    async def execute(self, sql:str, *params):
+        """Run one write statement and commit it."""
+
+    @abstractmethod
+    async def execute_returning(self, sql:str, *params):
+        """Run one write statement with a RETURNING clause; the first row or None."""
+
+    @abstractmethod
+    async def executemany(self, sql:str, rows):
+        ...
+
+    @abstractmethod
+    async def fetchone(self, sql:str, *params):
+        ...
+
+    @abstractmethod
+    async def fetchall(self, sql:str, *params) -> list[tuple]:
+        ...
+
+    @abstractmethod
+    def transaction(self):
+        """Async context manager running several writes atomically."""
+
+    async def full_scans(self, sql:str) -> list[str]:
+        """Steps of the query plan for `sql` that read a whole table. Backends whose
+        planner legitimately prefers scans on small tables return nothing."""
+        return []
+
+    async def copy_rows(self, table:str, columns:list[str], rows:list[tuple]):
+        """Bulk insert rows as-is (ids included). Backends override with their fastest path."""
+        marks = ",".join("?" * len(columns))
+        await self.executemany(f"INSERT INTO {table} ({','.join(columns)}) VALUES ({marks})", rows)
@@ -0,0 +1,188 @@
+import itertools
+import re
+from contextlib import asynccontextmanager
+from functools import lru_cache
+from storage.base import StorageBackend, Transaction
+
+try:
+    import asyncpg
+except ImportError:  # optional, only needed for postgres:// DB_PATHs
+    asyncpg = None
+
+INIT_SQL = """
+CREATE TABLE IF NOT EXISTS tickets (
+  id BIGSERIAL PRIMARY KEY,
+  guild_id BIGINT NOT NULL,
+  thread_id BIGINT NOT NULL UNIQUE,
+  creator_id BIGINT NOT NULL,
+  is_private INTEGER NOT NULL,
+  status TEXT NOT NULL,
+  title TEXT NOT NULL,
+  created_at BIGINT NOT NULL,
+  updated_at BIGINT NOT NULL,
+  claimed_by BIGINT,
+  last_user_message_at BIGINT,
+  closed_at BIGINT,
+  claimed_at BIGINT
+);
+
+ALTER TABLE tickets ADD COLUMN IF NOT EXISTS claimed_at BIGINT;
+
+CREATE TABLE IF NOT EXISTS ticket_stats (
+  guild_id BIGINT NOT NULL,
+  metric TEXT NOT NULL,
+  key TEXT NOT NULL,
+  bucket BIGINT NOT NULL,
+  count BIGINT NOT NULL,
+  PRIMARY KEY (guild_id, metric, key, bucket)
+);
+
+CREATE TABLE IF NOT EXISTS config_overrides (
+  guild_id BIGINT NOT NULL,
+  key TEXT NOT NULL,
+  value TEXT NOT NULL,
+  PRIMARY KEY (guild_id,key)
+);
+
+CREATE TABLE IF NOT EXISTS blacklist (
+  guild_id BIGINT NOT NULL,
+  user_id BIGINT NOT NULL,
+  reason TEXT,
+  expires_at BIGINT,
+  PRIMARY KEY (guild_id,user_id)
+);
+
+CREATE TABLE IF NOT EXISTS transcript_jobs (
+  id BIGSERIAL PRIMARY KEY,
+  guild_id BIGINT NOT NULL,
+  thread_id BIGINT NOT NULL,
+  status TEXT NOT NULL,
+  attempts INTEGER NOT NULL DEFAULT 0,
+  next_run_at BIGINT NOT NULL,
+  last_error TEXT,
+  created_at BIGINT NOT NULL,
+  finished_at BIGINT
+);
+
+CREATE INDEX IF NOT EXISTS idx_transcript_jobs_due ON transcript_jobs (status, next_run_at);
+
+CREATE TABLE IF NOT EXISTS ticket_reminders (
+  thread_id BIGINT PRIMARY KEY,
+  reminded_at BIGINT NOT NULL
+);
+
+DROP INDEX IF EXISTS idx_tickets_stale;
+DROP INDEX IF EXISTS idx_tickets_closed;
+CREATE INDEX IF NOT EXISTS idx_tickets_status ON tickets (guild_id, status);
+CREATE INDEX IF NOT EXISTS idx_tickets_created ON tickets (guild_id, created_at);
+CREATE INDEX IF NOT EXISTS idx_tickets_open_creator ON tickets (guild_id, creator_id)
+  WHERE status IN ('open','in_progress');
+CREATE INDEX IF NOT EXISTS idx_tickets_open_activity ON tickets (guild_id, is_private, last_user_message_at)
+  WHERE status IN ('open','in_progress');
+CREATE INDEX IF NOT EXISTS idx_tickets_purge ON tickets (guild_id, closed_at, id) INCLUDE (status, thread_id)
+  WHERE closed_at IS NOT NULL;
+CREATE INDEX IF NOT EXISTS idx_transcript_jobs_thread ON transcript_jobs (thread_id, status);
+
+CREATE TABLE IF NOT EXISTS bot_state (
+  key TEXT PRIMARY KEY,
+  value TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS purge_checkpoints (
+  guild_id BIGINT PRIMARY KEY,
+  cutoff BIGINT NOT NULL,
+  last_closed_at BIGINT NOT NULL,
+  last_id BIGINT NOT NULL
+);
+"""
+
+POOL_SIZE = 10
+STATEMENT_CACHE_SIZE = 256
+SERIAL_TABLES = ("tickets", "transcript_jobs")
+
+# string literals are matched first so a '?' inside quotes is left alone
+_PLACEHOLDER = re.compile(r"'(?:[^']|'')*'|\?")
+
+@lru_cache(maxsize=1024)
+def translate(sql:str) -> str:
+    """Rewrite `?` placeholders as asyncpg's `$1, $2, ...`."""
+    counter = itertools.count(1)
+    return _PLACEHOLDER.sub(lambda m: f"${next(counter)}" if m.group() == "?" else m.group(), sql)
+
+class _PostgresTransaction(Transaction):
+    def __init__(self, conn):
+        self.conn = conn
+
+    async def execute(self, sql:str, *params):
+        await self.conn.execute(translate(sql), *params)
+
+    async def fetchone(self, sql:str, *params):
+        row = await self.conn.fetchrow(translate(sql), *params)
+        return tuple(row) if row is not None else None
+
+    async def fetchall(self, sql:str, *params):
+        return [tuple(r) for r in await self.conn.fetch(translate(sql), *params)]
+
+class PostgresBackend(StorageBackend):
+    """asyncpg connection pool. asyncpg prepares every statement server-side and
+    caches it per connection, so repeated queries skip parsing and planning."""
+
+    dialect = "postgres"
+
+    def __init__(self, dsn:str, pool_size:int|None=None, read_only:bool=False):
+        if asyncpg is None:
+            raise RuntimeError("DB_PATH points at PostgreSQL but asyncpg is not installed (pip install asyncpg)")
+        self.dsn = dsn
+        self.pool_size = pool_size or POOL_SIZE
+        self.read_only = read_only
+        self._pool = None
+
+    async def connect(self):
+        """With read_only=True the schema is left alone and every session is read-only."""
+        settings = {"default_transaction_read_only": "on"} if self.read_only else None
+        self._pool = await asyncpg.create_pool(self.dsn, min_size=1, max_size=self.pool_size,
+                                               statement_cache_size=STATEMENT_CACHE_SIZE, server_settings=settings)
+        if self.read_only:
+            return
+        async with self._pool.acquire() as conn:
+            await conn.execute(INIT_SQL)
+
+    async def close(self):
+        if self._pool:
+            await self._pool.close()
+            self._pool = None
+
+    async def execute(self, sql:str, *params):
+        """Postgres has no lastrowid; use execute_returning(... RETURNING id) instead."""
+        await self._pool.execute(translate(sql), *params)
+
+    async def execute_returning(self, sql:str, *params):
+        row = await self._pool.fetchrow(translate(sql), *params)
+        return tuple(row) if row is not None else None
+
+    async def executemany(self, sql:str, rows):
+        await self._pool.executemany(translate(sql), rows)
+
+    async def fetchone(self, sql:str, *params):
+        row = await self._pool.fetchrow(translate(sql), *params)
+        return tuple(row) if row is not None else None
+
+    async def fetchall(self, sql:str, *params):
+        return [tuple(r) for r in await self._pool.fetch(translate(sql), *params)]
+
+    @asynccontextmanager
+    async def transaction(self):
+        async with self._pool.acquire() as conn:
+            async with conn.transaction():
+                yield _PostgresTransaction(conn)
+
+    async def copy_rows(self, table:str, columns:list[str], rows:list[tuple]):
+        async with self._pool.acquire() as conn:
+            await conn.copy_records_to_table(table, records=rows, columns=columns)
+
+    async def reset_sequences(self):
+        """Move id sequences past rows that were copied in with explicit ids."""
+        async with self._pool.acquire() as conn:
+            for table in SERIAL_TABLES:
+                await conn.execute(f"""SELECT setval(pg_get_serial_sequence('{table}', 'id'),
+                    COALESCE((SELECT MAX(id) FROM {table}), 0) + 1, false)""")
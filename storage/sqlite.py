@@ -0,0 +1,315 @@
+import aiosqlite
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from pathlib import Path
+from storage.base import StorageBackend, Transaction
+from utils.metrics import metrics
+
+log = logging.getLogger(__name__)
+
+INIT_SQL = """
+CREATE TABLE IF NOT EXISTS tickets (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  guild_id INTEGER NOT NULL,
+  thread_id INTEGER NOT NULL UNIQUE,
+  creator_id INTEGER NOT NULL,
+  is_private INTEGER NOT NULL,
+  status TEXT NOT NULL,
+  title TEXT NOT NULL,
+  created_at INTEGER NOT NULL,
+  updated_at INTEGER NOT NULL,
+  claimed_by INTEGER,
+  last_user_message_at INTEGER,
+  closed_at INTEGER
+);
+
+CREATE TABLE IF NOT EXISTS config_overrides (
+  guild_id INTEGER NOT NULL,
+  key TEXT NOT NULL,
+  value TEXT NOT NULL,
+  PRIMARY KEY (guild_id,key)
+);
+
+CREATE TABLE IF NOT EXISTS blacklist (
+  guild_id INTEGER NOT NULL,
+  user_id INTEGER NOT NULL,
+  reason TEXT,
+  expires_at INTEGER,
+  PRIMARY KEY (guild_id,user_id)
+);
+
+CREATE TABLE IF NOT EXISTS transcript_jobs (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  guild_id INTEGER NOT NULL,
+  thread_id INTEGER NOT NULL,
+  status TEXT NOT NULL,
+  attempts INTEGER NOT NULL DEFAULT 0,
+  next_run_at INTEGER NOT NULL,
+  last_error TEXT,
+  created_at INTEGER NOT NULL,
+  finished_at INTEGER
+);
+
+CREATE INDEX IF NOT EXISTS idx_transcript_jobs_due ON transcript_jobs (status, next_run_at);
+
+CREATE TABLE IF NOT EXISTS ticket_reminders (
+  thread_id INTEGER PRIMARY KEY,
+  reminded_at INTEGER NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS bot_state (
+  key TEXT PRIMARY KEY,
+  value TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS purge_checkpoints (
+  guild_id INTEGER PRIMARY KEY,
+  cutoff INTEGER NOT NULL,
+  last_closed_at INTEGER NOT NULL,
+  last_id INTEGER NOT NULL
+);
+"""
+
+# partial indexes only cover live tickets, which stay a small slice of the table;
+# the purge index carries status and thread_id so purge pages never touch the table
+HOT_PATH_INDEXES_SQL = """
+DROP INDEX IF EXISTS idx_tickets_stale;
+DROP INDEX IF EXISTS idx_tickets_closed;
+CREATE INDEX IF NOT EXISTS idx_tickets_status ON tickets (guild_id, status);
+CREATE INDEX IF NOT EXISTS idx_tickets_created ON tickets (guild_id, created_at);
+CREATE INDEX IF NOT EXISTS idx_tickets_open_creator ON tickets (guild_id, creator_id)
+  WHERE status IN ('open','in_progress');
+CREATE INDEX IF NOT EXISTS idx_tickets_open_activity ON tickets (guild_id, is_private, last_user_message_at)
+  WHERE status IN ('open','in_progress');
+CREATE INDEX IF NOT EXISTS idx_tickets_purge ON tickets (guild_id, closed_at, id, status, thread_id)
+  WHERE closed_at IS NOT NULL;
+CREATE INDEX IF NOT EXISTS idx_transcript_jobs_thread ON transcript_jobs (thread_id, status);
+ANALYZE;
+"""
+
+TICKET_STATS_SQL = """
+ALTER TABLE tickets ADD COLUMN claimed_at INTEGER;
+CREATE TABLE IF NOT EXISTS ticket_stats (
+  guild_id INTEGER NOT NULL,
+  metric TEXT NOT NULL,
+  key TEXT NOT NULL,
+  bucket INTEGER NOT NULL,
+  count INTEGER NOT NULL,
+  PRIMARY KEY (guild_id, metric, key, bucket)
+) WITHOUT ROWID;
+"""
+
+async def _add_blacklist_expiry(conn:aiosqlite.Connection):
+    # databases created before versioning may already have the column
+    cur = await conn.execute("PRAGMA table_info(blacklist)")
+    if "expires_at" not in {row[1] for row in await cur.fetchall()}:
+        await conn.execute("ALTER TABLE blacklist ADD COLUMN expires_at INTEGER")
+    await cur.close()
+
+# (user_version, SQL script or coroutine taking the connection); append only, never edit
+MIGRATIONS = [
+    (1, INIT_SQL + """
+CREATE INDEX IF NOT EXISTS idx_tickets_stale ON tickets (guild_id, is_private, status, last_user_message_at);
+CREATE INDEX IF NOT EXISTS idx_tickets_closed ON tickets (guild_id, closed_at) WHERE closed_at IS NOT NULL;
+"""),
+    (2, _add_blacklist_expiry),
+    (3, HOT_PATH_INDEXES_SQL),
+    (4, TICKET_STATS_SQL),
+]
+
+READ_POOL_SIZE = 4
+STATEMENT_CACHE_SIZE = 256
+CACHE_SIZE_KIB = 64 * 1024
+MMAP_SIZE = 256 * 1024 * 1024
+# applied to every connection; the writer additionally gets WAL and synchronous=NORMAL,
+# which is durable across application crashes and only loses the last commits on power loss
+CONNECTION_PRAGMAS = ("PRAGMA busy_timeout=5000", f"PRAGMA cache_size=-{CACHE_SIZE_KIB}",
+                      f"PRAGMA mmap_size={MMAP_SIZE}", "PRAGMA temp_store=MEMORY")
+
+def _statements(script:str) -> list[str]:
+    return [s.strip() for s in script.split(";") if s.strip()]
+
+async def migrate(conn:aiosqlite.Connection) -> int:
+    """Apply the migrations newer than the database's user_version, each in its own
+    transaction. Returns the resulting version."""
+    cur = await conn.execute("PRAGMA user_version")
+    (version,) = await cur.fetchone()
+    await cur.close()
+    for target, step in MIGRATIONS:
+        if target <= version:
+            continue
+        await conn.execute("BEGIN IMMEDIATE")
+        try:
+            # another process may have migrated while we waited for the write lock
+            cur = await conn.execute("PRAGMA user_version")
+            (version,) = await cur.fetchone()
+            await cur.close()
+            if target > version:
+                if callable(step):
+                    await step(conn)
+                else:
+                    for statement in _statements(step):
+                        await conn.execute(statement)
+                await conn.execute(f"PRAGMA user_version={target}")
+                version = target
+                log.info("Database migrated to schema version %d", target)
+        except BaseException:
+            await conn.rollback()
+            raise
+        await conn.commit()
+    return version
+
+class _SqliteTransaction(Transaction):
+    def __init__(self, conn:aiosqlite.Connection):
+        self.conn = conn
+
+    async def execute(self, sql:str, *params):
+        await self.conn.execute(sql, params)
+
+    async def fetchone(self, sql:str, *params):
+        cur = await self.conn.execute(sql, params)
+        row = await cur.fetchone()
+        await cur.close()
+        return row
+
+    async def fetchall(self, sql:str, *params):
+        cur = await self.conn.execute(sql, params)
+        rows = await cur.fetchall()
+        await cur.close()
+        return rows
+
+class SqliteBackend(StorageBackend):
+    """One writer connection plus a pool of read-only connections in WAL mode.
+    Reads run concurrently, writes are serialized. With read_only=True only the
+    read pool is opened: no writer, no migrations, no PRAGMA optimize on close."""
+
+    dialect = "sqlite"
+
+    def __init__(self, path:str, readers:int|None=None, read_only:bool=False):
+        if read_only and path == ":memory:":
+            raise ValueError("an in-memory SQLite database cannot be opened read-only")
+        self.path = path
+        self.read_only = read_only
+        self.readers = READ_POOL_SIZE if readers is None else readers
+        if read_only:
+            self.readers = max(1, self.readers)
+        self._lock = asyncio.Lock()
+        self._writer: aiosqlite.Connection | None = None
+        self._pool: list[aiosqlite.Connection] = []
+        self._idle: asyncio.Queue = asyncio.Queue()
+        self.schema_version = 0
+
+    async def _connect(self, target:str, **kwargs) -> aiosqlite.Connection:
+        conn = await aiosqlite.connect(target, cached_statements=STATEMENT_CACHE_SIZE, **kwargs)
+        for pragma in CONNECTION_PRAGMAS:
+            await conn.execute(pragma)
+        return conn
+
+    async def connect(self):
+        if self.read_only:
+            await self._open_readers()
+            return
+        self._writer = await self._connect(self.path)
+        if self.path != ":memory:":
+            await self._writer.execute("PRAGMA journal_mode=WAL")
+        await self._writer.execute("PRAGMA synchronous=NORMAL")
+        self.schema_version = await migrate(self._writer)
+        if self.path != ":memory:":
+            await self._open_readers()
+
+    async def _open_readers(self):
+        uri = Path(self.path).resolve().as_uri() + "?mode=ro"
+        for _ in range(self.readers):
+            conn = await self._connect(uri, uri=True)
+            self._pool.append(conn)
+            self._idle.put_nowait(conn)
+
+    async def close(self):
+        conns, self._pool = self._pool, []
+        self._idle = asyncio.Queue()
+        for conn in conns:
+            await conn.close()
+        if self._writer:
+            async with self._lock:
+                await self._writer.execute("PRAGMA optimize")
+                await self._writer.close()
+                self._writer = None
+
+    @asynccontextmanager
+    async def _reader(self):
+        if not self._pool:
+            # in-memory databases cannot be shared, fall back to the writer
+            async with self._lock:
+                yield self._writer
+            return
+        conn = await self._idle.get()
+        try:
+            yield conn
+        finally:
+            self._idle.put_nowait(conn)
+
+    @asynccontextmanager
+    async def _write_lock(self):
+        if self.read_only:
+            raise RuntimeError(f"{self.path} is open read-only")
+        waited = time.perf_counter()
+        async with self._lock:
+            metrics.observe("db_lock_wait_seconds", time.perf_counter() - waited)
+            yield
+
+    async def execute(self, sql:str, *params):
+        """Returns the lastrowid of the statement."""
+        async with self._write_lock():
+            cur = await self._writer.execute(sql, params)
+            await self._writer.commit()
+            rowid = cur.lastrowid
+            await cur.close()
+            return rowid
+
+    async def execute_returning(self, sql:str, *params):
+        async with self._write_lock():
+            cur = await self._writer.execute(sql, params)
+            row = await cur.fetchone()
+            await cur.close()
+            await self._writer.commit()
+            return row
+
+    async def executemany(self, sql:str, rows):
+        async with self._write_lock():
+            await self._writer.executemany(sql, rows)
+            await self._writer.commit()
+
+    async def fetchone(self, sql:str, *params):
+        async with self._reader() as db:
+            cur = await db.execute(sql, params)
+            row = await cur.fetchone()
+            await cur.close()
+            return row
+
+    async def fetchall(self, sql:str, *params):
+        async with self._reader() as db:
+            cur = await db.execute(sql, params)
+            rows = await cur.fetchall()
+            await cur.close()
+            return rows
+
+    async def full_scans(self, sql:str) -> list[str]:
+        params = [None] * sql.count("?")
+        async with self._reader() as db:
+            cur = await db.execute("EXPLAIN QUERY PLAN " + sql, params)
+            rows = await cur.fetchall()
+            await cur.close()
+        # "SCAN t" reads the table itself; "SCAN t USING [COVERING] INDEX i" only walks an index
+        return [row[3] for row in rows if row[3].startswith("SCAN ") and " USING " not in row[3]]
+
+    @asynccontextmanager
+    async def transaction(self):
+        async with self._write_lock():
+            try:
+                yield _SqliteTransaction(self._writer)
+            except BaseException:
+                await self._writer.rollback()
+                raise
+            await self._writer.commit()
@@ -0,0 +1,120 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+import signal
+import time
+import aiohttp
+from config import get_config
+from utils.logging_ext import setup_logging
+from utils.metrics import start_metrics_server
+from utils.shared_store import LocalStore, aggregate_metrics, worker_key
+from utils.sharding import shard_ranges
+
+POLL_SECONDS = 5
+RESTART_BACKOFF_SECONDS = (1, 5, 15, 60)
+STOP_TIMEOUT_SECONDS = 30
+HEALTHY_RUN_SECONDS = 300
+GATEWAY_URL = "https://discord.com/api/v10/gateway/bot"
+
+log = logging.getLogger("supervisor")
+
+async def recommended_shards(token:str) -> int:
+    """Shard count Discord recommends for this bot."""
+    async with aiohttp.ClientSession() as session:
+        async with session.get(GATEWAY_URL, headers={"Authorization": f"Bot {token}"}) as resp:
+            resp.raise_for_status()
+            return (await resp.json())["shards"]
+
+def run_worker(worker_id:int, shard_ids:list[int], shard_count:int, store:LocalStore):
+    """Process entry point: one TicketBot owning `shard_ids`."""
+    import bot
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # the supervisor decides when to stop
+    asyncio.run(bot.main(worker_id=worker_id, shard_ids=shard_ids, shard_count=shard_count, store=store))
+
+class Supervisor:
+    """Spawns one worker process per shard range, restarts workers that die and
+    serves metrics merged from what the workers publish to the shared store."""
+
+    def __init__(self, shard_count:int, workers:int, store:LocalStore):
+        self.shard_count = shard_count
+        self.ranges = shard_ranges(shard_count, workers)
+        self.store = store
+        self.ctx = multiprocessing.get_context("spawn")
+        self.procs: dict[int, multiprocessing.Process] = {}
+        self.restarts: dict[int, int] = {}
+        self.started: dict[int, float] = {}
+        self.stopping = asyncio.Event()
+
+    def spawn(self, worker_id:int):
+        proc = self.ctx.Process(target=run_worker, name=f"ticketbot-worker-{worker_id}",
+                                args=(worker_id, self.ranges[worker_id], self.shard_count, self.store))
+        proc.start()
+        self.procs[worker_id] = proc
+        self.started[worker_id] = time.monotonic()
+        log.info("worker %s started (pid %s, shards %s)", worker_id, proc.pid, self.ranges[worker_id])
+
+    async def run(self):
+        for worker_id in range(len(self.ranges)):
+            self.spawn(worker_id)
+        while not self.stopping.is_set():
+            try:
+                await asyncio.wait_for(self.stopping.wait(), timeout=POLL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+            if self.stopping.is_set():
+                break
+            for worker_id, proc in list(self.procs.items()):
+                if proc.is_alive():
+                    continue
+                if time.monotonic() - self.started[worker_id] > HEALTHY_RUN_SECONDS:
+                    self.restarts[worker_id] = 0
+                attempt = self.restarts.get(worker_id, 0)
+                delay = RESTART_BACKOFF_SECONDS[min(attempt, len(RESTART_BACKOFF_SECONDS) - 1)]
+                log.warning("worker %s exited with %s, restarting in %ss", worker_id, proc.exitcode, delay)
+                self.restarts[worker_id] = attempt + 1
+                await asyncio.to_thread(self.store.delete, worker_key(worker_id))
+                await asyncio.sleep(delay)
+                self.spawn(worker_id)
+        await self.shutdown()
+
+    async def shutdown(self):
+        for proc in self.procs.values():
+            if proc.is_alive():
+                proc.terminate()  # SIGTERM, handled by the worker's bot.close()
+        deadline = time.monotonic() + STOP_TIMEOUT_SECONDS
+        for proc in self.procs.values():
+            await asyncio.to_thread(proc.join, max(0.0, deadline - time.monotonic()))
+            if proc.is_alive():
+                proc.kill()
+
+async def supervise():
+    cfg = get_config()
+    setup_logging(log_file=cfg.log_file, max_bytes=cfg.log_max_bytes, backups=cfg.log_backups,
+                  sample_rates=cfg.log_sample_rates)
+    if not cfg.bot_token:
+        print("Set BOT_TOKEN in .env")
+        return
+    shard_count = cfg.shard_count or await recommended_shards(cfg.bot_token)
+    workers = cfg.worker_processes or os.cpu_count() or 1
+    manager = multiprocessing.get_context("spawn").Manager()
+    store = LocalStore.managed(manager)
+    supervisor = Supervisor(shard_count, workers, store)
+    log.info("supervising %s shards across %s workers", shard_count, len(supervisor.ranges))
+    runner = None
+    if cfg.metrics_port:
+        # reading the store is Manager IPC, so it stays off the event loop
+        runner = await start_metrics_server("127.0.0.1", cfg.metrics_port,
+                                            source=lambda: asyncio.to_thread(lambda: aggregate_metrics(store).render()))
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, supervisor.stopping.set)
+        except NotImplementedError:
+            pass
+    try:
+        await supervisor.run()
+    finally:
+        if runner:
+            await runner.cleanup()
+        manager.shutdown()
@@ -0,0 +1,56 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+from cogs.admin import AdminCog, BlacklistFlags
+
+
+class DB:
+    def __init__(self):
+        self.added = []
+
+    async def add_blacklist(self, guild_id, user_id, reason, expires_at=None):
+        self.added.append((guild_id, user_id, reason, expires_at))
+
+
+class Context:
+    bot = None
+    command = None
+    current_parameter = None
+
+    def __init__(self):
+        self.guild = SimpleNamespace(id=1)
+        self.author = "admin"
+        self.replies = []
+
+    async def reply(self, content, **kwargs):
+        self.replies.append(content)
+
+
+def blacklist(text):
+    """Run `!admin blacklist_add @user <text>` and return what was stored."""
+    db = DB()
+    cog = AdminCog(SimpleNamespace(db=db, get_cog=lambda name: None))
+    user = SimpleNamespace(id=5, mention="<@5>")
+
+    async def scenario():
+        ctx = Context()
+        flags = await BlacklistFlags.convert(ctx, text)
+        await AdminCog.blacklist_add.callback(cog, ctx, user, flags=flags)
+    asyncio.run(scenario())
+    return db.added[0]
+
+
+def test_leading_number_stays_part_of_the_reason():
+    assert blacklist("3 strikes spam") == (1, 5, "3 strikes spam", None)
+
+
+def test_expiry_is_an_explicit_flag():
+    started = int(time.time())
+    _, _, reason, expires_at = blacklist("spam hours: 24")
+    assert reason == "spam"
+    assert started + 24 * 3600 <= expires_at <= int(time.time()) + 24 * 3600
+
+
+def test_defaults():
+    assert blacklist("") == (1, 5, "No reason provided", None)
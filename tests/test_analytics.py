@@ -0,0 +1,102 @@
+import asyncio
+import hashlib
+import sqlite3
+
+import numpy as np
+import pytest
+
+import analytics
+from database import Database
+from storage import open_backend
+
+DAY = 86400
+HOUR = 3600
+SINCE = 20_000 * DAY
+
+
+def columns(*tickets):
+    """Columns from (is_private, status, created_at, closed_at, claimed_by) tuples."""
+    private, status, created, closed, claimed_by = zip(*tickets)
+    return {
+        "is_private": np.array(private, np.int8),
+        "status": np.array([analytics.STATUSES.index(s) for s in status], np.int8),
+        "created_at": np.array(created, np.int64),
+        "closed_at": np.array(closed, np.int64),
+        "claimed_by": np.array(claimed_by, np.int64),
+        "claimed_at": np.zeros(len(tickets), np.int64),
+    }
+
+
+COLS = columns(
+    (0, "solved", SINCE + 1 * HOUR, SINCE + 3 * HOUR, 7),            # 2h, day 0
+    (1, "rejected", SINCE + 2 * HOUR, SINCE + DAY + 2 * HOUR, 0),    # 24h, day 1
+    (0, "open", SINCE + DAY + 5 * HOUR, 0, 0),
+    (0, "closed", SINCE - DAY, SINCE + 2 * DAY, 7),                  # 72h, day 2, opened before the window
+    (0, "open", SINCE + 2 * DAY + HOUR, SINCE + 2 * DAY + 2 * HOUR, 0),  # reopened, keeps its closed_at
+)
+
+
+def test_series_buckets_and_medians():
+    report = analytics.compute(COLS, SINCE, SINCE + 3 * DAY)
+    series = report["series"]
+    assert series["opened"] == [2, 1, 1]
+    assert series["closed"] == [1, 1, 1]
+    assert series["backlog"] == [2, 2, 2]
+    assert series["median_resolution_hours"] == [2.0, 24.0, 72.0]
+    assert series["opened_rolling"] == [2.0, 1.5, 1.33]
+    assert report["summary"] == {"opened": 4, "closed": 3, "backlog": 2, "median_resolution_hours": 24.0}
+
+
+def test_weekly_buckets_and_empty_buckets():
+    report = analytics.compute(COLS, SINCE, SINCE + 14 * DAY, bucket="week")
+    assert report["series"]["opened"] == [4, 0]
+    assert report["series"]["closed"] == [3, 0]
+    assert report["series"]["median_resolution_hours"] == [24.0, None]
+    assert report["series"]["p90_resolution_hours"][0] == pytest.approx(62.4)
+
+
+def test_resolution_ratios():
+    ratios = analytics.compute(COLS, SINCE, SINCE + 3 * DAY)["ratios"]
+    rows = {(g, s): i for i, (g, s) in enumerate(zip(ratios["group"], ratios["segment"]))}
+    public, private = rows[("visibility", "public")], rows[("visibility", "private")]
+    assert (ratios["solved"][public], ratios["closed"][public], ratios["total"][public]) == (1, 1, 2)
+    assert ratios["solved_ratio"][public] == 0.5
+    assert ratios["rejected_ratio"][private] == 1.0
+    assert ratios["total"][rows[("claimer", "7")]] == 2
+    assert ratios["total"][rows[("claimer", "unclaimed")]] == 1
+
+
+def test_report_leaves_database_untouched(tmp_path):
+    path = str(tmp_path / "tickets.db")
+
+    async def seed():
+        db = Database(path)
+        await db.init()
+        await db.create_ticket(1, 100, 5, False, "printer offline")
+        await db.close_ticket(100, "solved")
+        await db.close()
+    asyncio.run(seed())
+    # an older schema version must not be migrated by a report
+    with sqlite3.connect(path) as conn:
+        conn.execute("PRAGMA user_version=3")
+    before = hashlib.sha256(open(path, "rb").read()).hexdigest()
+    cols = analytics.load_columns(path, 1, 2 ** 40)
+    assert cols["status"].tolist() == [analytics.STATUSES.index("solved")]
+    assert hashlib.sha256(open(path, "rb").read()).hexdigest() == before
+    with sqlite3.connect(path) as conn:
+        assert conn.execute("PRAGMA user_version").fetchone() == (3,)
+
+
+def test_read_only_backend_refuses_writes(tmp_path):
+    path = str(tmp_path / "tickets.db")
+    sqlite3.connect(path).close()
+
+    async def scenario():
+        db = open_backend(path, read_only=True)
+        await db.connect()
+        try:
+            with pytest.raises(RuntimeError, match="read-only"):
+                await db.execute("CREATE TABLE t (a)")
+        finally:
+            await db.close()
+    asyncio.run(scenario())
@@ -0,0 +1,41 @@
+import asyncio
+
+import pytest
+
+import bot as bot_module
+
+
+class DB:
+    def __init__(self, failures):
+        self.failures = failures
+        self.calls = 0
+
+    async def warm(self):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise RuntimeError("database is locked")
+
+
+class Bot:
+    def __init__(self, db):
+        self.db = db
+        self.closed = False
+
+    async def close(self):
+        self.closed = True
+
+
+def test_warm_caches_retries_transient_failures(monkeypatch):
+    monkeypatch.setattr(bot_module, "WARM_RETRY_SECONDS", 0)
+    bot = Bot(DB(failures=bot_module.WARM_ATTEMPTS - 1))
+    asyncio.run(bot_module.warm_caches(bot))
+    assert bot.db.calls == bot_module.WARM_ATTEMPTS
+    assert not bot.closed
+
+
+def test_warm_caches_shuts_down_instead_of_serving_cold(monkeypatch):
+    monkeypatch.setattr(bot_module, "WARM_RETRY_SECONDS", 0)
+    bot = Bot(DB(failures=bot_module.WARM_ATTEMPTS))
+    with pytest.raises(RuntimeError):
+        asyncio.run(bot_module.warm_caches(bot))
+    assert bot.closed
@@ -0,0 +1,34 @@
+import dataclasses
+
+import pytest
+
+from config import clear_guild_override, get_config, set_guild_override
+
+
+def test_guild_snapshots_are_frozen_and_replaced():
+    base = get_config()
+    set_guild_override(42, "stale_public_days", base.stale_public_days + 1)
+    try:
+        snapshot = get_config(42)
+        assert snapshot.stale_public_days == base.stale_public_days + 1
+        with pytest.raises(dataclasses.FrozenInstanceError):
+            snapshot.stale_public_days = 1
+        set_guild_override(42, "reminder_hours", 1)
+        assert get_config(42) is not snapshot
+        assert snapshot.reminder_hours == base.reminder_hours
+    finally:
+        clear_guild_override(42, "stale_public_days")
+        clear_guild_override(42, "reminder_hours")
+    assert get_config(42) is base
+
+
+def test_container_fields_are_immutable():
+    base = get_config()
+    assert isinstance(base.admin_role_ids, tuple)
+    with pytest.raises(TypeError):
+        base.log_sample_rates["discord"] = 1.0
+    set_guild_override(43, "admin_role_ids", [7, 8])
+    try:
+        assert get_config(43).admin_role_ids == (7, 8)
+    finally:
+        clear_guild_override(43, "admin_role_ids")
@@ -0,0 +1,57 @@
+import asyncio
+
+from database import Database
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+async def open_db(path) -> Database:
+    db = Database(str(path))
+    await db.init()
+    return db
+
+
+def test_ticket_read_back_after_eviction(tmp_path):
+    async def scenario():
+        db = await open_db(tmp_path / "tickets.db")
+        try:
+            await db.create_ticket(1, 100, 5, False, "printer offline again")
+            await db.close_ticket(100, "closed")
+            # drop every cached trace so the lookup has to go to SQL
+            db.registry.discard(100)
+            db.titles.discard(100)
+            ticket = await db.get_ticket_by_thread(100)
+            assert ticket is not None
+            assert (ticket.guild_id, ticket.thread_id, ticket.title, ticket.status) == \
+                (1, 100, "printer offline again", "closed")
+            assert [m[1] for m in db.titles.search(1, "printer offline again", 0.5)] == [100]
+            assert await db.get_ticket_by_thread(999) is None
+        finally:
+            await db.close()
+    run(scenario())
+
+
+def test_threshold_flush_is_awaited_on_close(tmp_path):
+    path = tmp_path / "tickets.db"
+
+    async def scenario():
+        db = await open_db(path)
+        await db.create_ticket(1, 100, 5, False, "printer offline")
+        await db.create_ticket(1, 101, 6, False, "monitor flickers")
+        db.activity.threshold = 2
+        db.activity.record(100, 30_000)
+        db.activity.record(101, 30_001)
+        flush = db.activity._flush_task
+        assert flush is not None and not flush.done()
+        await db.close()
+        assert flush.done() and db.activity._flush_task is None
+
+        db = await open_db(path)
+        try:
+            rows = await db.fetchall("SELECT thread_id, last_user_message_at FROM tickets ORDER BY thread_id")
+            assert rows == [(100, 30_000), (101, 30_001)]
+        finally:
+            await db.close()
+    run(scenario())
@@ -0,0 +1,98 @@
+import asyncio
+
+import jobs
+from database import Database
+from jobs import TranscriptJobQueue
+
+
+class Guild:
+    id = 1
+
+    def get_channel(self, channel_id):
+        return None
+
+
+class Thread:
+    def __init__(self, id):
+        self.id = id
+        self.guild = Guild()
+        self.name = f"ticket-{id}"
+
+
+class Bot:
+    async def wait_until_ready(self):
+        pass
+
+    def get_channel(self, channel_id):
+        return Thread(channel_id)
+
+
+async def job_states(queue, timeout=5.0):
+    """Wait until no job is pending or running and return the status of each job."""
+    deadline = asyncio.get_running_loop().time() + timeout
+    while True:
+        rows = await queue.db.fetchall("SELECT thread_id, status, last_error FROM transcript_jobs ORDER BY id")
+        if all(status not in ("pending", "running") for _, status, _ in rows):
+            return rows
+        assert asyncio.get_running_loop().time() < deadline, rows
+        await asyncio.sleep(0.01)
+
+
+def run_queue(tmp_path, scenario):
+    async def main():
+        db = Database(str(tmp_path / "tickets.db"))
+        await db.init()
+        queue = TranscriptJobQueue(Bot(), db, workers=2)
+        try:
+            await scenario(queue)
+        finally:
+            await asyncio.wait_for(queue.stop(), 5)
+            await db.close()
+    asyncio.run(main())
+
+
+def test_job_without_log_channel_is_failed_not_done(tmp_path):
+    async def scenario(queue):
+        await queue.start()
+        await queue.enqueue(1, 100)
+        assert await job_states(queue) == [(100, "failed", "no log channel configured")]
+        assert await queue.settled([100]) == {100}
+    run_queue(tmp_path, scenario)
+
+
+def test_worker_survives_database_errors(tmp_path, monkeypatch):
+    monkeypatch.setattr(jobs, "POLL_SECONDS", 0.01)
+    uploaded = []
+
+    async def upload(thread_id):
+        uploaded.append(thread_id)
+        return True
+
+    async def scenario(queue):
+        queue.upload = upload
+        claim, calls = queue._claim, 0
+
+        async def flaky_claim():
+            nonlocal calls
+            calls += 1
+            if calls <= 2:
+                raise RuntimeError("database is locked")
+            return await claim()
+        queue._claim = flaky_claim
+        await queue.start()
+        await queue.enqueue(1, 100)
+        await queue.enqueue(1, 101)
+        assert [row[1] for row in await job_states(queue)] == ["done", "done"]
+        assert sorted(uploaded) == [100, 101]
+    run_queue(tmp_path, scenario)
+
+
+def test_stop_right_after_enqueue(tmp_path):
+    async def scenario(queue):
+        queue.upload = lambda thread_id: asyncio.sleep(0, True)
+        for thread_id in range(20):
+            await queue.start()
+            await asyncio.sleep(0)
+            await queue.enqueue(1, thread_id)
+            await asyncio.wait_for(queue.stop(), 5)
+    run_queue(tmp_path, scenario)
@@ -0,0 +1,77 @@
+import asyncio
+import os
+
+from cogs import logging_cog
+from cogs.logging_cog import LoggingCog
+from utils.metrics import metrics
+
+
+class Channel:
+    def __init__(self):
+        self.sent = []
+
+    async def send(self, content):
+        self.sent.append(content)
+
+
+class Guild:
+    def __init__(self, id, channel=None):
+        self.id = id
+        self.channel = channel
+
+    def get_channel(self, channel_id):
+        return self.channel
+
+
+class Bot:
+    def __init__(self, guilds):
+        self.guilds = {g.id: g for g in guilds}
+
+    async def wait_until_ready(self):
+        await asyncio.Event().wait()
+
+    def get_guild(self, guild_id):
+        return self.guilds.get(guild_id)
+
+
+def run_cog(bot, tmp_path, scenario):
+    async def main():
+        cog = LoggingCog(bot)
+        cog.spill_path = str(tmp_path / "spill.jsonl")
+        try:
+            await scenario(cog)
+        finally:
+            await cog.cog_unload()
+    asyncio.run(main())
+
+
+def test_lines_without_log_channel_are_dropped_not_spilled(tmp_path):
+    channel = Channel()
+    bot = Bot([Guild(1, channel), Guild(2)])
+    dropped = metrics.counters["log_dropped"]
+
+    async def scenario(cog):
+        cog.enqueue(1, "kept")
+        cog.enqueue(2, "nowhere to go")
+        await cog.flush()
+        assert channel.sent == ["kept"]
+        assert not os.path.exists(cog.spill_path)
+    run_cog(bot, tmp_path, scenario)
+    assert metrics.counters["log_dropped"] - dropped == 1
+
+
+def test_overflow_is_capped(tmp_path, monkeypatch):
+    monkeypatch.setattr(logging_cog, "LOG_QUEUE_SIZE", 2)
+    monkeypatch.setattr(logging_cog, "LOG_OVERFLOW_LIMIT", 3)
+    channel = Channel()
+    bot = Bot([Guild(1, channel)])
+    dropped = metrics.counters["log_dropped"]
+
+    async def scenario(cog):
+        for i in range(10):
+            cog.enqueue(1, f"line {i}")
+        assert len(cog._overflow) == 3
+        await cog.flush()
+        assert channel.sent == ["\n".join(f"line {i}" for i in range(5))]
+    run_cog(bot, tmp_path, scenario)
+    assert metrics.counters["log_dropped"] - dropped == 5
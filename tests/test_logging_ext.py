@@ -0,0 +1,27 @@
+import logging
+
+import pytest
+
+from utils.logging_ext import SamplingFilter
+
+
+@pytest.mark.parametrize("rates", [
+    {"discord": 1.0, "discord.gateway": 0.0},
+    {"discord.gateway": 0.0, "discord": 1.0},
+])
+def test_longest_prefix_wins_regardless_of_order(rates):
+    sampler = SamplingFilter(rates)
+    assert sampler._rate("discord.gateway") == 0.0
+    assert sampler._rate("discord.gateway.shard") == 0.0
+    assert sampler._rate("discord.http") == 1.0
+    assert sampler._rate("discord") == 1.0
+    assert sampler._rate("discordx.gateway") == 1.0
+    assert sampler._rate("bot") == 1.0
+
+
+def test_warnings_are_never_sampled():
+    sampler = SamplingFilter({"discord": 0.0})
+    info = logging.LogRecord("discord.http", logging.INFO, __file__, 1, "hi", None, None)
+    warning = logging.LogRecord("discord.http", logging.WARNING, __file__, 1, "hi", None, None)
+    assert not sampler.filter(info)
+    assert sampler.filter(warning)
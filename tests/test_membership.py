@@ -0,0 +1,49 @@
+import asyncio
+import time
+
+from utils.membership import BulkMembership
+
+
+class Member:
+    def __init__(self, id):
+        self.id = id
+
+
+class Thread:
+    in_flight = 0
+    peak = 0
+
+    def __init__(self, id, latency=0.01):
+        self.id = id
+        self.latency = latency
+        self.members = set()
+
+    async def add_user(self, member):
+        Thread.in_flight += 1
+        Thread.peak = max(Thread.peak, Thread.in_flight)
+        try:
+            await asyncio.sleep(self.latency)
+        finally:
+            Thread.in_flight -= 1
+        self.members.add(member.id)
+
+
+def test_adds_are_bounded_by_concurrency_not_paced():
+    # 4 threads with 40 staff each; at 10 ms per call and 4 in flight that is ~0.4s.
+    # A fixed 5 calls/s per thread would need 8s.
+    threads, staff, concurrency = 4, 40, 4
+    bulk = BulkMembership(concurrency=concurrency)
+    Thread.peak = 0
+
+    async def scenario():
+        targets = [Thread(i) for i in range(threads)]
+        started = time.perf_counter()
+        results = await asyncio.gather(*[
+            bulk.add(t, [Member(t.id * 100 + j) for j in range(staff)], present=set()) for t in targets])
+        return time.perf_counter() - started, results, targets
+
+    elapsed, results, targets = asyncio.run(scenario())
+    assert all(r.done == staff for r in results)
+    assert all(len(t.members) == staff for t in targets)
+    assert Thread.peak == concurrency
+    assert elapsed < 2.0, f"{threads * staff} adds took {elapsed:.2f}s"
@@ -0,0 +1,39 @@
+import asyncio
+
+from database import Database
+from storage.migrate import migrate
+
+
+def test_migrate_copies_ticket_stats(tmp_path):
+    source, target = str(tmp_path / "source.db"), str(tmp_path / "target.db")
+
+    async def seed():
+        db = Database(source)
+        await db.init()
+        try:
+            for i in range(5):
+                await db.create_ticket(1 + i % 2, 100 + i, 7, bool(i % 2), f"ticket {i}")
+            await db.set_claim(100, 42)
+            await db.close_ticket(100, "solved")
+            return await db.fetchall("SELECT * FROM ticket_stats ORDER BY guild_id, metric, key, bucket")
+        finally:
+            await db.close()
+
+    async def read_back():
+        db = Database(target)
+        await db.init()
+        try:
+            return (await db.fetchall("SELECT * FROM ticket_stats ORDER BY guild_id, metric, key, bucket"),
+                    db.stats.total(1), db.stats.total(2))
+        finally:
+            await db.close()
+
+    stats = asyncio.run(seed())
+    assert len(stats) > 3
+    # batches smaller than the table exercise the primary-key paging
+    counts = asyncio.run(migrate(source, target, batch=2))
+    assert counts["ticket_stats"] == len(stats)
+    assert counts["tickets"] == 5
+    copied, total_1, total_2 = asyncio.run(read_back())
+    assert copied == stats
+    assert (total_1, total_2) == (3, 2)
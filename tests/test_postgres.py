@@ -0,0 +1,157 @@
+"""PostgresBackend against a recording stand-in for the asyncpg pool: checks the
+SQL it emits without a server. tests/test_storage.py covers a real one via PG_DSN."""
+import asyncio
+import re
+from contextlib import asynccontextmanager
+from types import SimpleNamespace
+
+import pytest
+
+import database
+from storage import postgres
+from storage.postgres import PostgresBackend, translate
+
+
+class Conn:
+    def __init__(self, pool):
+        self.pool = pool
+
+    async def execute(self, sql, *params):
+        self.pool.calls.append(("execute", sql, params))
+
+    async def fetchrow(self, sql, *params):
+        self.pool.calls.append(("fetchrow", sql, params))
+        return self.pool.rows[0] if self.pool.rows else None
+
+    async def fetch(self, sql, *params):
+        self.pool.calls.append(("fetch", sql, params))
+        return self.pool.rows
+
+    async def executemany(self, sql, rows):
+        self.pool.calls.append(("executemany", sql, rows))
+
+    async def copy_records_to_table(self, table, records, columns):
+        self.pool.calls.append(("copy", table, (records, columns)))
+
+    @asynccontextmanager
+    async def transaction(self):
+        self.pool.calls.append(("begin", None, ()))
+        yield
+        self.pool.calls.append(("commit", None, ()))
+
+
+class Pool(Conn):
+    def __init__(self, options):
+        super().__init__(self)
+        self.options = options
+        self.calls = []
+        self.rows = []
+        self.closed = False
+
+    @asynccontextmanager
+    async def acquire(self):
+        yield Conn(self)
+
+    async def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def backend(monkeypatch):
+    async def create_pool(dsn, **options):
+        return Pool(dict(options, dsn=dsn))
+    monkeypatch.setattr(postgres, "asyncpg", SimpleNamespace(create_pool=create_pool))
+    backend = PostgresBackend("postgres://bot@localhost/tickets", pool_size=3)
+    asyncio.run(backend.connect())
+    return backend
+
+
+def test_translate_numbers_placeholders_outside_literals():
+    assert translate("SELECT 1 WHERE a=? AND b=?") == "SELECT 1 WHERE a=$1 AND b=$2"
+    assert translate("SELECT '?', 'it''s ?' WHERE a=?") == "SELECT '?', 'it''s ?' WHERE a=$1"
+    assert translate("SELECT 1") == "SELECT 1"
+
+
+@pytest.mark.parametrize("name", sorted(database.HOT_QUERIES))
+def test_hot_queries_translate(name):
+    sql = database.HOT_QUERIES[name]
+    numbered = [int(n) for n in re.findall(r"\$(\d+)", translate(sql))]
+    assert numbered == list(range(1, sql.count("?") + 1))
+    assert "?" not in translate(sql)
+
+
+def test_connect_creates_schema_with_statement_cache(backend):
+    pool = backend._pool
+    assert pool.options["dsn"] == "postgres://bot@localhost/tickets"
+    assert pool.options["max_size"] == 3
+    assert pool.options["statement_cache_size"] == postgres.STATEMENT_CACHE_SIZE
+    assert pool.calls == [("execute", postgres.INIT_SQL, ())]
+
+
+def test_statements_are_translated_and_rows_are_tuples(backend):
+    pool = backend._pool
+    pool.calls.clear()
+    pool.rows = [[1, "open"], [2, "closed"]]
+
+    async def scenario():
+        assert await backend.fetchall("SELECT id, status FROM tickets WHERE guild_id=?", 7) == [(1, "open"), (2, "closed")]
+        assert await backend.fetchone("SELECT id, status FROM tickets WHERE thread_id=?", 9) == (1, "open")
+        assert await backend.execute_returning("INSERT INTO t (a) VALUES (?) RETURNING id", 3) == (1, "open")
+        await backend.execute("DELETE FROM tickets WHERE thread_id=?", 9)
+        await backend.executemany("UPDATE tickets SET title=? WHERE id=?", [("a", 1), ("b", 2)])
+    asyncio.run(scenario())
+    assert pool.calls == [
+        ("fetch", "SELECT id, status FROM tickets WHERE guild_id=$1", (7,)),
+        ("fetchrow", "SELECT id, status FROM tickets WHERE thread_id=$1", (9,)),
+        ("fetchrow", "INSERT INTO t (a) VALUES ($1) RETURNING id", (3,)),
+        ("execute", "DELETE FROM tickets WHERE thread_id=$1", (9,)),
+        ("executemany", "UPDATE tickets SET title=$1 WHERE id=$2", [("a", 1), ("b", 2)]),
+    ]
+
+
+def test_transaction_runs_on_one_connection(backend):
+    pool = backend._pool
+    pool.calls.clear()
+    pool.rows = [[4]]
+
+    async def scenario():
+        async with backend.transaction() as tx:
+            assert await tx.fetchone("SELECT count FROM ticket_stats WHERE guild_id=?", 1) == (4,)
+            await tx.execute(database.STATS_UPSERT.format(values="(?,?,?,?,?),(?,?,?,?,?)"),
+                             1, "status", "open", 0, 1, 1, "created", "", 20000, 1)
+    asyncio.run(scenario())
+    assert [call[0] for call in pool.calls] == ["begin", "fetchrow", "execute", "commit"]
+    upsert = pool.calls[2][1]
+    assert "VALUES ($1,$2,$3,$4,$5),($6,$7,$8,$9,$10)" in upsert
+    assert "ON CONFLICT(guild_id,metric,key,bucket)" in upsert
+
+
+def test_copy_rows_and_sequence_reset(backend):
+    pool = backend._pool
+    pool.calls.clear()
+
+    async def scenario():
+        await backend.copy_rows("blacklist", ["guild_id", "user_id"], [(1, 5)])
+        await backend.reset_sequences()
+        await backend.close()
+    asyncio.run(scenario())
+    assert pool.calls[0] == ("copy", "blacklist", ([(1, 5)], ["guild_id", "user_id"]))
+    resets = [sql for _, sql, _ in pool.calls[1:]]
+    assert [re.search(r"pg_get_serial_sequence\('(\w+)'", sql).group(1) for sql in resets] == list(postgres.SERIAL_TABLES)
+    assert pool.closed and backend._pool is None
+
+
+def test_missing_asyncpg_is_reported(monkeypatch):
+    monkeypatch.setattr(postgres, "asyncpg", None)
+    with pytest.raises(RuntimeError, match="asyncpg"):
+        PostgresBackend("postgres://bot@localhost/tickets")
+
+
+def test_read_only_skips_schema_and_sets_read_only_sessions(monkeypatch):
+    async def create_pool(dsn, **options):
+        return Pool(options)
+    monkeypatch.setattr(postgres, "asyncpg", SimpleNamespace(create_pool=create_pool))
+    backend = PostgresBackend("postgres://bot@localhost/tickets", read_only=True)
+    asyncio.run(backend.connect())
+    assert backend._pool.options["server_settings"] == {"default_transaction_read_only": "on"}
+    assert backend._pool.calls == []
@@ -0,0 +1,42 @@
+import asyncio
+import threading
+import time
+
+import aiohttp
+import pytest
+
+from utils.metrics import start_metrics_server
+from utils.shared_store import LocalStore, SharedStore, aggregate_metrics, worker_key
+
+
+def test_shared_store_is_abstract():
+    with pytest.raises(TypeError):
+        SharedStore()
+
+
+def test_aggregate_skips_quiet_workers():
+    store = LocalStore()
+    now = time.time()
+    store.put(worker_key(0), {"worker_id": 0, "at": now, "metrics": {"counters": {"tickets_created": 2}}})
+    store.put(worker_key(1), {"worker_id": 1, "at": now - 3600, "metrics": {"counters": {"tickets_created": 5}}})
+    assert aggregate_metrics(store).counters["tickets_created"] == 2
+
+
+def test_metrics_server_awaits_async_source():
+    served_from = []
+
+    def render():
+        served_from.append(threading.current_thread())
+        return "tickets_created 2\n"
+
+    async def scenario():
+        runner = await start_metrics_server("127.0.0.1", 0, source=lambda: asyncio.to_thread(render))
+        try:
+            host, port = runner.addresses[0][:2]
+            async with aiohttp.ClientSession() as session:
+                async with session.get(f"http://{host}:{port}/metrics") as response:
+                    return await response.text()
+        finally:
+            await runner.cleanup()
+    assert asyncio.run(scenario()) == "tickets_created 2\n"
+    assert served_from and served_from[0] is not threading.main_thread()
@@ -0,0 +1,117 @@
+"""Storage contract: the same Database behaviour on every backend.
+
+SQLite always runs. Set PG_DSN to a scratch PostgreSQL database (its ticket
+tables are truncated) and install asyncpg to run the tests against Postgres too.
+"""
+import asyncio
+import os
+import time
+
+import pytest
+
+from database import Database
+from storage import open_backend
+from storage.migrate import TABLES
+
+
+async def truncate(dsn):
+    backend = open_backend(dsn)
+    await backend.connect()
+    try:
+        await backend.execute(f"TRUNCATE {', '.join(TABLES)} RESTART IDENTITY")
+    finally:
+        await backend.close()
+
+
+@pytest.fixture(params=["sqlite", "postgres"])
+def target(request, tmp_path):
+    if request.param == "sqlite":
+        return str(tmp_path / "tickets.db")
+    dsn = os.environ.get("PG_DSN")
+    if not dsn:
+        pytest.skip("PG_DSN not set")
+    pytest.importorskip("asyncpg")
+    asyncio.run(truncate(dsn))
+    return dsn
+
+
+def run_db(target, scenario):
+    async def main():
+        db = Database(target)
+        await db.init()
+        try:
+            await scenario(db)
+        finally:
+            await db.close()
+    asyncio.run(main())
+
+
+def test_ticket_lifecycle(target):
+    async def scenario(db):
+        first = await db.create_ticket(1, 100, 5, False, "printer offline")
+        second = await db.create_ticket(1, 101, 5, True, "vpn drops")
+        assert second.id > first.id
+        await db.set_claim(100, 9)
+        await db.close_ticket(100, "solved")
+        assert [t.thread_id for t in await db.list_open_tickets_by_user(1, 5)] == [101]
+        assert sorted(await db.count_by_status(1)) == [("open", 1), ("solved", 1)]
+        db.registry.discard(100)
+        ticket = await db.get_ticket_by_thread(100)
+        assert (ticket.status, ticket.claimed_by, ticket.is_private) == ("solved", 9, False)
+        assert ticket.closed_at is not None
+        assert db.stats.status_counts(1) == {"open": 1, "solved": 1}
+        assert db.stats.staff_closed(1, 1, int(time.time())) == [(9, 1)]
+    run_db(target, scenario)
+
+
+def test_stats_survive_rebuild_and_delete(target):
+    async def scenario(db):
+        for thread_id in (100, 101, 102):
+            await db.create_ticket(1, thread_id, 5, False, f"ticket {thread_id}")
+        await db.close_ticket(100, "closed")
+        await db.delete_tickets([101])
+        assert db.stats.status_counts(1) == {"open": 1, "closed": 1}
+        await db.rebuild_stats()
+        await db.warm()
+        assert db.stats.status_counts(1) == {"open": 1, "closed": 1}
+        assert await db.get_ticket_by_thread(101) is None
+    run_db(target, scenario)
+
+
+def test_stale_and_purge_queries(target):
+    async def scenario(db):
+        now = int(time.time())
+        for thread_id in (100, 101, 102):
+            await db.create_ticket(1, thread_id, 5, False, f"ticket {thread_id}")
+        await db.execute("UPDATE tickets SET last_user_message_at=? WHERE thread_id=100", now - 86400)
+        await db.mark_reminded([100])
+        await db.mark_reminded([100])
+        assert [row[0] for row in await db.tickets_stale(1, now - 60, now - 60)] == [100]
+        for thread_id in (101, 102):
+            await db.close_ticket(thread_id, "closed")
+        await db.execute("UPDATE tickets SET closed_at=? WHERE thread_id IN (?,?)", now - 86400, 101, 102)
+        first = await db.archive_purge_candidates(1, now, limit=1)
+        assert [row[1] for row in first] == [101]
+        rest = await db.archive_purge_candidates(1, now, (first[0][2], first[0][0]))
+        assert [row[1] for row in rest] == [102]
+        await db.save_purge_checkpoint(1, now, first[0][2], first[0][0])
+        await db.save_purge_checkpoint(1, now, rest[0][2], rest[0][0])
+        assert await db.get_purge_checkpoint(1) == (now, rest[0][2], rest[0][0])
+    run_db(target, scenario)
+
+
+def test_blacklist_and_settings(target):
+    async def scenario(db):
+        now = int(time.time())
+        await db.add_blacklist(1, 5, "spam")
+        await db.add_blacklist(1, 6, "spam", expires_at=now - 1)
+        assert await db.is_blacklisted(1, 5)
+        assert not await db.is_blacklisted(1, 6)
+        assert [row[0] for row in await db.list_blacklist(1)] == [5]
+        assert await db.expire_blacklist() == 1
+        await db.set_state("command_tree_hash", "a")
+        await db.set_state("command_tree_hash", "b")
+        assert await db.get_state("command_tree_hash") == "b"
+        await db.set_config_override(1, "stale_public_days", "3")
+        assert await db.config_overrides() == [(1, "stale_public_days", "3")]
+    run_db(target, scenario)
@@ -0,0 +1,122 @@
+import asyncio
+from functools import partial
+from types import SimpleNamespace
+
+import discord
+
+from cogs.tickets import TicketCog
+from database import Database
+from jobs import TranscriptJobQueue
+from utils.ratelimit import RateLimiter
+
+
+class Thread:
+    def __init__(self, id):
+        self.id = id
+        self.deleted = False
+
+    async def delete(self):
+        self.deleted = True
+
+
+class Jobs:
+    def __init__(self, posted, error=None):
+        self.posted = posted
+        self.error = error
+        self.uploads = []
+
+    async def upload(self, thread_id):
+        self.uploads.append(thread_id)
+        if self.error:
+            raise self.error
+        return self.posted
+
+
+def http_error(cls, status):
+    return cls(SimpleNamespace(status=status, reason=""), "")
+
+
+def purge_thread(thread, archived, posted, error=None):
+    """Run TicketCog._purge_thread against fakes; returns (result, jobs)."""
+    jobs = Jobs(posted, error)
+
+    async def resolve(guild, thread_id):
+        return thread
+    cog = SimpleNamespace(bot=SimpleNamespace(transcript_jobs=jobs), _resolve_thread=resolve)
+    result = asyncio.run(TicketCog._purge_thread(cog, None, thread.id, archived, RateLimiter(1, 100)))
+    return result, jobs
+
+
+def test_purge_without_log_channel_deletes_thread():
+    # upload() posts nothing when no log channel is configured; that never resolves itself
+    thread = Thread(100)
+    result, jobs = purge_thread(thread, archived=False, posted=False)
+    assert jobs.uploads == [100]
+    assert result is True
+    assert thread.deleted
+
+
+def test_purge_after_forbidden_upload_deletes_thread():
+    thread = Thread(100)
+    result, jobs = purge_thread(thread, archived=False, posted=True, error=http_error(discord.Forbidden, 403))
+    assert result is True
+    assert thread.deleted
+
+
+def test_purge_keeps_thread_after_transient_upload_error():
+    thread = Thread(100)
+    result, jobs = purge_thread(thread, archived=False, posted=True, error=http_error(discord.HTTPException, 503))
+    assert result is False
+    assert not thread.deleted
+
+
+def test_purge_deletes_thread_after_upload():
+    thread = Thread(100)
+    result, jobs = purge_thread(thread, archived=False, posted=True)
+    assert result is True
+    assert thread.deleted
+
+
+def test_purge_skips_upload_of_archived_thread():
+    thread = Thread(100)
+    result, jobs = purge_thread(thread, archived=True, posted=False)
+    assert jobs.uploads == []
+    assert result is True
+    assert thread.deleted
+
+
+def test_purge_guild_without_log_channel_clears_candidates(tmp_path):
+    class Guild:
+        id = 1
+
+        def get_channel(self, channel_id):
+            return None
+
+    guild = Guild()
+    threads = {t: Thread(t) for t in (100, 101, 102)}
+    for thread in threads.values():
+        thread.guild = guild
+
+    async def scenario():
+        db = Database(str(tmp_path / "tickets.db"))
+        await db.init()
+        try:
+            for thread_id in threads:
+                await db.create_ticket(1, thread_id, 5, False, f"ticket {thread_id}")
+                await db.close_ticket(thread_id, "closed")
+            await db.execute("UPDATE tickets SET closed_at=closed_at-?", 365 * 86400)
+            bot = SimpleNamespace(get_channel=threads.get, get_cog=lambda name: None)
+            bot.transcript_jobs = TranscriptJobQueue(bot, db)
+
+            async def resolve(guild, thread_id):
+                return threads[thread_id]
+            cog = SimpleNamespace(bot=bot, db=db, _resolve_thread=resolve)
+            cog._purge_thread = partial(TicketCog._purge_thread, cog)
+            cog.send_log = partial(TicketCog.send_log, cog)
+            await TicketCog.purge_guild(cog, guild)
+            assert all(t.deleted for t in threads.values())
+            # nothing is left for the next daily run to page through
+            assert await db.archive_purge_candidates(1, 2 ** 40) == []
+        finally:
+            await db.close()
+    asyncio.run(scenario())
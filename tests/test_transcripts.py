@@ -0,0 +1,67 @@
+import asyncio
+import io
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import pytest
+
+import transcripts
+from transcripts import HtmlWriter, PlainWriter, TranscriptWriter, build_transcript_files
+
+
+class Thread:
+    def __init__(self, messages):
+        self.id = 100
+        self.name = "printer <offline>"
+        self.messages = messages
+
+    async def history(self, limit=None, oldest_first=False):
+        for message in self.messages:
+            yield message
+
+
+def messages(n, content="hello"):
+    sent = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    return [SimpleNamespace(author=SimpleNamespace(id=5), content=f"{content} {i}", created_at=sent)
+            for i in range(n)]
+
+
+def build(thread):
+    return asyncio.run(build_transcript_files(thread))
+
+
+def test_writer_base_is_abstract():
+    with pytest.raises(TypeError):
+        TranscriptWriter(Thread([]))
+
+
+def test_files_hold_both_formats_in_memory():
+    files = build(Thread(messages(3)))
+    assert [f.filename for f in files] == ["transcript-100.txt", "transcript-100.html"]
+    assert all(isinstance(f.fp, io.BytesIO) for f in files)
+    plain, page = (f.fp.read().decode() for f in files)
+    assert plain.count("\n") == 2 and plain.endswith("hello 2")
+    assert "printer &lt;offline&gt;" in page and page.endswith("</body></html>")
+
+
+def test_large_transcripts_move_to_a_real_file(monkeypatch):
+    monkeypatch.setattr(transcripts, "SPOOL_MAX_BYTES", 1024)
+    thread = Thread(messages(200, "x" * 40))
+    expected = asyncio.run(transcripts.export_plain(thread))
+    files = build(thread)
+    for f in files:
+        assert isinstance(f.fp, io.IOBase) and not isinstance(f.fp, io.BytesIO)
+        assert f.fp.tell() == 0
+    assert files[0].fp.read() == expected
+    for f in files:
+        f.close()
+
+
+def test_writers_emit_in_order():
+    thread = Thread(messages(2))
+    plain, page = PlainWriter(thread), HtmlWriter(thread)
+    for message in thread.messages:
+        plain.write(message)
+        page.write(message)
+    assert plain.finish().read().decode().splitlines()[1].endswith("hello 1")
+    assert page.finish().read().decode().count("<div class='msg'>") == 2
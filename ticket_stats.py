@@ -0,0 +1,111 @@
+from collections import Counter
+from registry import OPEN_STATUSES
+
+DAY = 86400
+
+# metric names; each rollup row is (guild_id, metric, key, bucket, count)
+STATUS = "status"              # key=status, bucket=0: tickets currently in that status
+CREATED = "created"            # bucket=day: tickets opened that day
+CLOSED = "closed"              # key=status, bucket=day: closes per resolution per day
+CLAIM_TIME = "claim_time"      # bucket=duration bucket: seconds from open to first claim
+CLOSE_TIME = "close_time"      # bucket=duration bucket: seconds from open to close
+STAFF_CLOSED = "staff_closed"  # key=staff id, bucket=day: closes of tickets the member had claimed
+
+def day(ts:int) -> int:
+    return ts // DAY
+
+def duration_bucket(seconds:int) -> int:
+    """Log2 histogram bucket: bucket b holds durations in [2**(b-1), 2**b) seconds."""
+    return max(0, int(seconds)).bit_length()
+
+def created(ticket_created_at:int) -> list[tuple[str, str, int, int]]:
+    return [(STATUS, "open", 0, 1), (CREATED, "", day(ticket_created_at), 1)]
+
+def moved(old:str, new:str) -> list[tuple[str, str, int, int]]:
+    return [] if old == new else [(STATUS, old, 0, -1), (STATUS, new, 0, 1)]
+
+def claimed(created_at:int, claimed_at:int) -> list[tuple[str, str, int, int]]:
+    return [(CLAIM_TIME, "", duration_bucket(claimed_at - created_at), 1)]
+
+def closed(old:str, new:str, created_at:int, closed_at:int, claimed_by:int|None) -> list[tuple[str, str, int, int]]:
+    deltas = moved(old, new) + [(CLOSED, new, day(closed_at), 1),
+                                (CLOSE_TIME, "", duration_bucket(closed_at - created_at), 1)]
+    if claimed_by:
+        deltas.append((STAFF_CLOSED, str(claimed_by), day(closed_at), 1))
+    return deltas
+
+def from_tickets(rows) -> Counter:
+    """Rollup counts keyed by (guild_id, metric, key, bucket) rebuilt from
+    (guild_id, status, created_at, closed_at, claimed_by, claimed_at) rows."""
+    totals = Counter()
+    for guild_id, status, created_at, closed_at, claimed_by, claimed_at in rows:
+        totals[(guild_id, STATUS, status, 0)] += 1
+        totals[(guild_id, CREATED, "", day(created_at))] += 1
+        if claimed_at:
+            totals[(guild_id, CLAIM_TIME, "", duration_bucket(claimed_at - created_at))] += 1
+        if closed_at and status not in OPEN_STATUSES:
+            totals[(guild_id, CLOSED, status, day(closed_at))] += 1
+            totals[(guild_id, CLOSE_TIME, "", duration_bucket(closed_at - created_at))] += 1
+            if claimed_by:
+                totals[(guild_id, STAFF_CLOSED, str(claimed_by), day(closed_at))] += 1
+    return totals
+
+def _median(histogram:dict[int, int]) -> int | None:
+    total = sum(histogram.values())
+    if not total:
+        return None
+    seen = 0
+    for bucket in sorted(histogram):
+        seen += histogram[bucket]
+        if seen * 2 >= total:
+            # geometric middle of [2**(b-1), 2**b)
+            return 0 if bucket == 0 else round(2 ** (bucket - 1) * 2 ** 0.5)
+    return None
+
+class TicketStats:
+    """In-memory copy of the ticket_stats rollup, grouped per guild and metric so
+    every /admin stats figure is a handful of dict lookups regardless of history size."""
+
+    def __init__(self):
+        self._guilds: dict[int, dict[str, Counter]] = {}
+
+    def _metric(self, guild_id:int, metric:str) -> Counter:
+        return self._guilds.setdefault(guild_id, {}).setdefault(metric, Counter())
+
+    def load(self, rows):
+        """Replace the cache from (guild_id, metric, key, bucket, count) rows."""
+        self._guilds = {}
+        for guild_id, metric, key, bucket, count in rows:
+            if count:
+                self._metric(guild_id, metric)[(key, bucket)] += count
+
+    def apply(self, guild_id:int, deltas):
+        for metric, key, bucket, delta in deltas:
+            counts = self._metric(guild_id, metric)
+            counts[(key, bucket)] += delta
+            if not counts[(key, bucket)]:
+                del counts[(key, bucket)]
+
+    def status_counts(self, guild_id:int) -> dict[str, int]:
+        return {key: n for (key, _), n in self._metric(guild_id, STATUS).items()}
+
+    def total(self, guild_id:int) -> int:
+        return sum(self._metric(guild_id, STATUS).values())
+
+    def created_since(self, guild_id:int, days:int, now:int) -> int:
+        counts, today = self._metric(guild_id, CREATED), day(now)
+        return sum(counts.get(("", d), 0) for d in range(today - days + 1, today + 1))
+
+    def median_claim_seconds(self, guild_id:int) -> int | None:
+        return _median({bucket: n for (_, bucket), n in self._metric(guild_id, CLAIM_TIME).items()})
+
+    def median_close_seconds(self, guild_id:int) -> int | None:
+        return _median({bucket: n for (_, bucket), n in self._metric(guild_id, CLOSE_TIME).items()})
+
+    def staff_closed(self, guild_id:int, days:int, now:int) -> list[tuple[int, int]]:
+        """(member_id, tickets closed) over the last `days` days, busiest first."""
+        since, per_staff = day(now) - days + 1, Counter()
+        for (key, bucket), n in self._metric(guild_id, STAFF_CLOSED).items():
+            if bucket >= since:
+                per_staff[int(key)] += n
+        return per_staff.most_common()
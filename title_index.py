@@ -0,0 +1,80 @@
+import re
+from collections import Counter
+from rapidfuzz import fuzz, process
+from rapidfuzz.utils import default_process
+
+MAX_CANDIDATES = 64
+COMMON_TOKEN_POSTINGS = 2000
+
+_TOKEN_RE = re.compile(r"\w{2,}")
+
+def tokenize(text:str) -> set[str]:
+    return set(_TOKEN_RE.findall(text.lower()))
+
+class _GuildTitles:
+    __slots__ = ("titles", "processed", "threads", "postings")
+
+    def __init__(self):
+        self.titles: list[str | None] = []
+        self.processed: list[str] = []
+        self.threads: list[int] = []
+        self.postings: dict[str, list[int]] = {}
+
+class TitleIndex:
+    """Per-guild inverted index over ticket titles. Candidates sharing the most
+    tokens with the query are shortlisted, then fuzzy-scored in one batch."""
+
+    def __init__(self, max_candidates:int=MAX_CANDIDATES):
+        self.max_candidates = max_candidates
+        self._guilds: dict[int, _GuildTitles] = {}
+        self._slots: dict[int, tuple[int, int]] = {}
+
+    def __len__(self):
+        return len(self._slots)
+
+    def add(self, guild_id:int, thread_id:int, title:str):
+        if thread_id in self._slots:
+            return
+        g = self._guilds.setdefault(guild_id, _GuildTitles())
+        slot = len(g.titles)
+        g.titles.append(title)
+        g.processed.append(default_process(title))
+        g.threads.append(thread_id)
+        for tok in tokenize(title):
+            g.postings.setdefault(tok, []).append(slot)
+        self._slots[thread_id] = (guild_id, slot)
+
+    def discard(self, thread_id:int):
+        """Tombstone a title; its postings are skipped at query time."""
+        found = self._slots.pop(thread_id, None)
+        if found:
+            guild_id, slot = found
+            self._guilds[guild_id].titles[slot] = None
+
+    def candidates(self, guild_id:int, title:str) -> list[int]:
+        g = self._guilds.get(guild_id)
+        if not g:
+            return []
+        counts = Counter()
+        postings = [g.postings[t] for t in tokenize(title) if t in g.postings]
+        for posting in sorted(postings, key=len):
+            if len(posting) > COMMON_TOKEN_POSTINGS:
+                if counts:
+                    # too common to narrow anything down further
+                    break
+                # only common tokens in the query: bound the work to the newest titles
+                posting = posting[-COMMON_TOKEN_POSTINGS:]
+            counts.update(posting)
+        titles = g.titles
+        return [slot for slot, _ in counts.most_common(self.max_candidates * 2) if titles[slot] is not None][:self.max_candidates]
+
+    def search(self, guild_id:int, title:str, threshold:float, limit:int=3) -> list[tuple[str, int, float]]:
+        """Return up to `limit` (title, thread_id, score) matches scoring at least `threshold` (0..1)."""
+        slots = self.candidates(guild_id, title)
+        if not slots:
+            return []
+        g = self._guilds[guild_id]
+        choices = {slot: g.processed[slot] for slot in slots}
+        matches = process.extract(default_process(title), choices, scorer=fuzz.token_set_ratio,
+                                  processor=None, limit=limit, score_cutoff=threshold * 100)
+        return [(g.titles[slot], g.threads[slot], score / 100) for _, score, slot in matches]
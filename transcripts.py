@@ -1,34 +1,100 @@
 import discord
 import html
 import io
+from abc import ABC, abstractmethod
 from datetime import timezone
+from tempfile import TemporaryFile
 
-async def export_plain(thread: discord.Thread) -> bytes:
-    lines = []
-    async for message in thread.history(limit=None, oldest_first=True):
+SPOOL_MAX_BYTES = 1024 * 1024
+
+class TranscriptWriter(ABC):
+    """Receives messages one at a time and writes them to memory, moving to a temp
+    file past SPOOL_MAX_BYTES. Both are plain io objects, which discord.File needs
+    (SpooledTemporaryFile only became an io.IOBase in Python 3.11)."""
+    extension = ""
+
+    def __init__(self, thread: discord.Thread):
+        self.thread = thread
+        self.fp = io.BytesIO()
+        self.count = 0
+
+    def _emit(self, text: str):
+        self.fp.write(text.encode("utf-8"))
+        if isinstance(self.fp, io.BytesIO) and self.fp.tell() > SPOOL_MAX_BYTES:
+            disk = TemporaryFile(mode="w+b")
+            disk.write(self.fp.getbuffer())
+            self.fp = disk
+
+    @abstractmethod
+    def write(self, message: discord.Message):
+        ...
+
+    def finish(self):
+        self.fp.seek(0)
+        return self.fp
+
+class PlainWriter(TranscriptWriter):
+    extension = "txt"
+
+    def write(self, message: discord.Message):
         ts = message.created_at.astimezone(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
         author = f"{message.author} ({message.author.id})"
         content = message.content.replace("\n"," \\n ")
-        lines.append(f"[{ts} UTC] {author}: {content}")
-    return "\n".join(lines).encode("utf-8")
+        if self.count:
+            self._emit("\n")
+        self._emit(f"[{ts} UTC] {author}: {content}")
+        self.count += 1
 
-async def export_html(thread: discord.Thread) -> bytes:
-    buf = ["<html><head><meta charset='utf-8'><title>Transcript</title></head><body>"]
-    buf.append(f"<h1>Transcript: {html.escape(thread.name)}</h1>")
-    async for message in thread.history(limit=None, oldest_first=True):
+class HtmlWriter(TranscriptWriter):
+    extension = "html"
+
+    def __init__(self, thread: discord.Thread):
+        super().__init__(thread)
+        self._emit("<html><head><meta charset='utf-8'><title>Transcript</title></head><body>")
+        self._emit(f"\n<h1>Transcript: {html.escape(thread.name)}</h1>")
+
+    def write(self, message: discord.Message):
         ts = message.created_at.astimezone(timezone.utc).isoformat()
-        buf.append("<div class='msg'>")
-        buf.append(f"<span class='ts'>{ts}</span> ")
-        buf.append(f"<strong>{html.escape(str(message.author))}</strong>: ")
-        buf.append(f"<span class='content'>{html.escape(message.content)}</span>")
-        buf.append("</div>")
-    buf.append("</body></html>")
-    return "\n".join(buf).encode("utf-8")
-
-async def build_transcript_files(thread: discord.Thread):
-    plain = await export_plain(thread)
-    html_bytes = await export_html(thread)
+        self._emit("\n<div class='msg'>")
+        self._emit(f"\n<span class='ts'>{ts}</span> ")
+        self._emit(f"\n<strong>{html.escape(str(message.author))}</strong>: ")
+        self._emit(f"\n<span class='content'>{html.escape(message.content)}</span>")
+        self._emit("\n</div>")
+        self.count += 1
+
+    def finish(self):
+        self._emit("\n</body></html>")
+        return super().finish()
+
+DEFAULT_WRITERS = (PlainWriter, HtmlWriter)
+
+async def stream_transcript(thread: discord.Thread, writers: list[TranscriptWriter]):
+    """Walk the thread history once, fanning every message out to all writers."""
+    async for message in thread.history(limit=None, oldest_first=True):
+        for writer in writers:
+            writer.write(message)
+    return [writer.finish() for writer in writers]
+
+async def _export(thread: discord.Thread, writer_cls) -> bytes:
+    (fp,) = await stream_transcript(thread, [writer_cls(thread)])
+    with fp:
+        return fp.read()
+
+async def export_plain(thread: discord.Thread) -> bytes:
+    return await _export(thread, PlainWriter)
+
+async def export_html(thread: discord.Thread) -> bytes:
+    return await _export(thread, HtmlWriter)
+
+async def build_transcript_files(thread: discord.Thread, writer_classes=DEFAULT_WRITERS):
+    writers = [cls(thread) for cls in writer_classes]
+    try:
+        files = await stream_transcript(thread, writers)
+    except BaseException:
+        for writer in writers:
+            writer.fp.close()
+        raise
     return [
-        discord.File(io.BytesIO(plain), filename=f"transcript-{thread.id}.txt"),
-        discord.File(io.BytesIO(html_bytes), filename=f"transcript-{thread.id}.html"),
-    ]
\ No newline at end of file
+        discord.File(fp, filename=f"transcript-{thread.id}.{writer.extension}")
+        for writer, fp in zip(writers, files)
+    ]
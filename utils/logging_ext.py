@@ -1,12 +1,108 @@
+import atexit
+import copy
+import json
 import logging
+import logging.handlers
+import queue
+import random
 import sys
+from typing import Mapping
 
-def setup_logging():
+CONTEXT_FIELDS = ("guild", "ticket", "command", "latency_ms")
+DEFAULT_SAMPLE_RATES = {"discord.gateway": 0.1}
+
+_listener: logging.handlers.QueueListener | None = None
+_plain = logging.Formatter()
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, carrying any context fields passed via `extra=`."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            "ts": self.formatTime(record, "%Y-%m-%dT%H:%M:%S") + f".{int(record.msecs):03d}",
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for field in CONTEXT_FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                data[field] = value
+        if record.exc_info:
+            data["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            data["exc"] = record.exc_text
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+class SamplingFilter(logging.Filter):
+    """Keeps only a fraction of sub-WARNING records from noisy loggers. A logger
+    takes the rate of its longest configured prefix, so "discord.gateway" wins
+    over "discord" whatever order they are listed in."""
+
+    def __init__(self, rates: Mapping[str, float]):
+        super().__init__()
+        self.rates = rates
+        self._cache: dict[str, float] = {}
+
+    def _rate(self, name: str) -> float:
+        rate = self._cache.get(name)
+        if rate is None:
+            prefix = name
+            while prefix not in self.rates and "." in prefix:
+                prefix = prefix.rpartition(".")[0]
+            rate = self.rates.get(prefix, 1.0)
+            self._cache[name] = rate
+        return rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        rate = self._rate(record.name)
+        return rate >= 1.0 or random.random() < rate
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Resolve the message now (args may not be safe to format on another
+        # thread) but keep the traceback separate for the JSON formatter.
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = _plain.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+def setup_logging(level=logging.INFO, log_file: str = "", max_bytes: int = 10 * 1024 * 1024,
+                  backups: int = 5, sample_rates: dict[str, float] | None = None):
+    """Route all logging through a queue drained by a listener thread, so log I/O
+    never runs on the event loop. Output is JSON lines on stdout and, optionally,
+    a size-rotated file."""
+    global _listener
     logger = logging.getLogger()
     if logger.handlers:
         return
-    logger.setLevel(logging.INFO)
-    fmt = logging.Formatter("[%(asctime)s] %(levelname)s %(name)s %(message)s")
-    handler = logging.StreamHandler(sys.stdout)
-    handler.setFormatter(fmt)
-    logger.addHandler(handler)
\ No newline at end of file
+    logger.setLevel(level)
+    fmt = JsonFormatter()
+    handlers: list[logging.Handler] = []
+    stream = logging.StreamHandler(sys.stdout)
+    stream.setFormatter(fmt)
+    handlers.append(stream)
+    if log_file:
+        rotating = logging.handlers.RotatingFileHandler(log_file, maxBytes=max_bytes, backupCount=backups,
+                                                        encoding="utf-8")
+        rotating.setFormatter(fmt)
+        handlers.append(rotating)
+    q: queue.SimpleQueue = queue.SimpleQueue()
+    handler = _QueueHandler(q)
+    handler.addFilter(SamplingFilter(DEFAULT_SAMPLE_RATES if sample_rates is None else sample_rates))
+    logger.addHandler(handler)
+    _listener = logging.handlers.QueueListener(q, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+def shutdown_logging():
+    """Flush queued records and stop the listener thread."""
+    global _listener
+    if _listener:
+        _listener.stop()
+        _listener = None
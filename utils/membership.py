@@ -0,0 +1,59 @@
+import asyncio
+import logging
+import time
+from typing import Iterable, NamedTuple
+import discord
+
+MEMBERSHIP_CONCURRENCY = 4
+
+log = logging.getLogger(__name__)
+
+class BatchResult(NamedTuple):
+    done: int
+    skipped: int
+    failed: int
+    seconds: float
+
+class BulkMembership:
+    """Adds or removes many members on a thread with bounded concurrency.
+
+    Current membership is fetched once per batch so members already present (or
+    already gone) cost no request. discord.py already waits out each thread's route
+    bucket from the X-RateLimit headers, so the only limit added here is the
+    semaphore capping global concurrency."""
+
+    def __init__(self, concurrency:int=MEMBERSHIP_CONCURRENCY):
+        self._sem = asyncio.Semaphore(concurrency)
+        self.concurrency = concurrency
+
+    async def add(self, thread:discord.Thread, members:Iterable[discord.abc.Snowflake],
+                  present:set[int]|None=None) -> BatchResult:
+        return await self._run(thread, thread.add_user, members, present, want_present=False)
+
+    async def remove(self, thread:discord.Thread, members:Iterable[discord.abc.Snowflake],
+                     present:set[int]|None=None) -> BatchResult:
+        return await self._run(thread, thread.remove_user, members, present, want_present=True)
+
+    async def current_members(self, thread:discord.Thread) -> set[int]:
+        return {m.id for m in await thread.fetch_members()}
+
+    async def _run(self, thread, op, members, present, want_present:bool) -> BatchResult:
+        start = time.perf_counter()
+        unique = {m.id: m for m in members}
+        if present is None:
+            present = await self.current_members(thread)
+        targets = [m for mid, m in unique.items() if (mid in present) == want_present]
+        async def one(member) -> bool:
+            try:
+                async with self._sem:
+                    await op(member)
+                return True
+            except discord.HTTPException:
+                return False
+        results = await asyncio.gather(*[one(m) for m in targets])
+        done = sum(results)
+        result = BatchResult(done, len(unique) - len(targets), len(targets) - done, time.perf_counter() - start)
+        log.info("%s on thread %s: %d done, %d skipped, %d failed in %.2fs", op.__name__, thread.id, *result)
+        return result
+
+membership = BulkMembership()
@@ -1,15 +1,236 @@
+import inspect
 import time
+from bisect import bisect_left
 from collections import Counter
+from functools import wraps
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+def _key(labels:dict) -> tuple:
+    return tuple(sorted(labels.items())) if labels else ()
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _fmt_labels(key:tuple, extra:tuple=()) -> str:
+    pairs = key + extra
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+class Histogram:
+    """Fixed-bucket histogram; observe() is a bisect and two additions."""
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value:float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def merge(self, other:"Histogram"):
+        for i, c in enumerate(other.counts):
+            self.counts[i] += c
+        self.sum += other.sum
+        self.count += other.count
+
+    def quantile(self, q:float) -> float:
+        """Estimate by linear interpolation inside the bucket holding the q-th value."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, c in enumerate(self.counts):
+            if seen + c >= rank and c:
+                lower = self.buckets[i - 1] if i else 0.0
+                upper = self.buckets[i] if i < len(self.buckets) else self.buckets[-1]
+                return lower + (upper - lower) * (rank - seen) / c
+            seen += c
+        return self.buckets[-1]
+
+class _Timer:
+    __slots__ = ("metrics", "name", "labels", "start")
+
+    def __init__(self, metrics:"Metrics", name:str, labels:dict):
+        self.metrics = metrics
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.metrics.observe(self.name, time.perf_counter() - self.start, **self.labels)
+        return False
 
 class Metrics:
     def __init__(self):
         self.counters = Counter()
+        self.labeled: dict[str, Counter] = {}
+        self.gauges: dict[str, dict[tuple, float]] = {}
+        self.histograms: dict[str, dict[tuple, Histogram]] = {}
+        self.help: dict[str, str] = {}
         self.start_time = time.time()
 
-    def incr(self, key:str, n:int=1):
+    def describe(self, name:str, text:str):
+        self.help[name] = text
+
+    def incr(self, key:str, n:int=1, **labels):
         self.counters[key]+=n
+        if labels:
+            self.labeled.setdefault(key, Counter())[_key(labels)] += n
+
+    def set_gauge(self, name:str, value:float, **labels):
+        self.gauges.setdefault(name, {})[_key(labels)] = value
+
+    def observe(self, name:str, value:float, **labels):
+        series = self.histograms.get(name)
+        if series is None:
+            series = self.histograms[name] = {}
+        key = _key(labels)
+        hist = series.get(key)
+        if hist is None:
+            hist = series[key] = Histogram()
+        hist.observe(value)
+
+    def timer(self, name:str, **labels) -> _Timer:
+        return _Timer(self, name, labels)
+
+    def timed(self, name:str, **labels):
+        """Decorator timing every call of a coroutine function."""
+        def deco(fn):
+            @wraps(fn)
+            async def wrapper(*args, **kwargs):
+                with self.timer(name, **labels):
+                    return await fn(*args, **kwargs)
+            return wrapper
+        return deco
+
+    def instrument(self, name:str):
+        """Class decorator timing every public coroutine method, labeled by method name."""
+        def deco(cls):
+            for attr, fn in list(vars(cls).items()):
+                if not attr.startswith("_") and inspect.iscoroutinefunction(fn):
+                    setattr(cls, attr, self.timed(name, method=attr)(fn))
+            return cls
+        return deco
+
+    def histogram(self, name:str) -> Histogram:
+        """All label sets of a histogram merged into one."""
+        merged = Histogram()
+        for hist in self.histograms.get(name, {}).values():
+            merged.merge(hist)
+        return merged
+
+    def quantiles(self, name:str, qs=(0.5, 0.95, 0.99)) -> dict[float, float]:
+        hist = self.histogram(name)
+        return {q: hist.quantile(q) for q in qs}
 
     def snapshot(self):
         return dict(self.counters)
 
-metrics = Metrics()
\ No newline at end of file
+    def export(self) -> dict:
+        """Plain-data copy of every series, for publishing to another process."""
+        return {
+            "counters": dict(self.counters),
+            "labeled": {name: dict(series) for name, series in self.labeled.items()},
+            "gauges": {name: dict(series) for name, series in self.gauges.items()},
+            "histograms": {name: {key: (h.buckets, list(h.counts), h.sum, h.count) for key, h in series.items()}
+                           for name, series in self.histograms.items()},
+            "help": dict(self.help),
+        }
+
+    def absorb(self, data:dict, **labels):
+        """Add an export() from another process. Counters and histograms are summed;
+        gauges are kept apart by the given labels (e.g. worker=N)."""
+        self.counters.update(data.get("counters", {}))
+        for name, series in data.get("labeled", {}).items():
+            self.labeled.setdefault(name, Counter()).update(series)
+        extra = _key(labels)
+        for name, series in data.get("gauges", {}).items():
+            target = self.gauges.setdefault(name, {})
+            for key, value in series.items():
+                target[tuple(sorted(key + extra))] = value
+        for name, series in data.get("histograms", {}).items():
+            target = self.histograms.setdefault(name, {})
+            for key, (buckets, counts, total, count) in series.items():
+                other = Histogram(tuple(buckets))
+                other.counts, other.sum, other.count = list(counts), total, count
+                hist = target.get(key)
+                if hist is None:
+                    target[key] = other
+                else:
+                    hist.merge(other)
+        self.help.update(data.get("help", {}))
+
+    def render(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)."""
+        out = []
+        def header(name, kind):
+            if name in self.help:
+                out.append(f"# HELP {name} {self.help[name]}")
+            out.append(f"# TYPE {name} {kind}")
+        for name, value in sorted(self.counters.items()):
+            header(name, "counter")
+            series = self.labeled.get(name)
+            if series:
+                for key, v in sorted(series.items()):
+                    out.append(f"{name}{_fmt_labels(key)} {v}")
+            else:
+                out.append(f"{name} {value}")
+        for name, series in sorted(self.gauges.items()):
+            header(name, "gauge")
+            for key, v in sorted(series.items()):
+                out.append(f"{name}{_fmt_labels(key)} {v}")
+        for name, series in sorted(self.histograms.items()):
+            header(name, "histogram")
+            for key, hist in sorted(series.items()):
+                cumulative = 0
+                for bound, c in zip(hist.buckets, hist.counts):
+                    cumulative += c
+                    out.append(f"{name}_bucket{_fmt_labels(key, (('le', bound),))} {cumulative}")
+                out.append(f"{name}_bucket{_fmt_labels(key, (('le', '+Inf'),))} {hist.count}")
+                out.append(f"{name}_sum{_fmt_labels(key)} {hist.sum}")
+                out.append(f"{name}_count{_fmt_labels(key)} {hist.count}")
+        return "\n".join(out) + "\n"
+
+metrics = Metrics()
+
+def instrument_http(http):
+    """Time every Discord REST request made through a discord.py HTTPClient."""
+    original = http.request
+    @wraps(original)
+    async def request(route, **kwargs):
+        label = f"{route.method} {route.path}"
+        start = time.perf_counter()
+        status = "ok"
+        try:
+            return await original(route, **kwargs)
+        except Exception as e:
+            status = str(getattr(e, "status", type(e).__name__))
+            raise
+        finally:
+            metrics.observe("discord_rest_seconds", time.perf_counter() - start, route=label)
+            metrics.incr("discord_rest_requests_total", route=label, status=status)
+    http.request = request
+
+async def start_metrics_server(host:str, port:int, source=None):
+    """Serve metrics.render() on http://host:port/metrics, or the text returned by
+    `await source()` when given. Returns the aiohttp runner."""
+    from aiohttp import web
+    async def handle(request):
+        body = await source() if source else metrics.render()
+        return web.Response(body=body.encode("utf-8"),
+                            headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"})
+    app = web.Application()
+    app.router.add_get("/metrics", handle)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    return runner
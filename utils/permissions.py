@@ -1,16 +1,83 @@
 import discord
 from config import get_config
 
+class GuildAdmins:
+    __slots__ = ("role_ids", "staff_ids", "admin_ids")
+
+    def __init__(self, role_ids:frozenset[int], staff_ids:set[int], admin_ids:set[int]):
+        self.role_ids = role_ids      # configured admin roles
+        self.staff_ids = staff_ids    # non-bot members holding one of those roles
+        self.admin_ids = admin_ids    # staff plus anyone with the administrator permission
+
+class AdminIndex:
+    """Per-guild admin membership, built once from role.members and kept current from
+    member/role update events, so permission checks are set lookups."""
+
+    def __init__(self):
+        self._guilds: dict[int, GuildAdmins] = {}
+
+    def get(self, guild:discord.Guild) -> GuildAdmins:
+        entry = self._guilds.get(guild.id)
+        if entry is None:
+            entry = self._guilds[guild.id] = self._build(guild)
+        return entry
+
+    def _build(self, guild:discord.Guild) -> GuildAdmins:
+        role_ids = frozenset(get_config(guild.id).admin_role_ids)
+        staff, admins = set(), set()
+        for role in guild.roles:
+            if role.id in role_ids:
+                staff.update(m.id for m in role.members if not m.bot)
+                admins.update(m.id for m in role.members)
+            elif role.permissions.administrator:
+                admins.update(m.id for m in role.members)
+        if guild.owner_id:
+            admins.add(guild.owner_id)
+        return GuildAdmins(role_ids, staff, admins)
+
+    def invalidate(self, guild_id:int|None=None):
+        if guild_id is None:
+            self._guilds.clear()
+        else:
+            self._guilds.pop(guild_id, None)
+
+    def refresh_member(self, member:discord.Member):
+        entry = self._guilds.get(member.guild.id)
+        if entry is None:
+            return
+        has_role = any(r.id in entry.role_ids for r in member.roles)
+        if has_role and not member.bot:
+            entry.staff_ids.add(member.id)
+        else:
+            entry.staff_ids.discard(member.id)
+        if has_role or member.guild_permissions.administrator:
+            entry.admin_ids.add(member.id)
+        else:
+            entry.admin_ids.discard(member.id)
+
+    def remove_member(self, member:discord.Member):
+        entry = self._guilds.get(member.guild.id)
+        if entry:
+            entry.staff_ids.discard(member.id)
+            entry.admin_ids.discard(member.id)
+
+    def staff_members(self, guild:discord.Guild) -> list[discord.Member]:
+        """Members of the configured admin roles (bots excluded), for thread fan-out."""
+        return [m for m in map(guild.get_member, self.get(guild).staff_ids) if m]
+
+admin_index = AdminIndex()
+
 def is_admin(member: discord.Member) -> bool:
-    cfg = get_config()
-    role_ids = set(cfg.admin_role_ids)
-    return any(r.id in role_ids for r in member.roles) or member.guild_permissions.administrator
+    return member.id in admin_index.get(member.guild).admin_ids
+
+def has_admin_role(member: discord.Member) -> bool:
+    return member.id in admin_index.get(member.guild).staff_ids
 
 def can_manage_ticket(member: discord.Member, thread: discord.Thread, creator_id: int) -> bool:
     return is_admin(member) or member.id == creator_id
 
 def escalate_role(guild: discord.Guild):
-    cfg = get_config()
+    cfg = get_config(guild.id)
     if cfg.escalation_role_id:
         return guild.get_role(cfg.escalation_role_id)
-    return None
\ No newline at end of file
+    return None
@@ -0,0 +1,40 @@
+import asyncio
+import discord
+
+class RateLimiter:
+    """Bounded concurrency plus a steady start rate. A 429 reported through
+    `backoff` pauses every caller sharing the limiter."""
+
+    def __init__(self, concurrency:int, rate:float, per:float=1.0):
+        self._sem = asyncio.Semaphore(concurrency)
+        self._pace = asyncio.Lock()
+        self._interval = per / rate
+        self._next = 0.0
+        self._blocked_until = 0.0
+
+    async def __aenter__(self):
+        await self._sem.acquire()
+        try:
+            async with self._pace:
+                loop = asyncio.get_running_loop()
+                now = loop.time()
+                wait = max(self._next, self._blocked_until) - now
+                if wait > 0:
+                    await asyncio.sleep(wait)
+                    now = loop.time()
+                self._next = now + self._interval
+        except BaseException:
+            self._sem.release()
+            raise
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self._sem.release()
+        if isinstance(exc, discord.HTTPException) and exc.status == 429:
+            headers = getattr(exc.response, "headers", None) or {}
+            self.backoff(float(headers.get("Retry-After", 1)))
+        return False
+
+    def backoff(self, seconds:float):
+        loop = asyncio.get_running_loop()
+        self._blocked_until = max(self._blocked_until, loop.time() + seconds)
@@ -0,0 +1,33 @@
+def shard_id(guild_id:int, shard_count:int) -> int:
+    """Shard Discord routes a guild's events to."""
+    return (guild_id >> 22) % shard_count
+
+def shard_ranges(shard_count:int, workers:int) -> list[list[int]]:
+    """Split shards 0..shard_count-1 into contiguous ranges, one per worker."""
+    workers = max(1, min(workers, shard_count))
+    size, extra = divmod(shard_count, workers)
+    ranges, start = [], 0
+    for i in range(workers):
+        end = start + size + (1 if i < extra else 0)
+        ranges.append(list(range(start, end)))
+        start = end
+    return ranges
+
+class ShardScope:
+    """The shards one process owns. Caches and queues are filtered to these guilds,
+    so per-process state never overlaps with another worker's."""
+
+    def __init__(self, shard_ids:list[int], shard_count:int):
+        self.shard_ids = frozenset(shard_ids)
+        self.shard_count = shard_count
+
+    def owns(self, guild_id:int) -> bool:
+        return shard_id(guild_id, self.shard_count) in self.shard_ids
+
+    def sql(self, column:str="guild_id") -> tuple[str, list[int]]:
+        """An `AND ...` clause and its parameters restricting `column` to owned guilds."""
+        ids = sorted(self.shard_ids)
+        return f" AND (({column} >> 22) % ?) IN ({','.join('?' * len(ids))})", [self.shard_count, *ids]
+
+    def __repr__(self):
+        return f"ShardScope({sorted(self.shard_ids)}, {self.shard_count})"
@@ -0,0 +1,64 @@
+import time
+from abc import ABC, abstractmethod
+from utils.metrics import Metrics
+
+WORKER_STALE_SECONDS = 60
+
+class SharedStore(ABC):
+    """Key/value store shared by the worker processes of one deployment.
+    Values must be picklable plain data. Calls may block on IPC, so run them
+    off the event loop."""
+
+    @abstractmethod
+    def put(self, key:str, value):
+        ...
+
+    @abstractmethod
+    def get(self, key:str, default=None):
+        ...
+
+    @abstractmethod
+    def delete(self, key:str):
+        ...
+
+    @abstractmethod
+    def items(self, prefix:str="") -> list[tuple[str, object]]:
+        ...
+
+class LocalStore(SharedStore):
+    """Store for workers on a single host, backed by a dict (a multiprocessing
+    Manager dict when shared between processes)."""
+
+    def __init__(self, mapping=None):
+        self._data = mapping if mapping is not None else {}
+
+    @classmethod
+    def managed(cls, manager) -> "LocalStore":
+        return cls(manager.dict())
+
+    def put(self, key:str, value):
+        self._data[key] = value
+
+    def get(self, key:str, default=None):
+        return self._data.get(key, default)
+
+    def delete(self, key:str):
+        self._data.pop(key, None)
+
+    def items(self, prefix:str="") -> list[tuple[str, object]]:
+        return [(k, v) for k, v in self._data.items() if k.startswith(prefix)]
+
+def worker_key(worker_id:int) -> str:
+    return f"worker:{worker_id}"
+
+def live_workers(store:SharedStore, now:float|None=None) -> dict[int, dict]:
+    """Latest state published by each worker, ignoring workers that went quiet."""
+    now = now or time.time()
+    return {state["worker_id"]: state for _, state in store.items("worker:")
+            if now - state.get("at", 0) < WORKER_STALE_SECONDS}
+
+def aggregate_metrics(store:SharedStore) -> Metrics:
+    merged = Metrics()
+    for worker_id, state in sorted(live_workers(store).items()):
+        merged.absorb(state.get("metrics", {}), worker=worker_id)
+    return merged
@@ -0,0 +1,109 @@
+import sys
+import threading
+import time
+from collections import Counter
+from contextvars import ContextVar
+
+_current: ContextVar["Span | None"] = ContextVar("current_span", default=None)
+
+class _NoopSpan:
+    __slots__ = ()
+    def __enter__(self): return self
+    def __exit__(self, *exc): return False
+    def finish(self): pass
+
+_NOOP = _NoopSpan()
+
+class Span:
+    __slots__ = ("tracer", "path", "start", "child_time", "parent", "token")
+
+    def __init__(self, tracer:"Tracer", name:str):
+        self.tracer = tracer
+        self.parent = _current.get()
+        self.path = f"{self.parent.path};{name}" if self.parent else name
+        self.child_time = 0.0
+        self.start = time.perf_counter()
+        self.token = _current.set(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.finish()
+        return False
+
+    def finish(self):
+        elapsed = time.perf_counter() - self.start
+        try:
+            _current.reset(self.token)
+        except ValueError:
+            # finished from a different context than it started in
+            pass
+        if self.parent:
+            self.parent.child_time += elapsed
+        self.tracer.record(self.path, elapsed - self.child_time)
+
+class Tracer:
+    """Span tracer with contextvar propagation. Spans aggregate into collapsed
+    stacks ("a;b;c <self-time µs>"), the input format of flamegraph tools.
+    While disabled, span() returns a shared no-op object."""
+
+    def __init__(self):
+        self.enabled = False
+        self.stacks = Counter()
+
+    def span(self, name:str):
+        if not self.enabled:
+            return _NOOP
+        return Span(self, name)
+
+    def record(self, path:str, self_seconds:float):
+        self.stacks[path] += max(0, int(self_seconds * 1_000_000))
+
+    def start(self):
+        self.stacks = Counter()
+        self.enabled = True
+
+    def stop(self) -> Counter:
+        self.enabled = False
+        stacks, self.stacks = self.stacks, Counter()
+        return stacks
+
+tracer = Tracer()
+
+def _frame_stack(frame) -> str:
+    parts = []
+    while frame is not None:
+        code = frame.f_code
+        parts.append(f"{frame.f_globals.get('__name__', '?')}:{code.co_name}")
+        frame = frame.f_back
+    return ";".join(reversed(parts))
+
+class SamplingProfiler:
+    """Samples the stack of one thread (the event loop) from a background thread."""
+
+    def __init__(self, thread_id:int|None=None, interval:float=0.005):
+        self.thread_id = thread_id or threading.get_ident()
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.stacks[_frame_stack(frame)] += 1
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> Counter:
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+        return self.stacks
+
+def collapsed(stacks:Counter) -> str:
+    return "\n".join(f"{path} {count}" for path, count in stacks.most_common() if count) + "\n"
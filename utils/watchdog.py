@@ -0,0 +1,86 @@
+import asyncio
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from utils.metrics import metrics
+
+TICK_SECONDS = 0.25
+BLOCK_THRESHOLD_SECONDS = 0.5
+OFFENDER_HISTORY = 50
+STACK_DEPTH = 12
+
+class BlockingEvent:
+    __slots__ = ("at", "seconds", "stack")
+
+    def __init__(self, at:float, seconds:float, stack:str):
+        self.at = at
+        self.seconds = seconds
+        self.stack = stack
+
+class LoopWatchdog:
+    """Measures event-loop lag from inside the loop and, from a helper thread,
+    captures the loop thread's stack whenever a single step blocks too long."""
+
+    def __init__(self, tick:float=TICK_SECONDS, threshold:float=BLOCK_THRESHOLD_SECONDS,
+                 history:int=OFFENDER_HISTORY):
+        self.tick = tick
+        self.threshold = threshold
+        self.offenders: deque[BlockingEvent] = deque(maxlen=history)
+        self.lag = 0.0
+        self.ready_depth = 0
+        self.task_count = 0
+        self._beat = time.monotonic()
+        self._stall: BlockingEvent | None = None
+        self._loop_thread: int | None = None
+        self._task: asyncio.Task | None = None
+        self._stop = threading.Event()
+        self._monitor: threading.Thread | None = None
+
+    def start(self):
+        if self._task:
+            return
+        self._loop_thread = threading.get_ident()
+        self._beat = time.monotonic()
+        self._stop.clear()
+        self._task = asyncio.create_task(self._ticker())
+        self._monitor = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._monitor.start()
+
+    async def stop(self):
+        self._stop.set()
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    async def _ticker(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            before = loop.time()
+            await asyncio.sleep(self.tick)
+            self.lag = max(0.0, loop.time() - before - self.tick)
+            self._beat = time.monotonic()
+            stall, self._stall = self._stall, None
+            if stall:
+                stall.seconds = self.lag
+            self.ready_depth = len(getattr(loop, "_ready", ()))
+            self.task_count = len(asyncio.all_tasks(loop))
+            metrics.observe("event_loop_lag_seconds", self.lag)
+            metrics.set_gauge("event_loop_ready_handles", self.ready_depth)
+            metrics.set_gauge("asyncio_tasks", self.task_count)
+
+    def _watch(self):
+        while not self._stop.wait(self.threshold / 4):
+            blocked = time.monotonic() - self._beat - self.tick
+            if blocked < self.threshold or self._stall is not None:
+                continue
+            frame = sys._current_frames().get(self._loop_thread)
+            if frame is None:
+                continue
+            stack = "".join(traceback.format_stack(frame, limit=STACK_DEPTH))
+            self._stall = BlockingEvent(time.time(), blocked, stack)
+            self.offenders.append(self._stall)
+            metrics.incr("event_loop_blocking_events")
+
+watchdog = LoopWatchdog()